@@ -85,6 +85,15 @@ class _BaseScanWidget(QtWidgets.QWidget):
 
         self._scan_data = None
 
+    def update_scan_lines(self, data: ScanData, lines: Tuple[int, int]) -> None:
+        """ Update the display with newly completed scan lines of a running scan.
+        The default implementation updates the whole display (see set_scan_data).
+
+        @param ScanData data: The (shared) scan data of the running scan
+        @param tuple lines: Range (first_line, stop_line) of the newly completed scan lines
+        """
+        self.set_scan_data(data)
+
 
 class Scan1DWidget(_BaseScanWidget):
     """ Widget to interactively display multichannel 1D scan data as well as toggling and saving
@@ -227,6 +236,9 @@ class Scan2DWidget(_BaseScanWidget):
 
         self.layout().addWidget(self.image_widget, 1, 0, 1, 4)
 
+        # Copy of the displayed channel data. Only updated line by line during a running scan.
+        self._image = None
+
         # disable buggy pyqtgraph 'Export..' context menu
         self.image_widget.plot_widget.getPlotItem().vb.scene().contextMenu[0].setVisible(False)
 
@@ -289,6 +301,49 @@ class Scan2DWidget(_BaseScanWidget):
         # Set data
         self._update_scan_data()
 
+    def update_scan_lines(self, data: ScanData, lines: Tuple[int, int]) -> None:
+        """ Update the displayed image with newly completed scan lines (image columns) of a
+        running scan. Only the new lines are copied into the displayed image. Color levels are
+        updated from the new lines unless they depend on percentiles other than (0, 100).
+        Falls back to a full update (see set_scan_data) if the scan geometry changed.
+
+        @param ScanData data: The (shared) scan data of the running scan
+        @param tuple lines: Range (first_line, stop_line) of the newly completed scan lines
+        """
+        current_channel = self.channel_selection_combobox.currentText()
+        if (self._image is None) or (self._scan_data is None) or (data.data is None) \
+                or (current_channel not in data.channels) \
+                or (self._scan_data.scan_axes != data.scan_axes) \
+                or (self._scan_data.scan_range != data.scan_range) \
+                or (self._scan_data.scan_resolution != data.scan_resolution):
+            self.set_scan_data(data)
+            return
+
+        self._scan_data = data
+        start, stop = lines
+        new_lines = data.data[current_channel][:, start:stop]
+        self._image[:, start:stop] = new_lines
+
+        image_item = self.image_widget.image_item
+        colorbar = self.image_widget.colorbar_widget
+        if colorbar.mode != colorbar.ColorBarMode.PERCENTILE:
+            levels = colorbar.limits
+        elif tuple(self.image_widget.percentiles) == (0, 100):
+            # Color levels are the min/max of all valid pixels and can be updated incrementally
+            new_lines = new_lines[np.isfinite(new_lines)]
+            if new_lines.size == 0:
+                return
+            levels = (new_lines.min(), new_lines.max())
+            # A cleared image item (no valid pixels so far) keeps the levels of the previous image
+            if image_item.image is not None and image_item.levels is not None:
+                levels = (min(levels[0], image_item.levels[0]),
+                          max(levels[1], image_item.levels[1]))
+            colorbar.set_limits(*levels)
+        else:
+            self.image_widget.set_image(self._image)
+            return
+        image_item.setImage(image=self._image, autoLevels=False, levels=levels)
+
     @QtCore.Slot(dict)
     def _region_changed(self, regions) -> None:
         center = regions[self.image_widget.SelectionMode.XY][0][0]
@@ -312,9 +367,11 @@ class Scan2DWidget(_BaseScanWidget):
         current_channel = self.channel_selection_combobox.currentText()
         if (self._scan_data is None) or (self._scan_data.data is None) \
             or (current_channel not in self._scan_data.channels):
+            self._image = None
             self.image_widget.set_image(None)
         else:
-            self.image_widget.set_image(self._scan_data.data[current_channel])
+            self._image = np.array(self._scan_data.data[current_channel])
+            self.image_widget.set_image(self._image)
             self.image_widget.set_image_extent(self._scan_data.scan_range,
                                                adjust_for_px_size=True)
             self.image_widget.autoRange()
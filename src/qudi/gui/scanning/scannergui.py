@@ -229,6 +229,9 @@ class ScannerGui(GuiBase):
         self._scanning_logic().sigScanStateChanged.connect(
             self.scan_state_updated, QtCore.Qt.QueuedConnection
         )
+        self._scanning_logic().sigScanLinesUpdated.connect(
+            self.scan_lines_updated, QtCore.Qt.QueuedConnection
+        )
         self._data_logic().sigHistoryScanDataRestored.connect(
             self._update_from_history, QtCore.Qt.QueuedConnection
         )
@@ -275,6 +278,7 @@ class ScannerGui(GuiBase):
         self._scanning_logic().sigScannerTargetChanged.disconnect(self.scanner_target_updated)
         self._scanning_logic().sigScanSettingsChanged.disconnect(self.scanner_settings_updated)
         self._scanning_logic().sigScanStateChanged.disconnect(self.scan_state_updated)
+        self._scanning_logic().sigScanLinesUpdated.disconnect(self.scan_lines_updated)
         self._optimize_logic().sigOptimizeStateChanged.disconnect(self.optimize_state_updated)
         self._data_logic().sigHistoryScanDataRestored.disconnect(self._update_from_history)
         self.scanner_control_dockwidget.sigTargetChanged.disconnect()
@@ -684,35 +688,7 @@ class ScannerGui(GuiBase):
 
         if scan_data is not None:
             if caller_id is self._optimizer_id:
-                channel = self._osd.settings['data_channel']
-                if scan_data.scan_dimension == 2:
-                    x_ax, y_ax = scan_data.scan_axes
-                    self.optimizer_dockwidget.set_image(image=scan_data.data[channel],
-                                                        extent=scan_data.scan_range,
-                                                        axs=scan_data.scan_axes)
-                    self.optimizer_dockwidget.set_image_label(axis='bottom',
-                                                              text=x_ax,
-                                                              units=scan_data.axes_units[x_ax],
-                                                              axs=scan_data.scan_axes)
-                    self.optimizer_dockwidget.set_image_label(axis='left',
-                                                              text=y_ax,
-                                                              units=scan_data.axes_units[y_ax],
-                                                              axs=scan_data.scan_axes)
-                elif scan_data.scan_dimension == 1:
-                    x_ax = scan_data.scan_axes[0]
-                    self.optimizer_dockwidget.set_plot_data(
-                        x=np.linspace(*scan_data.scan_range[0], scan_data.scan_resolution[0]),
-                        y=scan_data.data[channel],
-                        axs=scan_data.scan_axes
-                    )
-                    self.optimizer_dockwidget.set_plot_label(axis='bottom',
-                                                             text=x_ax,
-                                                             units=scan_data.axes_units[x_ax],
-                                                             axs=scan_data.scan_axes)
-                    self.optimizer_dockwidget.set_plot_label(axis='left',
-                                                             text=channel,
-                                                             units=scan_data.channel_units[channel],
-                                                             axs=scan_data.scan_axes)
+                self._update_optimizer_scan_data(scan_data)
             else:
                 if scan_data.scan_dimension == 2:
                     dockwidget = self.scan_2d_dockwidgets.get(scan_axes, None)
@@ -723,6 +699,58 @@ class ScannerGui(GuiBase):
                     self._update_scan_data(scan_data)
         return
 
+    @QtCore.Slot(object, tuple, object)
+    def scan_lines_updated(self, scan_data, lines, caller_id=None):
+        """ Display newly completed lines of a running scan.
+
+        @param ScanData scan_data: The (shared) scan data of the running scan
+        @param tuple lines: Range (first_line, stop_line) of the newly completed scan lines
+        @param int caller_id: The qudi module object id responsible for the scan
+        """
+        if caller_id is self._optimizer_id:
+            self._update_optimizer_scan_data(scan_data)
+            return
+        if scan_data.scan_dimension == 2:
+            dockwidget = self.scan_2d_dockwidgets.get(scan_data.scan_axes, None)
+        else:
+            dockwidget = self.scan_1d_dockwidgets.get(scan_data.scan_axes, None)
+        if dockwidget is not None:
+            dockwidget.scan_widget.update_scan_lines(scan_data, lines)
+
+    def _update_optimizer_scan_data(self, scan_data):
+        """
+        @param ScanData scan_data:
+        """
+        channel = self._osd.settings['data_channel']
+        if scan_data.scan_dimension == 2:
+            x_ax, y_ax = scan_data.scan_axes
+            self.optimizer_dockwidget.set_image(image=scan_data.data[channel],
+                                                extent=scan_data.scan_range,
+                                                axs=scan_data.scan_axes)
+            self.optimizer_dockwidget.set_image_label(axis='bottom',
+                                                      text=x_ax,
+                                                      units=scan_data.axes_units[x_ax],
+                                                      axs=scan_data.scan_axes)
+            self.optimizer_dockwidget.set_image_label(axis='left',
+                                                      text=y_ax,
+                                                      units=scan_data.axes_units[y_ax],
+                                                      axs=scan_data.scan_axes)
+        elif scan_data.scan_dimension == 1:
+            x_ax = scan_data.scan_axes[0]
+            self.optimizer_dockwidget.set_plot_data(
+                x=np.linspace(*scan_data.scan_range[0], scan_data.scan_resolution[0]),
+                y=scan_data.data[channel],
+                axs=scan_data.scan_axes
+            )
+            self.optimizer_dockwidget.set_plot_label(axis='bottom',
+                                                     text=x_ax,
+                                                     units=scan_data.axes_units[x_ax],
+                                                     axs=scan_data.scan_axes)
+            self.optimizer_dockwidget.set_plot_label(axis='left',
+                                                     text=channel,
+                                                     units=scan_data.channel_units[channel],
+                                                     axs=scan_data.scan_axes)
+
     @QtCore.Slot(bool, dict, object)
     def optimize_state_updated(self, is_running, optimal_position=None, fit_data=None):
         self._optimizer_state['is_running'] = is_running
@@ -65,6 +65,7 @@ class TimeSeriesGui(GuiBase):
     sigStopRecording = QtCore.Signal()
     sigTraceSettingsChanged = QtCore.Signal(dict)
     sigChannelSettingsChanged = QtCore.Signal(list, list)
+    sigDisplayRangeChanged = QtCore.Signal(object)
 
     _current_value_channel = StatusVar(name='current_value_channel', default='None')
     _visible_traces = StatusVar(name='visible_traces', default=dict())
@@ -81,6 +82,9 @@ class TimeSeriesGui(GuiBase):
         self.averaged_curves = dict()
 
         self._channels_per_axis = [set(), set()]
+        # x-axis offset of displayed traces and flag indicating a manually zoomed x-axis range
+        self._time_offset = 0
+        self._display_zoomed = False
 
     def on_activate(self):
         """ Initialisation of the GUI """
@@ -103,7 +107,7 @@ class TimeSeriesGui(GuiBase):
             self._mw.trace_plot_widget.setLabel('bottom', 'Sample')
         else:
             self._mw.trace_plot_widget.setLabel('bottom', 'Time', units='s')
-        self._mw.trace_plot_widget.setMouseEnabled(x=False, y=False)
+        self._mw.trace_plot_widget.setMouseEnabled(x=True, y=False)
         self._mw.trace_plot_widget.setMouseTracking(False)
         self._mw.trace_plot_widget.setMenuEnabled(False)
         self._mw.trace_plot_widget.hideButtons()
@@ -116,6 +120,9 @@ class TimeSeriesGui(GuiBase):
         self._vb.setMenuEnabled(False)
         # Sync resize events
         self._mw.trace_plot_widget.plotItem.vb.sigResized.connect(self.__update_viewbox_sync)
+        self._mw.trace_plot_widget.plotItem.vb.sigRangeChangedManually.connect(
+            self._display_range_changed
+        )
 
         self._mw.trace_plot_widget.disableAutoRange(axis='x')
         # self._mw.trace_plot_widget.setAutoVisible(x=True)
@@ -179,6 +186,7 @@ class TimeSeriesGui(GuiBase):
         self.sigStartRecording.connect(logic.start_recording, QtCore.Qt.QueuedConnection)
         self.sigStopRecording.connect(logic.stop_recording, QtCore.Qt.QueuedConnection)
         self.sigTraceSettingsChanged.connect(logic.set_trace_settings, QtCore.Qt.QueuedConnection)
+        self.sigDisplayRangeChanged.connect(logic.set_display_range, QtCore.Qt.QueuedConnection)
         self.sigChannelSettingsChanged.connect(logic.set_channel_settings,
                                                QtCore.Qt.QueuedConnection)
 
@@ -193,7 +201,7 @@ class TimeSeriesGui(GuiBase):
                            recording=logic.data_recording_active)
         self.update_channel_settings(logic.active_channel_names, logic.averaged_channel_names)
         self.update_trace_settings(logic.trace_settings)
-        self.update_data(*logic.trace_data, *logic.averaged_trace_data)
+        self.update_data(*logic.display_data)
         self._apply_trace_view_settings(self.trace_view_settings)
         index = self._mw.current_value_combobox.findText(self._current_value_channel)
         if index < 0:
@@ -216,6 +224,7 @@ class TimeSeriesGui(GuiBase):
 
         # disconnect signals
         self._mw.trace_plot_widget.plotItem.vb.sigResized.disconnect()
+        self._mw.trace_plot_widget.plotItem.vb.sigRangeChangedManually.disconnect()
         self._mw.toggle_trace_action.triggered.disconnect()
         self._mw.record_trace_action.triggered.disconnect()
         self._mw.snapshot_trace_action.triggered.disconnect()
@@ -230,6 +239,7 @@ class TimeSeriesGui(GuiBase):
         self.sigStopRecording.disconnect()
         self.sigTraceSettingsChanged.disconnect()
         self.sigChannelSettingsChanged.disconnect()
+        self.sigDisplayRangeChanged.disconnect()
         logic.sigDataChanged.disconnect(self.update_data)
         logic.sigTraceSettingsChanged.disconnect(self.update_trace_settings)
         logic.sigChannelSettingsChanged.disconnect(self.update_channel_settings)
@@ -360,17 +370,20 @@ class TimeSeriesGui(GuiBase):
     @QtCore.Slot(object, object, object, object)
     def update_data(self, data_time, data, smooth_time, smooth_data):
         """ The function that grabs the data and sends it to the plot """
-        shift_time = data_time[0] != 0
+        # Traces with timestamps are shown relative to the oldest sample. Keep the offset while
+        # the x-axis range is zoomed, since data_time then only covers the zoomed region.
+        if self._streamer_constraints.sample_timing != SampleTiming.TIMESTAMP:
+            self._time_offset = 0
+        elif not self._display_zoomed and len(data_time) > 0:
+            self._time_offset = data_time[0]
         if data is not None:
-            if shift_time:
-                data_time = data_time - data_time[0]
+            if self._time_offset != 0:
+                data_time = data_time - self._time_offset
             for channel, y_arr in data.items():
                 self.curves[channel].setData(y=y_arr, x=data_time)
         if smooth_data is not None:
-            if shift_time:
-                smooth_time = smooth_time + (
-                    data_time[data_time.shape[0] - smooth_time.shape[0]] - smooth_time[0]
-                )
+            if self._time_offset != 0:
+                smooth_time = smooth_time - self._time_offset
             for channel, y_arr in smooth_data.items():
                 self.averaged_curves[channel].setData(y=y_arr, x=smooth_time)
 
@@ -455,6 +468,18 @@ class TimeSeriesGui(GuiBase):
             self._mw.current_value_label.setVisible(True)
         self._current_value_channel = val
 
+    @QtCore.Slot()
+    def _display_range_changed(self):
+        """ Request the trace data within the manually zoomed x-axis range from the logic """
+        x_min, x_max = self._mw.trace_plot_widget.plotItem.vb.viewRange()[0]
+        self._display_zoomed = True
+        self.sigDisplayRangeChanged.emit((x_min + self._time_offset, x_max + self._time_offset))
+
+    def _reset_display_range(self):
+        if self._display_zoomed:
+            self._display_zoomed = False
+            self.sigDisplayRangeChanged.emit(None)
+
     @QtCore.Slot()
     def _restore_default_view(self):
         """ Restore the arrangement of DockWidgets to the default
@@ -469,6 +494,8 @@ class TimeSeriesGui(GuiBase):
         # Restore status if something went wrong
         self.update_status(running=self._time_series_logic_con().module_state() == 'locked',
                            recording=self._time_series_logic_con().data_recording_active)
+        # Restore full trace x-axis range
+        self.update_trace_settings(self._time_series_logic_con().trace_settings)
 
     @QtCore.Slot(dict)
     def update_trace_settings(self, settings_dict):
@@ -505,6 +532,7 @@ class TimeSeriesGui(GuiBase):
                 xRange=[0, settings_dict['trace_window_size']],
                 disableAutoRange=False
             )
+        self._reset_display_range()
 
     def _remove_channel_from_plot(self, channel: str) -> None:
         data_curve = self.curves[channel]
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a pool of persistent FTP sessions to a single device, e.g. for transferring
+waveform and sequence files to the Tektronix AWG series.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import socket
+import ftplib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# Errors indicating a broken control connection (e.g. closed by the server after an idle timeout).
+# Operations failing with these errors are repeated once on a new connection.
+_CONNECTION_ERRORS = (ConnectionError, socket.timeout, EOFError, ftplib.error_temp,
+                      ftplib.error_reply)
+
+
+class _FtpConnection:
+    """ Logged in ftplib.FTP instance together with its current directory and last usage time """
+
+    def __init__(self, ftp, directory):
+        self.ftp = ftp
+        self.directory = directory
+        self.last_used = time.monotonic()
+
+
+class FtpSessionPool:
+    """
+    Keeps logged in FTP connections to a device open and shares them between operations, instead
+    of connecting and logging in again for every file listing, deletion or upload.
+
+    Idle connections are kept alive by sending NOOP commands in a background thread. Broken
+    connections (e.g. closed by the server) are replaced transparently and the failed operation is
+    repeated once. Several files can be uploaded or deleted in a single session, and uploads can
+    be distributed over up to max_connections parallel connections.
+
+    Usage example:
+
+        pool = FtpSessionPool('192.168.1.2', working_dir='waves', max_connections=4)
+        pool.upload_files(['C:/pulsed_files/rabi_ch1.wfmx', 'C:/pulsed_files/rabi_ch2.wfmx'],
+                          parallel=True)
+        print(pool.list_directory())
+        pool.close()
+    """
+
+    def __init__(self, host, user='anonymous', passwd='anonymous@', working_dir=None, port=21,
+                 timeout=None, max_connections=1, keepalive_interval=30):
+        """
+        @param str host: IP address or hostname of the FTP server
+        @param str user: optional, username for FTP login
+        @param str passwd: optional, password for FTP login
+        @param str working_dir: optional, directory to change into after login
+        @param int port: optional, FTP control connection port
+        @param float timeout: optional, socket timeout in seconds (None for the system default)
+        @param int max_connections: optional, maximum number of simultaneously open connections
+        @param float keepalive_interval: optional, idle time in seconds after which a NOOP is sent
+                                         to a connection. Keep-alive is disabled for values <= 0.
+        """
+        if max_connections < 1:
+            raise ValueError(f'FtpSessionPool needs at least 1 connection '
+                             f'(received: {max_connections})')
+        self._host = host
+        self._port = int(port)
+        self._user = user
+        self._passwd = passwd
+        self._timeout = timeout
+        self._max_connections = int(max_connections)
+        self._keepalive_interval = keepalive_interval
+        self._working_dir = working_dir
+
+        self._lock = threading.Condition()
+        self._idle_connections = list()
+        self._open_connections = 0
+        self._closed = False
+        self._stop_keepalive = threading.Event()
+        self._keepalive_thread = None
+
+        self._connects = 0
+        self._reconnects = 0
+
+    @property
+    def working_dir(self):
+        """ Directory all operations are performed in (None for the login directory). Pooled
+        connections change into a new working directory upon their next use.
+        """
+        return self._working_dir
+
+    @working_dir.setter
+    def working_dir(self, path):
+        with self._lock:
+            self._working_dir = path
+
+    @property
+    def max_connections(self):
+        return self._max_connections
+
+    @property
+    def statistics(self):
+        """ dict of counters since the pool has been created:
+            connects: number of logins
+            reconnects: number of operations repeated on a new connection
+            open_connections: number of currently open connections
+            idle_connections: number of open connections currently not in use
+        """
+        with self._lock:
+            return {'connects': self._connects,
+                    'reconnects': self._reconnects,
+                    'open_connections': self._open_connections,
+                    'idle_connections': len(self._idle_connections)}
+
+    def close(self):
+        """ Stop the keep-alive thread and close all idle connections. Connections currently in use
+        are closed as soon as they are released.
+        """
+        with self._lock:
+            self._closed = True
+            idle_connections = self._idle_connections
+            self._idle_connections = list()
+            self._open_connections -= len(idle_connections)
+            keepalive_thread = self._keepalive_thread
+            self._keepalive_thread = None
+            self._lock.notify_all()
+        self._stop_keepalive.set()
+        # The keep-alive thread is only stored once it has been started
+        if keepalive_thread is not None and keepalive_thread is not threading.current_thread():
+            keepalive_thread.join()
+        for connection in idle_connections:
+            self._disconnect(connection)
+
+    @contextmanager
+    def session(self):
+        """ Context manager providing a logged in ftplib.FTP instance in the working directory for
+        exclusive use. Blocks if max_connections connections are in use.
+
+        The connection is returned to the pool afterwards, unless an error other than a permanent
+        FTP error (ftplib.error_perm) occurred.
+        """
+        connection = self._acquire()
+        try:
+            yield connection.ftp
+        except _CONNECTION_ERRORS:
+            self._release(connection, broken=True)
+            raise
+        except ftplib.error_perm:
+            # The server has completely answered the failed command
+            self._release(connection)
+            raise
+        except BaseException:
+            # The connection may be left within a transfer
+            self._release(connection, broken=True)
+            raise
+        self._release(connection)
+
+    def run(self, func):
+        """ Call func(ftp) with a pooled connection. If the connection turns out to be broken, func
+        is repeated once on a new connection.
+
+        @param callable func: function receiving a logged in ftplib.FTP instance
+
+        @return: return value of func
+        """
+        try:
+            with self.session() as ftp:
+                return func(ftp)
+        except _CONNECTION_ERRORS:
+            if self._closed:
+                raise
+            with self._lock:
+                self._reconnects += 1
+        with self.session() as ftp:
+            return func(ftp)
+
+    def list_directory(self):
+        """ Raw listing of the working directory (FTP LIST command).
+
+        @return list: lines returned by the server
+        """
+        def list_lines(ftp):
+            lines = list()
+            ftp.retrlines('LIST', callback=lines.append)
+            return lines
+        return self.run(list_lines)
+
+    def make_directory(self, path):
+        """ Create the directory path on the server if it does not exist yet.
+
+        @param str path: directory to create
+
+        @return bool: True if the directory has been created, False if it already existed
+        """
+        def make_dir(ftp):
+            current_dir = ftp.pwd()
+            try:
+                ftp.cwd(path)
+            except ftplib.error_perm:
+                ftp.mkd(path)
+                return True
+            finally:
+                ftp.cwd(current_dir)
+            return False
+        return self.run(make_dir)
+
+    def delete_files(self, filenames, ignore_missing=False):
+        """ Delete several files from the working directory in a single session.
+
+        @param list filenames: names of the files to delete
+        @param bool ignore_missing: optional, skip files not present on the server instead of
+                                    raising ftplib.error_perm
+
+        @return list: names of the deleted files
+        """
+        deleted = list()
+        remaining = list(filenames)
+
+        def delete(ftp):
+            while remaining:
+                filename = remaining[0]
+                try:
+                    ftp.delete(filename)
+                    deleted.append(filename)
+                except ftplib.error_perm as err:
+                    if not (ignore_missing and str(err).startswith('550')):
+                        raise
+                # Only forget the file if it has been handled. A retry continues from here.
+                remaining.pop(0)
+
+        if remaining:
+            self.run(delete)
+        return deleted
+
+    def upload_files(self, files, replace=True, parallel=False):
+        """ Upload several local files into the working directory. Without parallel transfer all
+        files are uploaded in a single session. Otherwise they are distributed over up to
+        max_connections connections.
+
+        @param list files: local file paths or (local file path, remote filename) tuples. Files
+                           are uploaded under their base name if no remote filename is given.
+        @param bool replace: optional, delete a file of the same name on the server before upload
+        @param bool parallel: optional, upload using up to max_connections connections at once
+
+        @return list: uploaded remote filenames
+        """
+        transfers = list()
+        for file in files:
+            if isinstance(file, str):
+                transfers.append((file, os.path.basename(file)))
+            else:
+                transfers.append((file[0], file[1]))
+
+        if not parallel or self._max_connections < 2 or len(transfers) < 2:
+            remaining = list(transfers)
+
+            def upload(ftp):
+                while remaining:
+                    self._store_file(ftp, *remaining[0], replace=replace)
+                    remaining.pop(0)
+
+            if remaining:
+                self.run(upload)
+            return [remote_name for _, remote_name in transfers]
+
+        with ThreadPoolExecutor(max_workers=min(self._max_connections, len(transfers)),
+                                thread_name_prefix='FtpSessionPool-upload') as executor:
+            futures = [executor.submit(self.run,
+                                       lambda ftp, t=transfer: self._store_file(ftp, *t,
+                                                                                replace=replace))
+                       for transfer in transfers]
+            # Raise the first error after all transfers have finished
+            for future in futures:
+                future.result()
+        return [remote_name for _, remote_name in transfers]
+
+    def upload_stream(self, remote_name, stream, replace=True, blocksize=8192):
+        """ Upload data read from a file-like object into the working directory, e.g. while the
+        data is still being produced. The stream is not rewound if the connection fails, so no
+        reconnect is attempted.
+
+        @param str remote_name: filename on the server
+        @param stream: file-like object providing bytes via read(blocksize) until b'' is returned
+        @param bool replace: optional, delete a file of the same name on the server before upload
+        @param int blocksize: optional, maximum number of bytes read from the stream at once
+        """
+        with self.session() as ftp:
+            self._delete_if_present(ftp, remote_name, replace)
+            ftp.storbinary('STOR ' + remote_name, stream, blocksize=blocksize)
+
+    @staticmethod
+    def _delete_if_present(ftp, remote_name, replace):
+        if not replace:
+            return
+        try:
+            ftp.delete(remote_name)
+        except ftplib.error_perm as err:
+            if not str(err).startswith('550'):
+                raise
+
+    @classmethod
+    def _store_file(cls, ftp, local_path, remote_name, replace):
+        cls._delete_if_present(ftp, remote_name, replace)
+        with open(local_path, 'rb') as file:
+            ftp.storbinary('STOR ' + remote_name, file)
+
+    def _connect(self, directory):
+        ftp = ftplib.FTP()
+        try:
+            if self._timeout is None:
+                ftp.connect(self._host, self._port)
+            else:
+                ftp.connect(self._host, self._port, timeout=self._timeout)
+            ftp.login(user=self._user, passwd=self._passwd)
+            if directory:
+                ftp.cwd(directory)
+        except BaseException:
+            ftp.close()
+            raise
+        return _FtpConnection(ftp, directory)
+
+    @staticmethod
+    def _disconnect(connection):
+        try:
+            connection.ftp.quit()
+        except (OSError, EOFError, ftplib.Error):
+            connection.ftp.close()
+
+    def _acquire(self):
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError('FtpSessionPool has been closed')
+                if self._idle_connections:
+                    # Most recently used connection first, so surplus connections can time out
+                    connection = self._idle_connections.pop()
+                    directory = self._working_dir
+                    break
+                if self._open_connections < self._max_connections:
+                    self._open_connections += 1
+                    connection = None
+                    directory = self._working_dir
+                    break
+                self._lock.wait()
+
+        if connection is None:
+            try:
+                connection = self._connect(directory)
+            except BaseException:
+                with self._lock:
+                    self._open_connections -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                self._connects += 1
+            self._start_keepalive()
+        elif directory and connection.directory != directory:
+            try:
+                connection.ftp.cwd(directory)
+                connection.directory = directory
+            except BaseException:
+                self._release(connection, broken=True)
+                raise
+        return connection
+
+    def _release(self, connection, broken=False):
+        with self._lock:
+            if broken or self._closed:
+                self._open_connections -= 1
+            else:
+                connection.last_used = time.monotonic()
+                self._idle_connections.append(connection)
+            self._lock.notify()
+        if broken:
+            connection.ftp.close()
+        elif self._closed:
+            self._disconnect(connection)
+
+    def _start_keepalive(self):
+        if self._keepalive_interval is None or self._keepalive_interval <= 0:
+            return
+        with self._lock:
+            if self._keepalive_thread is not None or self._closed:
+                return
+            keepalive_thread = threading.Thread(target=self._keepalive_loop,
+                                                name='FtpSessionPool-keepalive',
+                                                daemon=True)
+            keepalive_thread.start()
+            self._keepalive_thread = keepalive_thread
+
+    def _keepalive_loop(self):
+        while not self._stop_keepalive.wait(self._keepalive_interval / 2):
+            now = time.monotonic()
+            with self._lock:
+                expired = [c for c in self._idle_connections
+                           if now - c.last_used >= self._keepalive_interval]
+                for connection in expired:
+                    self._idle_connections.remove(connection)
+            for connection in expired:
+                try:
+                    connection.ftp.voidcmd('NOOP')
+                except (OSError, EOFError, ftplib.Error):
+                    self._release(connection, broken=True)
+                else:
+                    self._release(connection)
@@ -37,6 +37,164 @@ from qudi.core.configoption import ConfigOption
 from qudi.util.paths import get_appdata_dir
 from qudi.interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
 
+# Number of samples quantized at once. Bounds the size of float64 temporaries.
+_QUANTIZE_CHUNK_SIZE = 2 ** 18
+
+
+def quantize_samples(val, n_bits, out, value_range=None, shift=0, markers=None, markers_out=None):
+    """ Fused quantize-and-pack of normalized analog samples into a preallocated integer array.
+
+    Maps val linearly from (-1..1) (or from the symmetric peak range, if exceeded) onto signed
+    n_bits integers. The result is bit-exact with the former scipy.interpolate.interp1d mapping
+    (see _interp1d_quantize), including its dependence on the sample dtype if out of range.
+    Samples are processed in chunks, so only small float temporaries are created.
+
+    @param numpy.ndarray val: analog samples, normalized to (-1..1)
+    @param int n_bits: number of DAC bits. Eg. 8 bits -> int in [-128, 127]
+    @param numpy.ndarray out: integer output array (or strided view) with the size of val
+    @param tuple value_range: optional, (min, max) of val if already known
+    @param int shift: optional, left shift of the quantized values (e.g. for marker bits)
+    @param tuple markers: optional, two digital sample arrays converted like
+                          AWGM819X.bool_to_sample
+    @param numpy.ndarray markers_out: optional, array (view) to write the marker values to.
+                                      Marker values are added to out if None.
+
+    @return numpy.ndarray: out
+    """
+    val = np.asarray(val)
+    if value_range is None:
+        value_range = (np.min(val), np.max(val))
+    bitsize = int(2 ** n_bits)
+    min_intval = -bitsize / 2
+    max_intval = bitsize / 2 - 1
+
+    max_u_samples = 1
+    if max(abs(value_range[0]), abs(value_range[1])) > 1:
+        max_u_samples = max([abs(value_range[0]), value_range[1]])
+    x_range = np.array([-max_u_samples, max_u_samples])
+    # interp1d delegates to numpy.interp for float64 and int sampling points. Otherwise the
+    # difference to the lower sampling point is calculated in the sample dtype.
+    use_np_interp = x_range.dtype in (np.dtype(np.float64), np.dtype(int))
+    slope = np.float64(max_intval - min_intval) / np.float64(x_range[1] - x_range[0])
+    if use_np_interp:
+        x_lo = np.float64(x_range[0])
+        x_hi = np.float64(x_range[1])
+    else:
+        x_lo = x_range[0]
+
+    for start in range(0, val.size, _QUANTIZE_CHUNK_SIZE):
+        stop = min(start + _QUANTIZE_CHUNK_SIZE, val.size)
+        if use_np_interp:
+            chunk = val[start:stop].astype(np.float64)
+            at_max = chunk == x_hi
+            chunk -= x_lo
+        else:
+            chunk = np.subtract(val[start:stop], x_lo).astype(np.float64)
+            at_max = None
+        chunk *= slope
+        chunk += min_intval
+        if at_max is not None:
+            # numpy.interp returns the upper sampling point exactly
+            chunk[at_max] = max_intval
+        out_chunk = out[start:stop]
+        np.copyto(out_chunk, chunk, casting='unsafe')
+        if shift:
+            out_chunk <<= shift
+        if markers is not None:
+            bits = (0x1 & np.asarray(markers[0][start:stop]).astype(out.dtype)) + \
+                   (0x2 & (np.asarray(markers[1][start:stop]).astype(out.dtype) << 1))
+            if markers_out is None:
+                out_chunk += bits
+            else:
+                markers_out[start:stop] = bits
+    return out
+
+
+def _interp1d_quantize(val, n_bits):
+    """ Former mapping of AWGM819X onto n_bits integers via scipy.interpolate.interp1d. Kept as
+    reference for benchmark_sample_compilation.
+
+    @return numpy.ndarray: float64 values to be cast to the integer type
+    """
+    bitsize = int(2 ** n_bits)
+    min_intval = -bitsize / 2
+    max_intval = bitsize / 2 - 1
+
+    max_u_samples = 1  # data should be normalized in (-1..1)
+
+    if max(abs(val)) > 1:
+        biggest_val = max([abs(np.min(val)), np.max(val)])
+        max_u_samples = biggest_val
+    mapper = scipy.interpolate.interp1d([-max_u_samples, max_u_samples], [min_intval, max_intval])
+
+    return mapper(val)
+
+
+def benchmark_sample_compilation(number_of_samples=2 ** 24, n_bits_m8190a=14, peak=1.,
+                                 seed=None):
+    """ Compare the former (interp1d based) and the fused sample compilation of the M8190A,
+    M8195A and interleaved M8195A binary formats for random samples.
+
+    @param int number_of_samples: optional, number of analog samples
+    @param int n_bits_m8190a: optional, DAC resolution of the M8190A (12 or 14)
+    @param float peak: optional, peak amplitude of the analog samples (> 1 triggers normalization)
+    @param int seed: optional, random number generator seed
+
+    @return dict: model name -> (former duration in s, fused duration in s, bit-exact)
+    """
+    rng = np.random.default_rng(seed)
+    analog = (peak * rng.uniform(-1, 1, number_of_samples)).astype(np.float32)
+    d_ch1 = rng.random(number_of_samples) > 0.5
+    d_ch2 = rng.random(number_of_samples) > 0.5
+
+    def bool_to_sample(val_dch_1, val_dch_2, int_type_str):
+        return (0x1 & np.asarray(val_dch_1).astype(int_type_str)) + \
+               (0x2 & (np.asarray(val_dch_2).astype(int_type_str) << 1))
+
+    def former_m8190a():
+        a_samples = _interp1d_quantize(analog, n_bits_m8190a).astype('int16') << \
+                    (16 - n_bits_m8190a)
+        return a_samples + bool_to_sample(d_ch1, d_ch2, 'int16')
+
+    def fused_m8190a():
+        return quantize_samples(analog, n_bits_m8190a, np.empty(analog.size, dtype=np.int16),
+                                shift=16 - n_bits_m8190a, markers=(d_ch1, d_ch2))
+
+    def former_m8195a():
+        return _interp1d_quantize(analog, 8).astype('int8')
+
+    def fused_m8195a():
+        return quantize_samples(analog, 8, np.empty(analog.size, dtype=np.int8))
+
+    def former_m8195a_interleaved():
+        comb_samples = np.zeros(2 * analog.size, dtype=np.int8)
+        comb_samples[::2] = former_m8195a()
+        comb_samples[1::2] = bool_to_sample(d_ch1, d_ch2, 'int8')
+        return comb_samples
+
+    def fused_m8195a_interleaved():
+        comb_samples = np.empty(2 * analog.size, dtype=np.int8)
+        quantize_samples(analog, 8, comb_samples[::2], markers=(d_ch1, d_ch2),
+                         markers_out=comb_samples[1::2])
+        return comb_samples
+
+    results = dict()
+    for model, former, fused in (('M8190A', former_m8190a, fused_m8190a),
+                                 ('M8195A', former_m8195a, fused_m8195a),
+                                 ('M8195A interleaved', former_m8195a_interleaved,
+                                  fused_m8195a_interleaved)):
+        start = time.perf_counter()
+        former_samples = former()
+        former_duration = time.perf_counter() - start
+        start = time.perf_counter()
+        fused_samples = fused()
+        fused_duration = time.perf_counter() - start
+        results[model] = (former_duration,
+                          fused_duration,
+                          former_samples.dtype == fused_samples.dtype and
+                          np.array_equal(former_samples, fused_samples))
+    return results
+
 
 class AWGM819X(PulserInterface):
     """
@@ -77,6 +235,7 @@ class AWGM819X(PulserInterface):
 
         self._sequence_mode = False         # set in on_activate()
         self._debug_check_all_commands = False       # # For development purpose, might slow down
+        self._sample_buffer = None          # reused for compiling the binary samples of each channel
 
     @property
     @abstractmethod
@@ -139,6 +298,7 @@ class AWGM819X(PulserInterface):
         except:
             self.log.warning('Closing AWG connection using pyvisa failed.')
         self.log.info('Closed connection to AWG')
+        self._sample_buffer = None
 
     @abstractmethod
     def get_constraints(self):
@@ -1405,10 +1565,10 @@ class AWGM819X(PulserInterface):
         pass
 
     @abstractmethod
-    def float_to_sample(self, val):
+    def float_to_sample(self, val, out=None):
        pass
 
-    def _float_to_int(self, val, n_bits):
+    def _float_to_int(self, val, n_bits, out, shift=0, markers=None, markers_out=None):
 
         """
         :param val: np.array(dtype=float64) of sampled values from sequencegenerator.sample_pulse_block_ensemble().
@@ -1416,26 +1576,37 @@ class AWGM819X(PulserInterface):
                     If MW ampl in 'PulsedGui/Predefined methods' < as full Vpp, amplitude reduction will be
                     performed digitally (reducing the effective digital resolution in bits).
         :param n_bits: number of bits; sets the highest integer allowed. Eg. 8 bits -> int in [-128, 127]
-        :return:    np.array(dtype=int16)
+        :param out: preallocated np.array of the int type (or strided view) the samples are written to
+        :param shift: optional, left shift of the int values
+        :param markers: optional, (digital samples 1, digital samples 2) packed like bool_to_sample()
+        :param markers_out: optional, np.array (view) for the packed markers. Added to out if None.
+        :return:    out
         """
 
-        bitsize = int(2 ** n_bits)
-        min_intval = -bitsize / 2
-        max_intval = bitsize / 2 - 1
-
-        max_u_samples = 1  # data should be normalized in (-1..1)
-
-        if max(abs(val)) > 1:
+        val = np.asarray(val)
+        value_range = (np.min(val), np.max(val))
+        if max(abs(value_range[0]), abs(value_range[1])) > 1:
             self.log.warning("Samples from sequencegenerator out of range. Normalizing to -1..1. Please change the "
                              "maximum peak to peak Voltage in the Pulse Generator Settings if you want to use a higher "
                              "power.")
-            biggest_val = max([abs(np.min(val)), np.max(val)])
-            max_u_samples = biggest_val
         # manual 8.22.4 Waveform Data Format in Direct Mode
         # 2 bits LSB reserved for markers
-        mapper = scipy.interpolate.interp1d([-max_u_samples, max_u_samples], [min_intval, max_intval])
+        return quantize_samples(val, n_bits, out, value_range=value_range, shift=shift,
+                                markers=markers, markers_out=markers_out)
 
-        return mapper(val)
+    def _get_sample_buffer(self, size, dtype):
+        """
+        Returns an uninitialized array of the given size and dtype. The underlying memory is reused
+        for every call, so the array is only valid until the next call.
+        :param size: number of elements
+        :param dtype: numpy dtype
+        :return: np.array
+        """
+        dtype = np.dtype(dtype)
+        n_bytes = size * dtype.itemsize
+        if self._sample_buffer is None or self._sample_buffer.size < n_bytes:
+            self._sample_buffer = np.empty(n_bytes, dtype=np.uint8)
+        return self._sample_buffer[:n_bytes].view(dtype)
 
     def bool_to_sample(self, val_dch_1, val_dch_2, int_type_str='int16'):
         """
@@ -2315,18 +2486,17 @@ class AWGM8195A(AWGM819X):
         interleaved = self.interleaved_wavefile
         self.log.debug("Compiling samples for {}, interleaved: {}".format(ch_str, interleaved))
 
-        a_samples = self.float_to_sample(analog_samples[ch_str])
+        val = analog_samples[ch_str]
 
         if interleaved and ch_str == 'a_ch1':
-            d_samples = self.bool_to_sample(digital_samples['d_ch1'], digital_samples['d_ch2'],
-                                            int_type_str='int8')
             # the analog and digital samples are stored in the following format: a1, d1, a2, d2, a3, d3, ...
-            comb_samples = np.zeros(2 * a_samples.size, dtype=np.int8)
-            comb_samples[::2] =  a_samples
-            comb_samples[1::2] = d_samples
+            comb_samples = self._get_sample_buffer(2 * len(val), np.int8)
+            self._float_to_int(val, self._dac_resolution, comb_samples[::2],
+                               markers=(digital_samples['d_ch1'], digital_samples['d_ch2']),
+                               markers_out=comb_samples[1::2])
 
         else:
-            comb_samples = a_samples
+            comb_samples = self.float_to_sample(val, out=self._get_sample_buffer(len(val), np.int8))
 
         return comb_samples
 
@@ -2413,11 +2583,12 @@ class AWGM8195A(AWGM819X):
             else:
                 self.write('OUTP{0:d} OFF'.format(dch_num))
 
-    def float_to_sample(self, val):
+    def float_to_sample(self, val, out=None):
 
-        val_int = self._float_to_int(val, self._dac_resolution)
+        if out is None:
+            out = np.empty(len(val), dtype=np.int8)
 
-        return val_int.astype('int8')
+        return self._float_to_int(val, self._dac_resolution, out)
 
     def _define_new_sequence(self, name, num_steps):
         # no storage system for sequences on 8195a
@@ -2678,14 +2849,15 @@ class AWGM8190A(AWGM819X):
 
         marker = self.marker_on
 
-        a_samples = self.float_to_sample(analog_samples[ch_num])
-        marker_sample = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[0]]
-        marker_sync = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[1]]
-        d_samples = self.bool_to_sample(marker_sample, marker_sync, int_type_str='int16')
+        val = analog_samples[ch_num]
+        comb_samples = self._get_sample_buffer(len(val), np.int16)
         if marker:
-            comb_samples = a_samples + d_samples
+            marker_sample = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[0]]
+            marker_sync = digital_samples[self._analogue_ch_corresponding_digital_chs(ch_num)[1]]
+            self._float_to_int(val, self._dac_resolution, comb_samples,
+                               shift=16 - self._dac_resolution, markers=(marker_sample, marker_sync))
         else:
-            comb_samples = a_samples
+            self.float_to_sample(val, out=comb_samples)
 
         return comb_samples
 
@@ -2762,12 +2934,13 @@ class AWGM8190A(AWGM819X):
             else:
                 self.write('OUTP{0:d}:NORM OFF'.format(ach_num))
 
-    def float_to_sample(self, val):
+    def float_to_sample(self, val, out=None):
 
-        val_int = self._float_to_int(val, self._dac_resolution)
         shiftbits = 16 - self._dac_resolution  # 2 for marker, dac: 12 -> 2, dac: 14 -> 4
+        if out is None:
+            out = np.empty(len(val), dtype=np.int16)
 
-        return val_int.astype('int16') << shiftbits
+        return self._float_to_int(val, self._dac_resolution, out, shift=shiftbits)
 
     def _delete_all_sequences(self):
 
@@ -23,7 +23,6 @@ If not, see <https://www.gnu.org/licenses/>.
 import re
 import os
 import time
-from ftplib import FTP
 from fnmatch import fnmatch
 from collections import OrderedDict
 from socket import socket, AF_INET, SOCK_STREAM
@@ -31,6 +30,7 @@ from socket import socket, AF_INET, SOCK_STREAM
 from qudi.util.paths import get_appdata_dir
 from qudi.core.configoption import ConfigOption
 from qudi.interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
+from qudi.hardware.awg.ftp_session import FtpSessionPool
 
 
 class AWG5002C(PulserInterface):
@@ -51,6 +51,8 @@ class AWG5002C(PulserInterface):
             # ftp_root_dir: 'C:\\inetpub\\ftproot' # optional, root directory on AWG device
             # ftp_login: 'anonymous' # optional, the username for ftp login
             # ftp_passwd: 'anonymous@' # optional, the password for ftp login
+            # ftp_connections: 1 # optional, number of parallel FTP connections for uploads
+            # ftp_keepalive_interval: 30 # optional, keep-alive of idle FTP sessions after s
             # default_sample_rate: 600.0e6 # optional, the default sampling rate
     """
 
@@ -62,6 +64,8 @@ class AWG5002C(PulserInterface):
     ftp_root_directory = ConfigOption('ftp_root_dir', 'C:\\inetpub\\ftproot', missing='warn')
     user = ConfigOption('ftp_login', 'anonymous', missing='warn')
     passwd = ConfigOption('ftp_passwd', 'anonymous@', missing='warn')
+    ftp_connections = ConfigOption('ftp_connections', 1, missing='nothing')
+    ftp_keepalive_interval = ConfigOption('ftp_keepalive_interval', 30, missing='nothing')
     default_sample_rate = ConfigOption('default_sample_rate', missing='warn')
 
     def __init__(self, *args, **kwargs):
@@ -71,6 +75,7 @@ class AWG5002C(PulserInterface):
 
         self._marker_byte_dict = {0: b'\x00', 1: b'\x01', 2: b'\x02', 3: b'\x03'}
         self.current_loaded_asset = ''
+        self._ftp = None
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
@@ -91,9 +96,6 @@ class AWG5002C(PulserInterface):
         #   https://docs.python.org/3/library/socket.html#socket.socket.recv
         self.input_buffer = int(4096)   # buffer length for received text
 
-        # the ftp connection will be established during runtime if needed and
-        # closed directly afterwards. This makes the connection stable.
-
         if 'default_sample_rate' in config.keys():
             self._sample_rate = self.set_sample_rate(config['default_sample_rate'])
         else:
@@ -105,6 +107,15 @@ class AWG5002C(PulserInterface):
         # settings for remote access on the AWG PC
         self.asset_directory = '\\waves'
 
+        # the ftp connection will be established during runtime if needed and
+        # kept open for further file transfers. Broken connections are replaced.
+        self._ftp = FtpSessionPool(self.ip_address,
+                                   user=self.user,
+                                   passwd=self.passwd,
+                                   working_dir=self.asset_directory,
+                                   max_connections=self.ftp_connections,
+                                   keepalive_interval=self.ftp_keepalive_interval)
+
         if 'tmp_work_dir' in config.keys():
             self._tmp_work_dir = config['tmp_work_dir']
 
@@ -136,6 +147,9 @@ class AWG5002C(PulserInterface):
         self.soc.shutdown(0)  # tell the connection that the host will not listen
                               # any more to messages from it.
         self.soc.close()
+        if self._ftp is not None:
+            self._ftp.close()
+            self._ftp = None
 
     # =========================================================================
     # Below all the Pulser Interface routines.
@@ -307,8 +321,7 @@ class AWG5002C(PulserInterface):
                 upload_names.append(filename)
 
         # upload files
-        for name in upload_names:
-            self._send_file(name)
+        self._send_files(upload_names)
         return 0
 
     def _send_file(self, filename):
@@ -322,14 +335,25 @@ class AWG5002C(PulserInterface):
         Unused for digital pulse generators without sequence storage capability
         (PulseBlaster, FPGA).
         """
+        return self._send_files([filename])
+
+    def _send_files(self, filenames):
+        """ Sends several hardware specific waveform files to the pulse
+            generators waveform directory within one FTP session (or in
+            parallel if more than one FTP connection is configured).
 
-        filepath = os.path.join(self.host_waveform_directory, filename)
+        @param list filenames: The file names of the source files
 
-        with FTP(self.ip_address) as ftp:
-            ftp.login()  # login as default user anonymous, passwd anonymous@
-            ftp.cwd(self.asset_directory)
-            with open(filepath, 'rb') as uploaded_file:
-                ftp.storbinary('STOR '+filename, uploaded_file)
+        @return int: error code (0:OK, -1:error)
+        """
+        if not filenames:
+            return 0
+        filepaths = [os.path.join(self.host_waveform_directory, filename)
+                     for filename in filenames]
+        self._ftp.upload_files(list(zip(filepaths, filenames)),
+                               replace=False,
+                               parallel=self._ftp.max_connections > 1)
+        return 0
 
     def load_asset(self, asset_name, load_dict=None):
         """ Loads a sequence or waveform to the specified channel of the pulsing
@@ -964,11 +988,7 @@ class AWG5002C(PulserInterface):
                     files_to_delete.append(filename)
 
         # delete files
-        with FTP(self.ip_address) as ftp:
-            ftp.login() # login as default user anonymous, passwd anonymous@
-            ftp.cwd(self.asset_directory)
-            for filename in files_to_delete:
-                ftp.delete(filename)
+        self._ftp.delete_files(files_to_delete)
 
         # clear the AWG if the deleted asset is the currently loaded asset
         # if self.current_loaded_asset == asset_name:
@@ -987,17 +1007,12 @@ class AWG5002C(PulserInterface):
         """
 
         # check whether the desired directory exists:
-        with FTP(self.ip_address) as ftp:
-            ftp.login()  # login as default user anonymous, passwd anonymous@
-
-            try:
-                ftp.cwd(dir_path)
-            except:
-                self.log.info('Desired directory {0} not found on AWG device.\n'
-                              'Create new.'.format(dir_path))
-                ftp.mkd(dir_path)
+        if self._ftp.make_directory(dir_path):
+            self.log.info('Desired directory {0} not found on AWG device.\n'
+                          'Created new.'.format(dir_path))
 
         self.asset_directory = dir_path
+        self._ftp.working_dir = dir_path
         return 0
 
     def get_asset_dir_on_device(self):
@@ -1213,33 +1228,28 @@ class AWG5002C(PulserInterface):
         @return: list, The full filenames of all assets saved on the device.
         """
         filename_list = []
-        with FTP(self.ip_address) as ftp:
-            ftp.login()  # login as default user anonymous, passwd anonymous@
-            ftp.cwd(self.asset_directory)
-            # get only the files from the dir and skip possible directories
-            log =[]
-            file_list = []
-            ftp.retrlines('LIST', callback=log.append)
-            for line in log:
-                if '<DIR>' not in line:
-                    # that is how a potential line is looking like:
-                    #   '05-10-16  05:22PM                  292 SSR aom adjusted.seq'
-                    # One can see that the first part consists of the date
-                    # information. Remove those information and separate then
-                    # the first number, which indicates the size of the file,
-                    # from the following. That is necessary if the filename has
-                    # whitespaces in the name:
-                    size_filename = line[18:].lstrip()
-
-                    # split after the first appearing whitespace and take the
-                    # rest as filename, remove for safety all trailing
-                    # whitespaces:
-                    actual_filename = size_filename.split(' ', 1)[1].lstrip()
-                    file_list.append(actual_filename)
-            for filename in file_list:
-                if filename.endswith('.wfm') or filename.endswith('.seq'):
-                    if filename not in filename_list:
-                        filename_list.append(filename)
+        # get only the files from the dir and skip possible directories
+        file_list = []
+        for line in self._ftp.list_directory():
+            if '<DIR>' not in line:
+                # that is how a potential line is looking like:
+                #   '05-10-16  05:22PM                  292 SSR aom adjusted.seq'
+                # One can see that the first part consists of the date
+                # information. Remove those information and separate then
+                # the first number, which indicates the size of the file,
+                # from the following. That is necessary if the filename has
+                # whitespaces in the name:
+                size_filename = line[18:].lstrip()
+
+                # split after the first appearing whitespace and take the
+                # rest as filename, remove for safety all trailing
+                # whitespaces:
+                actual_filename = size_filename.split(' ', 1)[1].lstrip()
+                file_list.append(actual_filename)
+        for filename in file_list:
+            if filename.endswith('.wfm') or filename.endswith('.seq'):
+                if filename not in filename_list:
+                    filename_list.append(filename)
 
         return filename_list
 
@@ -23,18 +23,155 @@ If not, see <https://www.gnu.org/licenses/>.
 
 import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 try:
     import pyvisa as visa
 except ImportError:
     import visa
 import numpy as np
-from ftplib import FTP
 from lxml import etree as ET
 
 from qudi.core.configoption import ConfigOption
 from qudi.util.paths import get_appdata_dir
 from qudi.util.helpers import natural_sort
 from qudi.interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
+from qudi.hardware.awg.ftp_session import FtpSessionPool
+
+
+class _WfmxFileWriter:
+    """
+    Writes a .wfmx file chunk by chunk. Since the layout is known in advance (XML header, float32
+    analog samples, uint8 marker bytes), the file is preallocated and every chunk is written once
+    directly at its final offset.
+
+    The file can be streamed (read) from another thread while it is written. read() blocks until the
+    next bytes are written, so an upload can start with the first chunk. If no bytes are written
+    within read_timeout, streaming fails while writing can be continued.
+    """
+
+    def __init__(self, path, header, number_of_samples, markers_included, read_timeout=None):
+        """
+        @param str path: path of the .wfmx file to create (overwritten if present)
+        @param str header: XML header of the file
+        @param int number_of_samples: total number of samples of the waveform
+        @param bool markers_included: True if the file contains marker bytes
+        @param float read_timeout: optional, maximum time in s read() waits for new bytes
+                                   (None to wait indefinitely)
+        """
+        header_bytes = header.encode('utf8')
+        self.path = path
+        self.number_of_samples = int(number_of_samples)
+        self.markers_included = bool(markers_included)
+        self._analog_offset = len(header_bytes)
+        self._marker_offset = self._analog_offset + 4 * self.number_of_samples
+        self.size = self._marker_offset + (self.number_of_samples if markers_included else 0)
+
+        self._written_samples = 0
+        self._readable_bytes = self._analog_offset
+        self._read_position = 0
+        self._aborted = False
+        self._read_timeout = read_timeout
+        self._read_timed_out = False
+        self._condition = threading.Condition()
+        self._read_file = None
+
+        # Unbuffered, so each chunk is handed to the OS once and is immediately visible to readers
+        self._file = open(path, 'w+b', buffering=0)
+        self._file.truncate(self.size)
+        self._write_at(0, header_bytes)
+
+    @property
+    def written_samples(self):
+        return self._written_samples
+
+    @property
+    def is_complete(self):
+        return self._written_samples == self.number_of_samples
+
+    def write_chunk(self, analog_samples, marker_bytes=None):
+        """ Write the next chunk of samples to their final positions in the file.
+
+        @param numpy.ndarray analog_samples: float32 analog samples of the chunk
+        @param numpy.ndarray marker_bytes: uint8 marker bytes of the chunk (if markers included)
+        """
+        analog_samples = np.ascontiguousarray(analog_samples, dtype='<f4')
+        chunk_length = analog_samples.size
+        if self._written_samples + chunk_length > self.number_of_samples:
+            raise ValueError('Unable to write {0:d} samples to WFMX file "{1}". Only {2:d} of {3:d} '
+                             'samples left.'.format(chunk_length,
+                                                    self.path,
+                                                    self.number_of_samples - self._written_samples,
+                                                    self.number_of_samples))
+        if self.markers_included:
+            if marker_bytes is None or len(marker_bytes) != chunk_length:
+                raise ValueError('Number of marker bytes does not match number of analog samples '
+                                 'for WFMX file "{0}".'.format(self.path))
+            self._write_at(self._marker_offset + self._written_samples,
+                           np.ascontiguousarray(marker_bytes).view(np.uint8))
+        self._write_at(self._analog_offset + 4 * self._written_samples, analog_samples)
+
+        with self._condition:
+            self._written_samples += chunk_length
+            # Marker bytes follow the analog samples, so they become readable with the last chunk
+            if self.is_complete:
+                self._readable_bytes = self.size
+            else:
+                self._readable_bytes = self._analog_offset + 4 * self._written_samples
+            self._condition.notify_all()
+
+    def read(self, size=-1):
+        """ Read the next written bytes of the file. Blocks until bytes are available.
+
+        @param int size: optional, maximum number of bytes to read (all available if < 0)
+
+        @return bytes: file content, empty if the end of the file has been reached
+        """
+        with self._condition:
+            while self._read_position >= self._readable_bytes and not self._aborted and \
+                    not self._read_timed_out:
+                if self._read_position >= self.size:
+                    return b''
+                if not self._condition.wait(self._read_timeout):
+                    # Writing stalled, e.g. chunkwise sampling has been interrupted
+                    self._read_timed_out = True
+            if self._aborted:
+                raise IOError('Writing of WFMX file "{0}" has been aborted.'.format(self.path))
+            if self._read_timed_out:
+                raise IOError('No bytes written to WFMX file "{0}" within {1} s.'
+                              ''.format(self.path, self._read_timeout))
+            available = self._readable_bytes - self._read_position
+        if size is not None and size >= 0:
+            available = min(size, available)
+        if self._read_file is None:
+            self._read_file = open(self.path, 'rb', buffering=0)
+        self._read_file.seek(self._read_position)
+        data = self._read_file.read(available)
+        self._read_position += len(data)
+        if self._read_position >= self.size:
+            self._read_file.close()
+        return data
+
+    def abort(self):
+        """ Abort writing. Blocked and subsequent read() calls raise an IOError. """
+        with self._condition:
+            self._aborted = True
+            self._condition.notify_all()
+        self.close()
+
+    def close(self):
+        """ Close the file handle used for writing (and reading if the file has been read) """
+        self._file.close()
+        if self._read_file is not None and \
+                (self._aborted or self._read_timed_out or self._read_position >= self.size):
+            self._read_file.close()
+
+    def _write_at(self, offset, data):
+        view = memoryview(data).cast('B')
+        self._file.seek(offset)
+        while view:
+            written = self._file.write(view)
+            view = view[written:]
 
 
 class AWG70K(PulserInterface):
@@ -53,6 +190,10 @@ class AWG70K(PulserInterface):
             # ftp_root_dir: 'C:\\inetpub\\ftproot' # optional, root directory on AWG device
             # ftp_login: 'anonymous' # optional, the username for ftp login
             # ftp_passwd: 'anonymous@' # optional, the password for ftp login
+            # ftp_connections: 1 # optional, number of parallel FTP connections for uploads
+            # ftp_keepalive_interval: 30 # optional, keep-alive of idle FTP sessions after s
+            # stream_upload: True # optional, upload chunkwise written waveforms while writing
+            # stream_upload_timeout: 60 # optional, abort streamed upload if writing stalls for s
 
     """
 
@@ -66,6 +207,14 @@ class AWG70K(PulserInterface):
     _ftp_dir = ConfigOption(name='ftp_root_dir', default='C:\\inetpub\\ftproot', missing='warn')
     _username = ConfigOption(name='ftp_login', default='anonymous', missing='warn')
     _password = ConfigOption(name='ftp_passwd', default='anonymous@', missing='warn')
+    _ftp_connections = ConfigOption(name='ftp_connections', default=1, missing='nothing')
+    _ftp_keepalive_interval = ConfigOption(name='ftp_keepalive_interval',
+                                           default=30,
+                                           missing='nothing')
+    _stream_upload = ConfigOption(name='stream_upload', default=True, missing='nothing')
+    _stream_upload_timeout = ConfigOption(name='stream_upload_timeout',
+                                          default=60,
+                                          missing='nothing')
 
     # translation dict from qudi trigger descriptor to device command
     __event_triggers = {'OFF': 'OFF', 'A': 'ATR', 'B': 'BTR', 'INT': 'INT'}
@@ -80,6 +229,10 @@ class AWG70K(PulserInterface):
         self.awg_model = ''  # String describing the model
 
         self.ftp_working_dir = 'waves'  # subfolder of FTP root dir on AWG disk to work in
+        self._ftp = None  # FTP sessions to the AWG shared by all file transfers
+        self._wfmx_writers = dict()  # WFMX files currently written chunkwise (by filename)
+        self._wfmx_uploads = dict()  # Futures of WFMX files streamed to the AWG (by filename)
+        self._upload_executor = None
 
         self.__max_seq_steps = 0
         self.__max_seq_repetitions = 0
@@ -106,10 +259,17 @@ class AWG70K(PulserInterface):
             # set timeout by default to 30 sec
             self.awg.timeout = self._visa_timeout * 1000
 
-        # try connecting to AWG using FTP protocol
-        with FTP(self._ip_address) as ftp:
-            ftp.login(user=self._username, passwd=self._password)
-            ftp.cwd(self.ftp_working_dir)
+        # try connecting to AWG using FTP protocol. The session is kept open for file transfers.
+        self._ftp = FtpSessionPool(self._ip_address,
+                                   user=self._username,
+                                   passwd=self._password,
+                                   working_dir=self.ftp_working_dir,
+                                   max_connections=self._ftp_connections,
+                                   keepalive_interval=self._ftp_keepalive_interval)
+        with self._ftp.session() as ftp:
+            self.log.debug('FTP working dir: {0}'.format(ftp.pwd()))
+        self._upload_executor = ThreadPoolExecutor(max_workers=4,
+                                                   thread_name_prefix='AWG70K-upload')
 
         if self.awg is not None:
             self.awg_model = self.query('*IDN?').split(',')[1]
@@ -133,6 +293,16 @@ class AWG70K(PulserInterface):
             self.awg.close()
         except:
             self.log.debug('Closing AWG connection using pyvisa failed.')
+        for writer in self._wfmx_writers.values():
+            writer.abort()
+        self._wfmx_writers.clear()
+        if self._upload_executor is not None:
+            self._upload_executor.shutdown(wait=True)
+            self._upload_executor = None
+        self._wfmx_uploads.clear()
+        if self._ftp is not None:
+            self._ftp.close()
+            self._ftp = None
         self.log.info('Closed connection to AWG')
         return
 
@@ -365,7 +535,16 @@ class AWG70K(PulserInterface):
                                      set(analog_samples.keys()).union(set(digital_samples.keys()))))
             return -1, waveforms
 
+        # Unfinished WFMX files of an interrupted chunkwise write process would block their streamed
+        # uploads (and the FTP connections) until the upload timeout.
+        if is_first_chunk:
+            for filename in list(self._wfmx_writers):
+                self.log.warning('Aborting unfinished write process of WFMX file "{0}".'
+                                 ''.format(filename))
+                self._abort_wfmx_writer(filename)
+
         # Write waveforms. One for each analog channel.
+        wfm_names = list()
         for a_ch in active_analog:
             # Get the integer analog channel number
             a_ch_num = int(a_ch.split('ch')[-1])
@@ -390,7 +569,7 @@ class AWG70K(PulserInterface):
             wfm_name = '{0}_ch{1:d}'.format(name, a_ch_num)
 
             # Check if waveform already exists and delete if necessary.
-            if wfm_name in self.get_waveform_names():
+            if is_first_chunk and wfm_name in self.get_waveform_names():
                 self.delete_waveform(wfm_name)
 
             # Write WFMX file for waveform
@@ -402,12 +581,24 @@ class AWG70K(PulserInterface):
                              is_last_chunk=is_last_chunk,
                              total_number_of_samples=total_number_of_samples)
             self.log.debug('Write WFMX file: {0}'.format(time.time() - start))
+            wfm_names.append(wfm_name)
+
+        chunk_length = len(analog_samples[active_analog[0]])
+        # The waveforms can only be loaded once the WFMX files are complete
+        if not is_last_chunk:
+            return chunk_length, waveforms
+
+        # transfer all waveforms to AWG. Files streamed to the AWG while writing only need to
+        # finish their upload.
+        start = time.time()
+        wfmx_files = [wfm_name + '.wfmx' for wfm_name in wfm_names]
+        pending_files = [file for file in wfmx_files if not self._finish_stream_upload(file)]
+        if pending_files and self._send_files(pending_files) < 0:
+            return -1, waveforms
+        self.log.debug('Send WFMX files: {0}'.format(time.time() - start))
 
-            # transfer waveform to AWG and load into workspace
-            start = time.time()
-            self._send_file(filename=wfm_name + '.wfmx')
-            self.log.debug('Send WFMX file: {0}'.format(time.time() - start))
-
+        # load waveforms into workspace
+        for wfm_name in wfm_names:
             start = time.time()
             self.write('MMEM:OPEN "{0}"'.format(os.path.join(
                 self._ftp_dir, self.ftp_working_dir, wfm_name + '.wfmx')))
@@ -428,7 +619,7 @@ class AWG70K(PulserInterface):
 
             # Append created waveform name to waveform list
             waveforms.append(wfm_name)
-        return total_number_of_samples, waveforms
+        return chunk_length, waveforms
 
     def write_sequence(self, name, sequence_parameter_list):
         """
@@ -1515,24 +1706,19 @@ class AWG70K(PulserInterface):
         @return list: filenames found in <ftproot>\\waves
         """
         filename_list = list()
-        with FTP(self._ip_address) as ftp:
-            ftp.login(user=self._username, passwd=self._password)
-            ftp.cwd(self.ftp_working_dir)
-            # get only the files from the dir and skip possible directories
-            log = list()
-            ftp.retrlines('LIST', callback=log.append)
-            for line in log:
-                if '<DIR>' not in line:
-                    # that is how a potential line is looking like:
-                    #   '05-10-16  05:22PM                  292 SSR aom adjusted.seq'
-                    # The first part consists of the date information. Remove this information and
-                    # separate the first number, which indicates the size of the file. This is
-                    # necessary if the filename contains whitespaces.
-                    size_filename = line[18:].lstrip()
-                    # split after the first appearing whitespace and take the rest as filename.
-                    # Remove for safety all trailing and leading whitespaces:
-                    filename = size_filename.split(' ', 1)[1].strip()
-                    filename_list.append(filename)
+        # get only the files from the dir and skip possible directories
+        for line in self._ftp.list_directory():
+            if '<DIR>' not in line:
+                # that is how a potential line is looking like:
+                #   '05-10-16  05:22PM                  292 SSR aom adjusted.seq'
+                # The first part consists of the date information. Remove this information and
+                # separate the first number, which indicates the size of the file. This is
+                # necessary if the filename contains whitespaces.
+                size_filename = line[18:].lstrip()
+                # split after the first appearing whitespace and take the rest as filename.
+                # Remove for safety all trailing and leading whitespaces:
+                filename = size_filename.split(' ', 1)[1].strip()
+                filename_list.append(filename)
         return filename_list
 
     def _delete_file(self, filename):
@@ -1540,49 +1726,65 @@ class AWG70K(PulserInterface):
 
         @param str filename:
         """
-        if filename in self._get_filenames_on_device():
-            with FTP(self._ip_address) as ftp:
-                ftp.login(user=self._username, passwd=self._password)
-                ftp.cwd(self.ftp_working_dir)
-                ftp.delete(filename)
+        self._delete_files([filename])
         return
 
+    def _delete_files(self, filenames):
+        """ Delete several files from the FTP working dir within one FTP session.
+
+        @param list filenames: The full filenames to delete. Files not present are skipped.
+
+        @return list: deleted filenames
+        """
+        return self._ftp.delete_files(filenames, ignore_missing=True)
+
     def _send_file(self, filename):
         """
 
         @param filename:
         @return:
         """
+        return self._send_files([filename])
+
+    def _send_files(self, filenames):
+        """ Upload several files from the tmp_work_dir to the AWG, replacing old files on the AWG by
+        the same filename. The files are transferred within one FTP session, or in parallel if
+        more than one FTP connection is configured.
+
+        @param list filenames: filenames in tmp_work_dir
+        @return int: error code (0:OK, -1:error)
+        """
         # check input
-        if not filename:
+        if not filenames or not all(filenames):
             self.log.error('No filename provided for file upload to awg!\nCommand will be ignored.')
             return -1
 
-        filepath = os.path.join(self._tmp_work_dir, filename)
-        if not os.path.isfile(filepath):
-            self.log.error('No file "{0}" found in "{1}". Unable to upload!'
-                           ''.format(filename, self._tmp_work_dir))
-            return -1
-
-        # Delete old file on AWG by the same filename
-        self._delete_file(filename)
+        filepaths = [os.path.join(self._tmp_work_dir, filename) for filename in filenames]
+        for filename, filepath in zip(filenames, filepaths):
+            if not os.path.isfile(filepath):
+                self.log.error('No file "{0}" found in "{1}". Unable to upload!'
+                               ''.format(filename, self._tmp_work_dir))
+                return -1
 
-        # Transfer file
-        with FTP(self._ip_address) as ftp:
-            ftp.login(user=self._username, passwd=self._password)
-            ftp.cwd(self.ftp_working_dir)
-            with open(filepath, 'rb') as file:
-                ftp.storbinary('STOR ' + filename, file)
+        # Transfer files and delete old files on AWG by the same filename
+        self._ftp.upload_files(list(zip(filepaths, filenames)),
+                               replace=True,
+                               parallel=self._ftp.max_connections > 1)
         return 0
 
     def _write_wfmx(self, filename, analog_samples, marker_bytes, is_first_chunk, is_last_chunk,
                     total_number_of_samples):
         """
-        Appends a sampled chunk of a whole waveform to a wfmx-file. Create the file
+        Writes a sampled chunk of a whole waveform to a wfmx-file. Create the file
         if it is the first chunk.
         If both flags (is_first_chunk, is_last_chunk) are set to TRUE it means
         that the whole ensemble is written as a whole in one big chunk.
 
+        The file is preallocated with the first chunk and the analog samples and marker bytes of
+        each chunk are written directly to their final position. If the waveform is written in
+        several chunks and ConfigOption stream_upload is set, the upload of the file to the AWG
+        starts with the first chunk (see _finish_stream_upload).
+
         @param name: string, represents the name of the sampled ensemble
         @param analog_samples: dict containing float32 numpy ndarrays, contains the
                                        samples for the analog channels that
@@ -1600,56 +1802,77 @@ class AWG70K(PulserInterface):
         @return list: the list contains the string names of the created files for the passed
                       presampled arrays
         """
-        # The memory overhead of the tmp file write/read process in bytes. Only used if wfmx file is
-        # written in chunks in order to avoid excessive memory usage.
-        tmp_bytes_overhead = 16777216  # 16 MB
-
         if not filename.endswith('.wfmx'):
             filename += '.wfmx'
         wfmx_path = os.path.join(self._tmp_work_dir, filename)
-        tmp_path = os.path.join(self._tmp_work_dir, 'digital_tmp.bin')
 
-        # if it is the first chunk, create the .WFMX file with header.
+        # if it is the first chunk, create the preallocated .WFMX file with header.
         if is_first_chunk:
-            # create header
+            # Abort a previous, unfinished write process of this file
+            self._abort_wfmx_writer(filename)
             header = self._create_xml_header(total_number_of_samples, marker_bytes is not None)
-            # write header
-            with open(wfmx_path, 'wb') as wfmxfile:
-                wfmxfile.write(header.encode('utf8'))
-            # Check if a tmp digital samples file is present and delete it if necessary.
-            if os.path.isfile(tmp_path):
-                os.remove(tmp_path)
-
-        # append analog samples to the .WFMX file.
-        # Write digital samples in temporary file if not the entire samples are passed at once.
-        with open(wfmx_path, 'ab') as wfmxfile:
-            # append analog samples in binary format. One sample is 4 bytes (np.float32).
-            wfmxfile.write(analog_samples)
-
-        # Write digital samples to tmp file if chunkwise writing is used and it's not the last chunk
-        if not is_last_chunk and marker_bytes is not None:
-            with open(tmp_path, 'ab') as tmp_file:
-                tmp_file.write(marker_bytes)
-
-        # If this is the last chunk, write digital samples from tmp file to wfmx file (if present)
-        # and also append the currently passed digital samples to wfmx file.
-        # Read from tmp file in chunks of tmp_bytes_overhead in order to avoid too much memory
-        # overhead.
-        if is_last_chunk and marker_bytes is not None:
-            with open(wfmx_path, 'ab') as wfmxfile:
-                # Copy over digital samples from tmp file. Delete tmp file afterwards.
-                if os.path.isfile(tmp_path):
-                    with open(tmp_path, 'rb') as tmp_file:
-                        while True:
-                            tmp = tmp_file.read(tmp_bytes_overhead)
-                            if not tmp:
-                                break
-                            wfmxfile.write(tmp)
-                    os.remove(tmp_path)
-                # Append current digital samples array to wfmx file
-                wfmxfile.write(marker_bytes)
+            writer = _WfmxFileWriter(wfmx_path,
+                                     header=header,
+                                     number_of_samples=total_number_of_samples,
+                                     markers_included=marker_bytes is not None,
+                                     read_timeout=self._stream_upload_timeout)
+            self._wfmx_writers[filename] = writer
+            if self._stream_upload and not is_last_chunk:
+                self._wfmx_uploads[filename] = self._upload_executor.submit(
+                    self._ftp.upload_stream, filename, writer, replace=True, blocksize=1048576
+                )
+        else:
+            writer = self._wfmx_writers.get(filename)
+            if writer is None:
+                raise RuntimeError('Unable to append samples to WFMX file "{0}". The first chunk '
+                                   'has not been written.'.format(filename))
+
+        try:
+            writer.write_chunk(analog_samples, marker_bytes)
+        except:
+            self._abort_wfmx_writer(filename)
+            raise
+
+        if is_last_chunk:
+            if not writer.is_complete:
+                self._abort_wfmx_writer(filename)
+                raise ValueError('WFMX file "{0}" is incomplete after the last chunk ({1:d} of '
+                                 '{2:d} samples written).'.format(filename,
+                                                                  writer.written_samples,
+                                                                  total_number_of_samples))
+            del self._wfmx_writers[filename]
+            writer.close()
         return
 
+    def _finish_stream_upload(self, filename):
+        """
+        Waits for the upload of a WFMX file streamed to the AWG while writing.
+
+        @param str filename: The full filename of the WFMX file
+
+        @return bool: True if the file has been uploaded, False if it was not streamed or the
+                      upload failed (file needs to be sent again).
+        """
+        upload = self._wfmx_uploads.pop(filename, None)
+        if upload is None:
+            return False
+        try:
+            upload.result()
+        except Exception:
+            self.log.exception('Streamed upload of WFMX file "{0}" failed. Sending the complete '
+                               'file instead.'.format(filename))
+            return False
+        return True
+
+    def _abort_wfmx_writer(self, filename):
+        """ Aborts an unfinished chunkwise write process (and streamed upload) of a WFMX file. """
+        writer = self._wfmx_writers.pop(filename, None)
+        if writer is not None:
+            writer.abort()
+        upload = self._wfmx_uploads.pop(filename, None)
+        if upload is not None:
+            upload.cancel()
+
     def _create_xml_header(self, number_of_samples, markers_active):
         """
         This function creates an xml file containing the header for the wfmx-file format using
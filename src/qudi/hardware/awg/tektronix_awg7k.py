@@ -28,12 +28,12 @@ try:
 except ImportError:
     import visa
 import numpy as np
-from ftplib import FTP
 
 from qudi.util.paths import get_appdata_dir
 from qudi.util.helpers import natural_sort
 from qudi.core.configoption import ConfigOption
 from qudi.interface.pulser_interface import PulserInterface, PulserConstraints, SequenceOption
+from qudi.hardware.awg.ftp_session import FtpSessionPool
 
 
 class AWG7k(PulserInterface):
@@ -52,6 +52,8 @@ class AWG7k(PulserInterface):
             # ftp_root_dir: 'C:\\inetpub\\ftproot' # optional, root directory on AWG device
             # ftp_login: 'anonymous' # optional, the username for ftp login
             # ftp_passwd: 'anonymous@' # optional, the password for ftp login
+            # ftp_connections: 1 # optional, number of parallel FTP connections for uploads
+            # ftp_keepalive_interval: 30 # optional, keep-alive of idle FTP sessions after s
 
     """
 
@@ -65,6 +67,10 @@ class AWG7k(PulserInterface):
     _username = ConfigOption(name='ftp_login', default='anonymous', missing='warn')
     _password = ConfigOption(name='ftp_passwd', default='anonymous@', missing='warn')
     _visa_timeout = ConfigOption(name='timeout', default=30, missing='nothing')
+    _ftp_connections = ConfigOption(name='ftp_connections', default=1, missing='nothing')
+    _ftp_keepalive_interval = ConfigOption(name='ftp_keepalive_interval',
+                                           default=30,
+                                           missing='nothing')
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -75,6 +81,7 @@ class AWG7k(PulserInterface):
         self.awg = None  # This variable will hold a reference to the awg visa resource
 
         self.ftp_working_dir = 'waves'  # subfolder of FTP root dir on AWG disk to work in
+        self._ftp = None  # FTP sessions to the AWG shared by all file transfers
 
         self.installed_options = list()  # will hold the encoded installed options available on awg
         self._internal_ch_state = {
@@ -106,10 +113,14 @@ class AWG7k(PulserInterface):
                 'the connection by using for example "Agilent Connection Expert".'
                 ''.format(self._visa_address))
 
-        # try connecting to AWG using FTP protocol
-        with FTP(self._ip_address) as ftp:
-            ftp.login(user=self._username, passwd=self._password)
-            ftp.cwd(self.ftp_working_dir)
+        # try connecting to AWG using FTP protocol. The session is kept open for file transfers.
+        self._ftp = FtpSessionPool(self._ip_address,
+                                   user=self._username,
+                                   passwd=self._password,
+                                   working_dir=self.ftp_working_dir,
+                                   max_connections=self._ftp_connections,
+                                   keepalive_interval=self._ftp_keepalive_interval)
+        with self._ftp.session() as ftp:
             self.log.debug('FTP working dir: {0}'.format(ftp.pwd()))
 
         idn = self.query('*IDN?').split(',')
@@ -139,6 +150,9 @@ class AWG7k(PulserInterface):
             self.awg.close()
         except:
             self.log.debug('Closing AWG connection using pyvisa failed.')
+        if self._ftp is not None:
+            self._ftp.close()
+            self._ftp = None
         self.log.info('Closed connection to AWG')
         return
 
@@ -969,6 +983,7 @@ class AWG7k(PulserInterface):
             return -1, waveforms
 
         # Write waveforms. One for each analog channel.
+        wfm_names = list()
         for a_ch in active_analog:
             # Get the integer analog channel number
             a_ch_num = int(a_ch.rsplit('ch', 1)[1])
@@ -1002,12 +1017,16 @@ class AWG7k(PulserInterface):
                             total_number_of_samples=total_number_of_samples)
 
             self.log.debug('Write WFM file: {0}'.format(time.time() - start))
+            wfm_names.append(wfm_name)
 
-            # transfer waveform to AWG and load into workspace
-            start = time.time()
-            self._send_file(filename=wfm_name + '.wfm')
-            self.log.debug('Send WFM file: {0}'.format(time.time() - start))
+        # transfer all waveforms to AWG at once
+        start = time.time()
+        if self._send_files([wfm_name + '.wfm' for wfm_name in wfm_names]) < 0:
+            return -1, waveforms
+        self.log.debug('Send WFM files: {0}'.format(time.time() - start))
 
+        # load waveforms into workspace
+        for wfm_name in wfm_names:
             start = time.time()
             self.write('MMEM:IMP "{0}","{1}",WFM'.format(wfm_name, wfm_name + '.wfm'))
             # Wait for everything to complete
@@ -1270,39 +1289,50 @@ class AWG7k(PulserInterface):
 
         @param str filename: The full filename to delete from FTP cwd
         """
-        if filename in self._get_filenames_on_device():
-            with FTP(self._ip_address) as ftp:
-                ftp.login(user=self._username, passwd=self._password)
-                ftp.cwd(self.ftp_working_dir)
-                ftp.delete(filename)
+        self._delete_files([filename])
         return
 
+    def _delete_files(self, filenames):
+        """ Delete several files from the FTP working dir within one FTP session.
+
+        @param list filenames: The full filenames to delete. Files not present are skipped.
+
+        @return list: deleted filenames
+        """
+        return self._ftp.delete_files(filenames, ignore_missing=True)
+
     def _send_file(self, filename):
         """
 
         @param filename:
         @return:
         """
+        return self._send_files([filename])
+
+    def _send_files(self, filenames):
+        """ Upload several files from the tmp_work_dir to the AWG, replacing old files on the AWG by
+        the same filename. The files are transferred within one FTP session, or in parallel if
+        more than one FTP connection is configured.
+
+        @param list filenames: filenames in tmp_work_dir
+        @return int: error code (0:OK, -1:error)
+        """
         # check input
-        if not filename:
+        if not filenames or not all(filenames):
             self.log.error('No filename provided for file upload to awg!\nCommand will be ignored.')
             return -1
 
-        filepath = os.path.join(self._tmp_work_dir, filename)
-        if not os.path.isfile(filepath):
-            self.log.error('No file "{0}" found in "{1}". Unable to upload!'
-                           ''.format(filename, self._tmp_work_dir))
-            return -1
-
-        # Delete old file on AWG by the same filename
-        self._delete_file(filename)
+        filepaths = [os.path.join(self._tmp_work_dir, filename) for filename in filenames]
+        for filename, filepath in zip(filenames, filepaths):
+            if not os.path.isfile(filepath):
+                self.log.error('No file "{0}" found in "{1}". Unable to upload!'
+                               ''.format(filename, self._tmp_work_dir))
+                return -1
 
-        # Transfer file
-        with FTP(self._ip_address) as ftp:
-            ftp.login(user=self._username, passwd=self._password)
-            ftp.cwd(self.ftp_working_dir)
-            with open(filepath, 'rb') as file:
-                ftp.storbinary('STOR ' + filename, file)
+        # Transfer files and delete old files on AWG by the same filename
+        self._ftp.upload_files(list(zip(filepaths, filenames)),
+                               replace=True,
+                               parallel=self._ftp.max_connections > 1)
         return 0
 
     def _get_filenames_on_device(self):
@@ -1311,24 +1341,19 @@ class AWG7k(PulserInterface):
         @return list: filenames found in <ftproot>\\waves
         """
         filename_list = list()
-        with FTP(self._ip_address) as ftp:
-            ftp.login(user=self._username, passwd=self._password)
-            ftp.cwd(self.ftp_working_dir)
-            # get only the files from the dir and skip possible directories
-            log = list()
-            ftp.retrlines('LIST', callback=log.append)
-            for line in log:
-                if '<DIR>' not in line:
-                    # that is how a potential line is looking like:
-                    #   '05-10-16  05:22PM                  292 SSR aom adjusted.seq'
-                    # The first part consists of the date information. Remove this information and
-                    # separate the first number, which indicates the size of the file. This is
-                    # necessary if the filename contains whitespaces.
-                    size_filename = line[18:].lstrip()
-                    # split after the first appearing whitespace and take the rest as filename.
-                    # Remove for safety all trailing and leading whitespaces:
-                    filename = size_filename.split(' ', 1)[1].strip()
-                    filename_list.append(filename)
+        # get only the files from the dir and skip possible directories
+        for line in self._ftp.list_directory():
+            if '<DIR>' not in line:
+                # that is how a potential line is looking like:
+                #   '05-10-16  05:22PM                  292 SSR aom adjusted.seq'
+                # The first part consists of the date information. Remove this information and
+                # separate the first number, which indicates the size of the file. This is
+                # necessary if the filename contains whitespaces.
+                size_filename = line[18:].lstrip()
+                # split after the first appearing whitespace and take the rest as filename.
+                # Remove for safety all trailing and leading whitespaces:
+                filename = size_filename.split(' ', 1)[1].strip()
+                filename_list.append(filename)
         return filename_list
 
     def _get_all_channels(self):
@@ -60,6 +60,7 @@ class FastCounterDummy(FastCounterInterface):
         self.statusvar = 0
         self._binwidth = 1
         self._gate_length_bins = 8192
+        self._count_data_polled = False
         return
 
     def on_deactivate(self):
@@ -155,6 +156,7 @@ class FastCounterDummy(FastCounterInterface):
 
         if self._gated:
             self._count_data = self._count_data.transpose()
+        self._count_data_polled = False
         return 0
 
     def pause_measure(self):
@@ -223,6 +225,27 @@ class FastCounterDummy(FastCounterInterface):
         info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
         return self._count_data, info_dict
 
+    @property
+    def supports_data_trace_increment(self):
+        return True
+
+    def get_data_trace_increment(self):
+        """ Polls the counts acquired since the last call of this method.
+
+        The dummy trace is static, so the complete trace is returned after the start of the
+        measurement and only zeros afterwards.
+
+        @return tuple(numpy.ndarray, info_dict): count data increment and info_dict (see
+                                                 get_data_trace)
+        """
+        # include an artificial waiting time
+        time.sleep(0.5)
+        info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
+        if self._count_data_polled:
+            return np.zeros_like(self._count_data), info_dict
+        self._count_data_polled = True
+        return self._count_data, info_dict
+
     def get_frequency(self):
         freq = 950.
         time.sleep(0.5)
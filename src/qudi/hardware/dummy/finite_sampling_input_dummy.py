@@ -28,6 +28,8 @@ from qudi.interface.finite_sampling_input_interface import FiniteSamplingInputIn
 from qudi.interface.finite_sampling_input_interface import FiniteSamplingInputConstraints
 from qudi.util.mutex import RecursiveMutex
 from qudi.core.configoption import ConfigOption
+from qudi.core.connector import Connector
+from qudi.util.enums import SamplingOutputMode
 
 
 class SimulationMode(Enum):
@@ -51,8 +53,17 @@ class FiniteSamplingInputDummy(FiniteSamplingInputInterface):
             channel_units:
                 'APD counts': 'c/s'
                 'Photodiode': 'V'
+        connect:
+            microwave: <microwave_name>  # optional, see below
+
+    If a (dummy) microwave source is connected, ODMR spectra are simulated from the scan frequencies
+    of the microwave source. The scan is assumed to restart after the last frequency, so frames can
+    contain multiple frequency sweeps. Without microwave source a single resonance is simulated in
+    the middle of each frame.
     """
 
+    _microwave = Connector(name='microwave', interface='MicrowaveInterface', optional=True)
+
     _sample_rate_limits = ConfigOption(name='sample_rate_limits', default=(1, 1e6))
     _frame_size_limits = ConfigOption(name='frame_size_limits', default=(1, 1e9))
     _channel_units = ConfigOption(name='channel_units',
@@ -233,6 +244,15 @@ class FiniteSamplingInputDummy(FiniteSamplingInputInterface):
         if length < 3:
             self.__simulate_random(length)
             return
+        microwave = self._microwave()
+        if microwave is not None and microwave.scan_frequencies is not None:
+            if microwave.scan_mode == SamplingOutputMode.EQUIDISTANT_SWEEP:
+                frequencies = np.linspace(*microwave.scan_frequencies)
+            else:
+                frequencies = np.asarray(microwave.scan_frequencies, dtype=np.float64)
+            # Restart scan after the last frequency
+            self.__simulate_odmr_spectrum(np.resize(frequencies, length))
+            return
         gamma = 2
         data = dict()
         x = np.arange(length, dtype=np.float64)
@@ -244,3 +264,21 @@ class FiniteSamplingInputDummy(FiniteSamplingInputInterface):
             data[ch] = offset + (np.random.rand(length) - 0.5) * noise - amp * gamma ** 2 / (
                     (x - pos) ** 2 + gamma ** 2)
         self.__simulated_samples = data
+
+    def __simulate_odmr_spectrum(self, frequencies):
+        # Simulate the same resonance in all frames
+        if not self.__simulated_odmr_params:
+            self.__simulated_odmr_params = {
+                'position': 2.87e9 + (np.random.rand() - 0.5) * 10e6,
+                'linewidth': 5e6
+            }
+        pos = self.__simulated_odmr_params['position']
+        gamma = self.__simulated_odmr_params['linewidth'] / 2
+        data = dict()
+        for ch in self._active_channels:
+            offset = ((np.random.rand() - 0.5) * 0.05 + 1) * 200000
+            amp = offset / 20
+            noise = amp / 2
+            lorentzian = gamma ** 2 / ((frequencies - pos) ** 2 + gamma ** 2)
+            data[ch] = offset + (np.random.rand(frequencies.size) - 0.5) * noise - amp * lorentzian
+        self.__simulated_samples = data
@@ -349,7 +349,6 @@ class ScanningProbeDummy(ScanningProbeInterface):
                         sim_data = d
             else:
                 sim_data = self._spots[self._current_scan_axes]
-            number_of_spots = sim_data['count']
             positions = sim_data['pos']
             amplitudes = sim_data['amp']
             sigmas = sim_data['sigma']
@@ -364,34 +363,21 @@ class ScanningProbeDummy(ScanningProbeInterface):
                                        self._current_scan_resolution[1])
             else:
                 y_values = np.linspace(self._current_position['y'], self._current_position['y'], 1)
-            xy_grid = np.meshgrid(x_values, y_values, indexing='ij')
 
+            # Only render spots close to the scan area
             include_dist = self._spot_size_dist[0] + 5 * self._spot_size_dist[1]
+            include = (positions[:, 0] >= x_values[0] - include_dist) & \
+                      (positions[:, 0] <= x_values[-1] + include_dist) & \
+                      (positions[:, 1] >= y_values[0] - include_dist) & \
+                      (positions[:, 1] <= y_values[-1] + include_dist)
+            spot_image = self._render_gaussian_spots(x_values,
+                                                     y_values,
+                                                     amp=amplitudes[include],
+                                                     pos=positions[include],
+                                                     sigma=sigmas[include],
+                                                     theta=thetas[include])
             self._scan_image = np.random.uniform(0, 2e4, self._current_scan_resolution)
-            for i in range(number_of_spots):
-                if positions[i][0] < self._current_scan_ranges[0][0] - include_dist:
-                    continue
-                if positions[i][0] > self._current_scan_ranges[0][1] + include_dist:
-                    continue
-                if len(self._current_scan_axes) == 1:
-                    if positions[i][1] < self._current_position['y'] - include_dist:
-                        continue
-                    if positions[i][1] > self._current_position['y'] + include_dist:
-                        continue
-                else:
-                    if positions[i][1] < self._current_scan_ranges[1][0] - include_dist:
-                        continue
-                    if positions[i][1] > self._current_scan_ranges[1][1] + include_dist:
-                        continue
-                gauss = self._gaussian_2d(xy_grid,
-                                          amp=amplitudes[i],
-                                          pos=positions[i],
-                                          sigma=sigmas[i],
-                                          theta=thetas[i])
-                if len(self._current_scan_axes) == 1:
-                    self._scan_image += gauss[:, 0]
-                else:
-                    self._scan_image += gauss
+            self._scan_image += spot_image.reshape(self._current_scan_resolution)
 
             if self._constraints.has_position_feedback:
                 feedback_axes = tuple(self._constraints.axes.values())
@@ -507,6 +493,59 @@ class ScanningProbeDummy(ScanningProbeInterface):
         else:
             self.__update_timer.stop()
 
+    def _render_gaussian_spots(self, x_values, y_values, amp, pos, sigma, theta):
+        """ Render the sum of 2D gaussian spots (see _gaussian_2d) on the grid of x_values and
+        y_values. Each spot is only evaluated within a window of +-6 sigma around its position
+        (truncation error < 1e-7 * amp). All spots are evaluated at once in chunks.
+
+        @param numpy.ndarray x_values: equidistant grid values of first axis
+        @param numpy.ndarray y_values: equidistant grid values of second axis
+        @param numpy.ndarray amp: spot amplitudes, shape (n,)
+        @param numpy.ndarray pos: spot positions, shape (n, 2)
+        @param numpy.ndarray sigma: spot sizes, shape (n, 2)
+        @param numpy.ndarray theta: spot angles, shape (n,)
+
+        @return numpy.ndarray: image with shape (x_values.size, y_values.size)
+        """
+        image = np.zeros(x_values.size * y_values.size)
+        if amp.size == 0:
+            return image.reshape((x_values.size, y_values.size))
+
+        # Grid index of each spot position and index offsets of the evaluation window
+        window_size = 6 * np.max(np.abs(sigma))
+        indices = list()
+        for ii, values in enumerate((x_values, y_values)):
+            step = (values[-1] - values[0]) / (values.size - 1) if values.size > 1 else 0
+            if step == 0:
+                center = np.zeros(amp.size, dtype=int)
+                half_width = values.size - 1
+            else:
+                center = np.round((pos[:, ii] - values[0]) / step).astype(int)
+                half_width = min(values.size, int(np.ceil(window_size / abs(step))))
+            indices.append(center[:, np.newaxis] + np.arange(-half_width, half_width + 1))
+        x_indices, y_indices = indices
+
+        # Limit memory consumption by evaluating chunks of spots
+        chunk_size = max(1, 2**22 // (x_indices.shape[1] * y_indices.shape[1]))
+        for start in range(0, amp.size, chunk_size):
+            chunk = slice(start, start + chunk_size)
+            x_index = x_indices[chunk, :, np.newaxis]
+            y_index = y_indices[chunk, np.newaxis, :]
+            valid = (x_index >= 0) & (x_index < x_values.size) & \
+                    (y_index >= 0) & (y_index < y_values.size)
+            x = x_values[np.clip(x_index, 0, x_values.size - 1)]
+            y = y_values[np.clip(y_index, 0, y_values.size - 1)]
+            gauss = self._gaussian_2d((x, y),
+                                      amp=amp[chunk, np.newaxis, np.newaxis],
+                                      pos=pos[chunk].T[:, :, np.newaxis, np.newaxis],
+                                      sigma=sigma[chunk].T[:, :, np.newaxis, np.newaxis],
+                                      theta=theta[chunk, np.newaxis, np.newaxis])
+            flat_index = x_index * y_values.size + y_index
+            image += np.bincount(np.broadcast_to(flat_index, valid.shape)[valid],
+                                 weights=gauss[valid],
+                                 minlength=image.size)
+        return image.reshape((x_values.size, y_values.size))
+
     @staticmethod
     def _gaussian_2d(xy, amp, pos, sigma, theta=0, offset=0):
         x, y = xy
@@ -75,6 +75,8 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
                 APD2: 'c/s'
                 AI0: 'V'
             backwards_line_resolution: 50 # optional
+            data_fetch_interval: 0.05 # optional, target time in s between scan data updates
+            buffer_fill_warning: 0.5 # optional, warn if this fraction of the input buffer is unread
             move_velocity: 400e-6 #m/s; This speed is used for scanner movements and avoids jumps from position to position.
     """
 
@@ -92,6 +94,11 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
 
     __backwards_line_resolution = ConfigOption(name='backwards_line_resolution', default=50)
     __max_move_velocity = ConfigOption(name='maximum_move_velocity', default=400e-6)
+    # Target time between two reads of scan data. The number of samples per read is derived from
+    # the scan frequency and rounded to full scan lines if possible.
+    _data_fetch_interval = ConfigOption(name='data_fetch_interval', default=0.05, missing='nothing')
+    # Fraction of the input buffer filled with unread samples above which a warning is logged
+    _buffer_fill_warning = ConfigOption(name='buffer_fill_warning', default=0.5, missing='nothing')
 
     _threaded = True  # Interfuse is by default not threaded.
 
@@ -107,6 +114,9 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
 
         self._scan_data = None
         self.raw_data_container = None
+        self._fetch_chunk_size = 10
+        self._reverse_channel_mapping = dict()
+        self._fetch_statistics = dict()
 
         self._constraints = None
 
@@ -168,6 +178,7 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
         self.__init_ao_timer()
         self.__t_last_follow = None
 
+        self._reverse_channel_mapping = {val.lower(): key for key, val in self._ni_channel_mapping.items()}
         self.sigNextDataChunk.connect(self._fetch_data_chunk, QtCore.Qt.QueuedConnection)
 
     def _toggle_ao_setpoint_channels(self, enable: bool) -> None:
@@ -265,6 +276,7 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
                                                                    1] if self._scan_data.scan_dimension == 2 else 1,
                                                                resolution[0],
                                                                self.__backwards_line_resolution)
+                    self._fetch_chunk_size = self._get_fetch_chunk_size(frequency)
                     # self.log.debug(f"New scanData created: {self._scan_data.data}")
 
                 except:
@@ -410,6 +422,12 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
 
             with self._thread_lock_data:
                 self._scan_data.new_scan()
+                self.raw_data_container.reset()
+                self._fetch_statistics = {'start_time': time.perf_counter(),
+                                          'number_of_fetches': 0,
+                                          'number_of_samples': 0,
+                                          'max_buffer_fill': 0.,
+                                          'buffer_warning_issued': False}
                 #self.log.debug(f"New scan data: {self._scan_data.data}, position {self._scan_data._position_data}")
                 self._stored_target_pos = self.get_target().copy()
                 self._scan_data.scanner_target_at_start = self._stored_target_pos
@@ -455,6 +473,10 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
             self._ni_finite_sampling_io().stop_buffered_frame()
             # self.log.debug("Frame stopped")
 
+        if self._fetch_statistics:
+            self._fetch_statistics.setdefault('stop_time', time.perf_counter())
+            self.log.debug(f'Scan data fetch statistics: {self.fetch_statistics}')
+
         self.module_state.unlock()
         # self.log.debug("Module unlocked")
 
@@ -516,31 +538,77 @@ class NiScanningProbeInterfuse(ScanningProbeInterface):
                     'frequency': self._current_scan_frequency}
         return settings
 
+    @property
+    def fetch_statistics(self):
+        """ Statistics of the data fetching during the current (or last) scan.
+
+        @return dict: 'fetch_rate' (reads per second), 'samples_per_fetch' (mean number of samples
+                      per read), 'max_buffer_fill' (maximum fraction of the input buffer filled
+                      with unread samples) and 'chunk_size' (requested samples per read)
+        """
+        stats = self._fetch_statistics.copy()
+        if not stats:
+            return dict()
+        elapsed = max(stats.get('stop_time', time.perf_counter()) - stats['start_time'], 1e-9)
+        fetches = stats['number_of_fetches']
+        return {'fetch_rate': fetches / elapsed,
+                'samples_per_fetch': stats['number_of_samples'] / fetches if fetches else 0.,
+                'max_buffer_fill': stats['max_buffer_fill'],
+                'chunk_size': self._fetch_chunk_size}
+
+    def _get_fetch_chunk_size(self, frequency):
+        """ Number of samples to request per read so that reads happen about every
+        "data_fetch_interval" seconds. Chunks spanning more than a scan line are rounded down to
+        full scan lines.
+
+        @param float frequency: scan frequency (samples per second)
+        @return int: number of samples per read
+        """
+        chunk_size = max(1, int(round(frequency * self._data_fetch_interval)))
+        samples_per_line = self.raw_data_container.forward_line_resolution + \
+            self.raw_data_container.backwards_line_resolution
+        if chunk_size >= samples_per_line > 0:
+            chunk_size -= chunk_size % samples_per_line
+        return min(chunk_size, max(1, self.raw_data_container.frame_size))
+
+    def _update_fetch_statistics(self, samples_in_buffer, number_of_samples):
+        # not thread safe, call from thread_lock protected code only
+        stats = self._fetch_statistics
+        stats['number_of_fetches'] += 1
+        stats['number_of_samples'] += number_of_samples
+        # The input buffer of a finite acquisition holds one frame
+        buffer_fill = samples_in_buffer / max(1, self.raw_data_container.frame_size)
+        stats['max_buffer_fill'] = max(stats['max_buffer_fill'], buffer_fill)
+        if buffer_fill > self._buffer_fill_warning and not stats['buffer_warning_issued']:
+            stats['buffer_warning_issued'] = True
+            self.log.warning(f'Scan data is read slower than acquired. {buffer_fill:.0%} of the '
+                             f'input buffer filled with unread samples.')
+
     def _check_scan_end_reached(self):
         # not thread safe, call from thread_lock protected code only
         return self.raw_data_container.is_full
 
     def _fetch_data_chunk(self):
         try:
-            # self.log.debug(f'fetch chunk: {self._ni_finite_sampling_io().samples_in_buffer}, {self.is_scan_running}')
-            # chunk_size = self._scan_data.scan_resolution[0] + self.__backwards_line_resolution
-            chunk_size = 10  # TODO Hardcode or go line by line as commented out above?
+            chunk_size = self._fetch_chunk_size
+            samples_in_buffer = self._ni_finite_sampling_io().samples_in_buffer
             # Request a minimum of chunk_size samples per loop
             try:
                 samples_dict = self._ni_finite_sampling_io().get_buffered_samples(chunk_size) \
-                    if self._ni_finite_sampling_io().samples_in_buffer < chunk_size\
+                    if samples_in_buffer < chunk_size\
                     else self._ni_finite_sampling_io().get_buffered_samples()
             except ValueError:  # ValueError is raised, when more samples are requested then pending or still to get
                 # after HW stopped
                 samples_dict = self._ni_finite_sampling_io().get_buffered_samples()
 
-            reverse_routing = {val.lower(): key for key, val in self._ni_channel_mapping.items()}
-
-            new_data = {reverse_routing[key]: samples for key, samples in samples_dict.items()}
+            new_data = {self._reverse_channel_mapping[key]: samples for key, samples in samples_dict.items()}
 
             with self._thread_lock_data:
                 self.raw_data_container.fill_container(new_data)
                 self._scan_data.data = self.raw_data_container.forwards_data()
+                if self._fetch_statistics:
+                    self._update_fetch_statistics(samples_in_buffer,
+                                                  len(next(iter(new_data.values()), [])))
 
                 if self._check_scan_end_reached():
                     self.stop_scan()
@@ -881,45 +949,54 @@ class RawDataContainer:
 
         self.frame_size = number_of_scan_lines * (forward_line_resolution + backwards_line_resolution)
         self._raw = {key: np.full(self.frame_size, np.nan) for key in channel_keys}
+        # index of the next sample to write
+        self._fill_index = 0
+
+        # forward and backward image as (strided) views of the raw data
+        self._forwards_views = dict()
+        self._backwards_views = dict()
+        for key, raw in self._raw.items():
+            if self.number_of_scan_lines > 1:
+                reshaped_arr = raw.reshape(self.number_of_scan_lines,
+                                           self.forward_line_resolution + self.backwards_line_resolution)
+                self._forwards_views[key] = reshaped_arr[:, :self.forward_line_resolution].T
+                self._backwards_views[key] = reshaped_arr[:, self.forward_line_resolution:].T
+            elif self.number_of_scan_lines == 1:
+                self._forwards_views[key] = raw[:self.forward_line_resolution]
+                self._backwards_views[key] = raw[self.forward_line_resolution:]
+
+    def reset(self):
+        for raw in self._raw.values():
+            raw.fill(np.nan)
+        self._fill_index = 0
 
     def fill_container(self, samples_dict):
-        # get index of first nan from one element of dict
-        first_nan_idx = self.number_of_non_nan_values
+        first_nan_idx = self._fill_index
+        number_of_samples = 0
         for key, samples in samples_dict.items():
             self._raw[key][first_nan_idx:first_nan_idx + len(samples)] = samples
+            number_of_samples = len(samples)
+        self._fill_index = min(first_nan_idx + number_of_samples, self.frame_size)
 
     def forwards_data(self):
-        reshaped_2d_dict = dict.fromkeys(self._raw)
-        for key in self._raw:
-            if self.number_of_scan_lines > 1:
-                reshaped_arr = self._raw[key].reshape(self.number_of_scan_lines,
-                                                      self.forward_line_resolution + self.backwards_line_resolution)
-                reshaped_2d_dict[key] = reshaped_arr[:, :self.forward_line_resolution].T
-            elif self.number_of_scan_lines == 1:
-                reshaped_2d_dict[key] = self._raw[key][:self.forward_line_resolution]
-        return reshaped_2d_dict
+        """
+        returns the forward image of each channel as views of the raw data
+        """
+        return self._forwards_views.copy()
 
     def backwards_data(self):
-        reshaped_2d_dict = dict.fromkeys(self._raw)
-        for key in self._raw:
-            if self.number_of_scan_lines > 1:
-                reshaped_arr = self._raw[key].reshape(self.number_of_scan_lines,
-                                                      self.forward_line_resolution + self.backwards_line_resolution)
-                reshaped_2d_dict[key] = reshaped_arr[:, self.forward_line_resolution:].T
-            elif self.number_of_scan_lines == 1:
-                reshaped_2d_dict[key] = self._raw[key][self.forward_line_resolution:]
-
-        return reshaped_2d_dict
+        """
+        returns the backward image of each channel as views of the raw data
+        """
+        return self._backwards_views.copy()
 
     @property
     def number_of_non_nan_values(self):
         """
-        returns number of not NaN samples
+        returns number of written samples
         """
-        return np.sum(~np.isnan(next(iter(self._raw.values()))))
+        return self._fill_index
 
     @property
     def is_full(self):
-        return self.number_of_non_nan_values == self.frame_size
-
-
+        return self._fill_index == self.frame_size
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a two-stage pipeline reading TTTR records from the FIFO of a PicoQuant device
+in a dedicated thread and handing them over to a processing (decode/histogram) thread.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import queue
+import threading
+import numpy as np
+
+
+class FifoReadPipeline:
+    """
+    Reads the device FIFO into a pool of preallocated buffers in a reader thread. Filled buffers
+    are passed through a bounded queue to a processing thread and returned to the pool afterwards.
+    Each buffer is only accessed by one thread at a time, so no data is copied or locked.
+
+    The reader never waits for the processing stage, since the device FIFO must be emptied
+    continuously. If no free buffer is left, the oldest queued buffer is dropped and reused. Each
+    filled buffer gets a consecutive sequence number, so the processing callback is informed of
+    each buffer that does not continue the previously processed one.
+    """
+
+    def __init__(self, read_fifo, process_records, buffer_size, buffer_count=8,
+                 fifo_overflowed=None):
+        """
+        @param callable read_fifo: read_fifo(buffer) fills the uint32 buffer with records from
+                                   the device FIFO and returns the number of records read.
+                                   Should return after a timeout if no records are available.
+        @param callable process_records: process_records(records, continuous) with the valid
+                                         part of a filled buffer. continuous is False if buffers
+                                         have been dropped before this one.
+        @param int buffer_size: Number of records per buffer (e.g. TTREADMAX)
+        @param int buffer_count: optional, number of buffers in the pool (>= 2)
+        @param callable fifo_overflowed: optional, returns True if the device FIFO has overflowed.
+                                         Checked after each read.
+        """
+        if buffer_count < 2:
+            raise ValueError(f'FifoReadPipeline needs at least 2 buffers (received: {buffer_count})')
+        self._read_fifo = read_fifo
+        self._process_records = process_records
+        self._fifo_overflowed = fifo_overflowed
+        self._buffer_size = int(buffer_size)
+
+        self._free_buffers = queue.SimpleQueue()
+        for _ in range(buffer_count):
+            self._free_buffers.put(np.empty(self._buffer_size, dtype=np.uint32))
+        # The processing thread holds at most one buffer, so this queue never blocks the reader
+        self._filled_buffers = queue.Queue(maxsize=buffer_count)
+
+        self._stop_requested = threading.Event()
+        self._reader_thread = None
+        self._processing_thread = None
+        self._error = None
+        # Sequence number of the next filled buffer (reader thread) and of the last processed
+        # buffer (processing thread). A gap in the sequence marks dropped buffers.
+        self._next_sequence = 0
+        self._last_processed_sequence = -1
+
+        self._read_buffers = 0
+        self._read_records = 0
+        self._processed_buffers = 0
+        self._dropped_buffers = 0
+        self._overflowed_buffers = 0
+
+    @property
+    def is_running(self):
+        return self._reader_thread is not None and self._reader_thread.is_alive()
+
+    @property
+    def error(self):
+        """ First exception raised in the reader or processing thread (None if no error) """
+        return self._error
+
+    @property
+    def statistics(self):
+        """ dict of counters since the pipeline has been created:
+            read_buffers: number of FIFO reads returning records
+            read_records: number of records read
+            processed_buffers: number of buffers passed to the processing callback
+            dropped_buffers: number of buffers dropped because processing did not keep up
+            overflowed_buffers: number of reads after which the device FIFO had overflowed
+            queued_buffers: number of buffers currently waiting for processing
+        """
+        return {'read_buffers': self._read_buffers,
+                'read_records': self._read_records,
+                'processed_buffers': self._processed_buffers,
+                'dropped_buffers': self._dropped_buffers,
+                'overflowed_buffers': self._overflowed_buffers,
+                'queued_buffers': self._filled_buffers.qsize()}
+
+    def start(self):
+        """ Start the reader and processing threads. The first buffer processed is marked as not
+        continuous if the pipeline has been running before.
+        """
+        if self.is_running:
+            raise RuntimeError('FifoReadPipeline is already running')
+        self._stop_requested.clear()
+        if self._read_buffers > 0:
+            self._next_sequence += 1
+        self._processing_thread = threading.Thread(target=self._processing_loop,
+                                                   name='FifoReadPipeline-processing',
+                                                   daemon=True)
+        self._reader_thread = threading.Thread(target=self._read_loop,
+                                               name='FifoReadPipeline-reader',
+                                               daemon=True)
+        self._processing_thread.start()
+        self._reader_thread.start()
+
+    def stop(self):
+        """ Stop reading after the current FIFO read, process all queued buffers and join both
+        threads.
+        """
+        if self._reader_thread is None:
+            return
+        self._stop_requested.set()
+        self._reader_thread.join()
+        self._filled_buffers.put(None)
+        self._processing_thread.join()
+        self._reader_thread = None
+        self._processing_thread = None
+
+    def _acquire_buffer(self):
+        try:
+            return self._free_buffers.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            buffer, _, _ = self._filled_buffers.get_nowait()
+        except queue.Empty:
+            # The processing thread has just taken the last queued buffer
+            return self._free_buffers.get()
+        self._dropped_buffers += 1
+        return buffer
+
+    def _read_loop(self):
+        try:
+            while not self._stop_requested.is_set():
+                buffer = self._acquire_buffer()
+                count = self._read_fifo(buffer)
+                if self._fifo_overflowed is not None and self._fifo_overflowed():
+                    self._overflowed_buffers += 1
+                if count <= 0:
+                    self._free_buffers.put(buffer)
+                    continue
+                self._read_buffers += 1
+                self._read_records += count
+                self._filled_buffers.put((buffer, count, self._next_sequence))
+                self._next_sequence += 1
+        except Exception as err:
+            if self._error is None:
+                self._error = err
+
+    def _processing_loop(self):
+        while True:
+            item = self._filled_buffers.get()
+            if item is None:
+                return
+            buffer, count, sequence = item
+            continuous = sequence == self._last_processed_sequence + 1
+            self._last_processed_sequence = sequence
+            try:
+                if self._error is None:
+                    self._process_records(buffer[:count], continuous)
+                    self._processed_buffers += 1
+            except Exception as err:
+                self._error = err
+            finally:
+                self._free_buffers.put(buffer)
@@ -19,6 +19,7 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+import os
 import ctypes
 import numpy as np
 import time
@@ -28,6 +29,8 @@ from qudi.core.configoption import ConfigOption
 from qudi.util.paths import get_main_dir
 from qudi.util.mutex import Mutex
 from qudi.interface.fast_counter_interface import FastCounterInterface
+from qudi.hardware.picoquant.tttr_records import TTTRRecordFormat, TTTRHistogrammer
+from qudi.hardware.picoquant.fifo_pipeline import FifoReadPipeline
 
 # =============================================================================
 # Wrapper around the PHLib.DLL. The current file is based on the header files
@@ -96,14 +99,18 @@ class PicoHarp300(FastCounterInterface):
         options:
             deviceID: 0 # a device index from 0 to 7.
             mode: 0 # 0: histogram mode, 2: T2 mode, 3: T3 mode
-        
+            fifo_buffer_count: 8 # optional, number of TTREADMAX record buffers for FIFO reads
+
+    As fast counter the device records TTTR events (T2 mode unless configured for T3 mode) and
+    histograms the photon arrival times after the sync input, i.e. the sequence trigger.
+    The FIFO is read in a dedicated thread and the records are histogrammed in another thread
+    (see fifo_statistics).
     """
 
     _deviceID = ConfigOption('deviceID', 0, missing='warn') # a device index from 0 to 7.
     _mode = ConfigOption('mode', 0, missing='warn')
+    _fifo_buffer_count = ConfigOption('fifo_buffer_count', 8, missing='nothing')
 
-    sigReadoutPicoharp = QtCore.Signal()
-    sigAnalyzeData = QtCore.Signal(object, object)
     sigStart = QtCore.Signal()
 
     def __init__(self, *args, **kwargs):
@@ -123,8 +130,10 @@ class PicoHarp300(FastCounterInterface):
         self._dll = ctypes.cdll.LoadLibrary('phlib64')
 
         # Just some default values:
-        self._bin_width_ns = 3000
-        self._record_length_ns = 100 *1e9
+        self._bin_width_s = 3e-6
+        self._record_length_s = 100
+        self._histogrammer = None
+        self._fifo_pipeline = None
 
         self._photon_source2 = None #for compatibility reasons with second APD
         self._count_channel = 1
@@ -148,18 +157,21 @@ class PicoHarp300(FastCounterInterface):
         # anything to pass through:
 
         self.sigStart.connect(self.start_measure)
-        self.sigReadoutPicoharp.connect(self.get_fresh_data_loop, QtCore.Qt.QueuedConnection) # ,QtCore.Qt.QueuedConnection
-        self.sigAnalyzeData.connect(self.analyze_received_data, QtCore.Qt.QueuedConnection)
-        self.result = []
+        self._fifo_pipeline = FifoReadPipeline(read_fifo=lambda buf: self.tttr_read_fifo(buf)[1],
+                                               process_records=self.analyze_received_data,
+                                               buffer_size=self.TTREADMAX,
+                                               buffer_count=self._fifo_buffer_count,
+                                               fifo_overflowed=self._fifo_overflowed)
 
 
     def on_deactivate(self):
         """ Deactivates and disconnects the device.
         """
 
+        self._fifo_pipeline.stop()
+        self._fifo_pipeline = None
         self.close_connection()
-        self.sigReadoutPicoharp.disconnect()
-        self.sigAnalyzeData.disconnect()
+        self.sigStart.disconnect()
 
     def _create_errorcode(self):
         """ Create a dictionary with the errorcode for the device.
@@ -222,6 +234,8 @@ class PicoHarp300(FastCounterInterface):
         self.BINSTEPSMAX = 8
         self.HISTCHAN = 65536    # number of histogram channels 2^16
         self.TTREADMAX = 131072  # 128K event records (2^17)
+        self.FLAG_FIFOFULL = 0x0003
+        self.T2RESOLUTION = 4   # time tag resolution in T2 mode in ps
 
         # in Hz:
         self.COUNTFREQ = 10
@@ -687,11 +701,11 @@ class PicoHarp300(FastCounterInterface):
     # To check whether you can use the TTTR mode (must be purchased in
     # addition) you can call PH_GetFeatures to check.
 
-    def tttr_read_fifo(self):#, num_counts):
+    def tttr_read_fifo(self, buffer=None):
         """ Read out the buffer of the FIFO.
 
-        @param int num_counts: number of TTTR records to be fetched. Maximal
-                               TTREADMAX
+        @param numpy.ndarray buffer: optional, uint32 array with at least TTREADMAX elements to
+                                     read the records into. A new array is created if None.
 
         @return tuple (buffer, actual_num_counts):
                     buffer = data array where the TTTR data are stored.
@@ -732,7 +746,8 @@ class PicoHarp300(FastCounterInterface):
 
         num_counts = self.TTREADMAX
 
-        buffer = np.zeros((num_counts,), dtype=np.uint32)
+        if buffer is None:
+            buffer = np.zeros((num_counts,), dtype=np.uint32)
 
         actual_num_counts = ctypes.c_int32()
 
@@ -1054,29 +1069,38 @@ class PicoHarp300(FastCounterInterface):
 
     #FIXME: The interface connection to the fast counter must be established!
 
-    def configure(self, bin_width_ns, record_length_ns, number_of_gates = 0):
-        """
-        Configuration of the fast counter.
-        bin_width_ns: Length of a single time bin in the time trace histogram
-                      in nanoseconds.
-        record_length_ns: Total length of the timetrace/each single gate in
-                          nanoseconds.
-        number_of_gates: Number of gates in the pulse sequence. Ignore for
-                         ungated counter.
+    def configure(self, bin_width_s, record_length_s, number_of_gates=0):
+        """ Configuration of the fast counter.
+
+        @param float bin_width_s: Length of a single time bin in the time trace histogram in
+                                  seconds.
+        @param float record_length_s: Total length of the timetrace/each single gate in seconds.
+        @param int number_of_gates: optional, number of gates in the pulse sequence. Ignore for
+                                    not gated counter.
+
+        @return tuple(binwidth_s, record_length_s, number_of_gates): the actually set values
         """
-        #        self.initialize(mode=3)
-        self._bin_width_ns = bin_width_ns
-        self._record_length_ns = record_length_ns
+        mode = self._mode if self._mode in (self.MODE_T2, self.MODE_T3) else self.MODE_T2
+        self.initialize(mode)
+        if mode == self.MODE_T2:
+            record_format = TTTRRecordFormat.PICOHARP_T2
+            resolution_s = self.T2RESOLUTION * 1e-12
+        else:
+            record_format = TTTRRecordFormat.PICOHARP_T3
+            resolution_s = self.get_resolution() * 1e-12
+
+        # The histogram bins are integer multiples of the time tag (T2) or dtime (T3) resolution
+        bin_width = max(1, int(round(bin_width_s / resolution_s)))
+        self._bin_width_s = bin_width * resolution_s
+        number_of_bins = max(1, int(record_length_s / self._bin_width_s))
+        self._record_length_s = number_of_bins * self._bin_width_s
         self._number_of_gates = number_of_gates
 
-        #FIXME: actualle only an unsigned array will be needed. Change that later.
-        #        self.data_trace = np.zeros(number_of_gates, dtype=np.int64 )
-        self.data_trace = [0]*number_of_gates
-        self.count = 0
-
-        self.result = []
-        self.initialize(2)
-        return
+        with self.threadlock:
+            self._histogrammer = TTTRHistogrammer(record_format,
+                                                  bin_width=bin_width,
+                                                  number_of_bins=number_of_bins)
+        return self._bin_width_s, self._record_length_s, number_of_gates
 
     def get_status(self):
         """
@@ -1102,16 +1126,15 @@ class PicoHarp300(FastCounterInterface):
         """
         Pauses the current measurement if the fast counter is in running state.
         """
-
-        self.stop_measure()
         self.meas_run = False
+        self._stop_acquisition()
 
     def continue_measure(self):
         """
         Continues the current measurement if the fast counter is in pause state.
         """
         self.meas_run = True
-        self.start(self._record_length_ns/1e6)
+        self._start_acquisition()
 
     def is_gated(self):
         """
@@ -1124,8 +1147,7 @@ class PicoHarp300(FastCounterInterface):
         """
         returns the width of a single timebin in the timetrace in seconds
         """
-        #FIXME: Must be implemented
-        return 2e-9
+        return self._bin_width_s
 
     def get_data_trace(self):
         """
@@ -1139,12 +1161,14 @@ class PicoHarp300(FastCounterInterface):
             returnarray[gate_index, timebin_index]
         """
 
+        with self.threadlock:
+            data_trace = self._histogrammer.histogram
         info_dict = {'elapsed_sweeps': None,
                      'elapsed_time': None}  # TODO : implement that according to hardware capabilities
-        return self.data_trace, info_dict
+        return data_trace, info_dict
 
     # =========================================================================
-    #  Test routine for continuous readout
+    #  Continuous TTTR readout
     # =========================================================================
 
 
@@ -1155,47 +1179,53 @@ class PicoHarp300(FastCounterInterface):
         self.lock()
 
         self.meas_run = True
-
-        # start the device:
-        self.start(int(self._record_length_ns/1e6))
-
-        self.sigReadoutPicoharp.emit()
+        with self.threadlock:
+            self._histogrammer.reset()
+        self._start_acquisition()
 
     def stop_measure(self):
-        """ By setting the Flag, the measurement should stop.  """
-        self.meas_run = False
-
-
-    def get_fresh_data_loop(self):
-        """ This method will be run infinitely until the measurement stops. """
-
-        # for testing one can also take another array:
-        buffer, actual_counts = self.tttr_read_fifo()
-        #        buffer, actual_counts = [1,2,3,4,5,6,7,8,9], 9
-
-        # This analysis signel should be analyzed in a queued thread:
-        self.sigAnalyzeData.emit(buffer[0:actual_counts-1], actual_counts)
-
-        if not self.meas_run:
-            with self.threadlock:
-                self.unlock()
-                self.stop_device()
-                return
-
-        print('get new data.')
-        # get the next data:
-        self.sigReadoutPicoharp.emit()
-
-
-
-    def analyze_received_data(self, arr_data, actual_counts):
+        """ Stop the acquisition and histogram the records left in the FIFO pipeline. """
+        if self.meas_run:
+            self.meas_run = False
+            self._stop_acquisition()
+        with self.threadlock:
+            self.unlock()
+
+    @property
+    def fifo_statistics(self):
+        """ Counters of the FIFO read pipeline, e.g. of dropped and overflowed buffers.
+        See FifoReadPipeline.statistics.
+        """
+        return self._fifo_pipeline.statistics
+
+    def _start_acquisition(self):
+        # start the device, the acquisition is stopped by calling stop_measure:
+        self.start(self.ACQTMAX)
+        self._fifo_pipeline.start()
+
+    def _stop_acquisition(self):
+        self.stop_device()
+        self._fifo_pipeline.stop()
+        statistics = self._fifo_pipeline.statistics
+        if statistics['dropped_buffers'] > 0 or statistics['overflowed_buffers'] > 0:
+            self.log.warning(f'PicoHarp: Records lost during TTTR acquisition. '
+                             f'{statistics["dropped_buffers"]:d} FIFO read buffers dropped, '
+                             f'FIFO overflowed after {statistics["overflowed_buffers"]:d} reads.')
+        if self._fifo_pipeline.error is not None:
+            self.log.error(f'PicoHarp: TTTR acquisition failed: {self._fifo_pipeline.error!r}')
+
+    def _fifo_overflowed(self):
+        return bool(self.get_flags() & self.FLAG_FIFOFULL)
+
+    def analyze_received_data(self, arr_data, continuous=True):
         """ Analyze the actual data obtained from the TTTR mode of the device.
 
-        @param arr_data: numpy uint32 array with length 'actual_counts'.
-        @param actual_counts: int, number of read out events from the buffer.
+        @param arr_data: numpy uint32 array of the records read out from the FIFO.
+        @param continuous: bool, False if records have been lost since the previous call.
 
-        Write the obtained arr_data to the predefined array data_trace,
-        initialized in the configure method.
+        The records are decoded (see qudi.hardware.picoquant.tttr_records) and the photons are
+        added to the histogram set up in the configure method. Overflows are carried over from
+        one call to the next.
 
         The received array contains 32bit words. The bit assignment starts from
         the MSB (most significant bit), which is here displayed as the most
@@ -1268,36 +1298,5 @@ class PicoHarp300(FastCounterInterface):
                       the channel-number are set to high (i.e. 1).
         """
 
-        # at first just a simple test
-        time.sleep(0.2)
-
-        self.data_trace[self.count] = actual_counts
-        self.count += 1
-
-        if self.count > self._number_of_gates-1:
-            self.count = 0
-
-        if actual_counts == self.TTREADMAX:
-            self.log.warning('Overflow!')
-
-        print('Data analyzed.')
-
-#        self.result = []
-#        for entry in arr_data[0:actual_counts-1]:
-#
-#            # apply three bitmasks to extract the relavent numbers:
-#            overflow = entry & (2**(32-1) )
-#            marker_ch = entry & (2**(32-2)  + 2**(32-3) + 2**(32-4))
-#            time_tag = entry & (2**32 -1 - 2**(32-1) + 2**(32-2) + 2**(32-3) + 2**(32-4))
-
-
-
-
-
-
-
-
-
-
-
-
+        with self.threadlock:
+            self._histogrammer.add_records(arr_data, continuous)
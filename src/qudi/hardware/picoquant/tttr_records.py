@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a vectorized decoder and histogrammer for the time-tagged time-resolved (TTTR)
+event records of the PicoQuant PicoHarp 300 and HydraHarp 400 (T2 and T3 mode) as well as a
+generator of synthetic record streams to test and benchmark them without a device.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import numpy as np
+from enum import Enum
+from typing import NamedTuple, Optional, Tuple
+
+__all__ = ['TTTRRecordFormat', 'TTTREvents', 'TTTRDecoder', 'TTTRHistogrammer',
+           'generate_records', 'benchmark_histogrammer']
+
+
+class TTTRRecordFormat(Enum):
+    """ 32 bit TTTR record formats given as (device, measurement mode, overflow period).
+
+    The overflow period is given in units of the time tag (T2 mode) or of the sync counter
+    (T3 mode). HydraHarp formats refer to record format version 2.
+
+    PicoHarp T2: [channel: 4 bit | time tag: 28 bit]
+    PicoHarp T3: [channel: 4 bit | dtime: 12 bit | nsync: 16 bit]
+        Channel 15 marks special records. The lowest 4 bits of the time tag (T2) or dtime (T3)
+        are the external markers. An overflow is marked by all markers being zero.
+        In T2 mode channel 0 is the sync input.
+    HydraHarp T2: [special: 1 bit | channel: 6 bit | time tag: 25 bit]
+    HydraHarp T3: [special: 1 bit | channel: 6 bit | dtime: 15 bit | nsync: 10 bit]
+        Special records with channel 63 are overflows with the number of overflows given in the
+        time tag (T2) or nsync (T3) field. Channels 1-15 of special records are external markers
+        and channel 0 of special records is the sync input (T2 only).
+    """
+    PICOHARP_T2 = ('PicoHarp', 2, 210698240)
+    PICOHARP_T3 = ('PicoHarp', 3, 65536)
+    HYDRAHARP_T2 = ('HydraHarp', 2, 33554432)
+    HYDRAHARP_T3 = ('HydraHarp', 3, 1024)
+
+    @property
+    def device(self):
+        return self.value[0]
+
+    @property
+    def mode(self):
+        return self.value[1]
+
+    @property
+    def overflow_period(self):
+        return self.value[2]
+
+    @property
+    def dtime_range(self):
+        """ Number of possible start-stop time (dtime) values in T3 mode, None for T2 mode """
+        if self.mode != 3:
+            return None
+        return 4096 if self.device == 'PicoHarp' else 32768
+
+    @property
+    def _max_overflow_count(self):
+        """ Maximum number of overflows a single overflow record can represent """
+        if self.device == 'PicoHarp':
+            return 1
+        return 2 ** 25 - 1 if self.mode == 2 else 2 ** 10 - 1
+
+
+class TTTREvents(NamedTuple):
+    """ Decoded TTTR records (without overflow records) """
+    # Input channel numbers starting at 1. Sync records (T2) are channel 0, marker records -1.
+    channels: np.ndarray
+    # Absolute time tags (T2) or sync counts (T3) including all overflows
+    times: np.ndarray
+    # Start-stop times (T3, undefined for marker records), None for T2 records
+    dtimes: Optional[np.ndarray]
+    # External marker bit masks (0 for all records except marker records)
+    markers: np.ndarray
+
+
+class TTTRDecoder:
+    """ Decodes blocks of TTTR records read from the FIFO of the device.
+
+    The overflows are carried over from block to block so that the decoded times of consecutive
+    calls to "decode" are continuous.
+    """
+
+    def __init__(self, record_format):
+        """
+        @param TTTRRecordFormat record_format: Format of the records to decode
+        """
+        self._format = TTTRRecordFormat(record_format)
+        self._overflow_time = 0
+
+    @property
+    def record_format(self):
+        return self._format
+
+    @property
+    def overflow_time(self):
+        """ Time (or sync count in T3 mode) accumulated by all overflow records decoded so far """
+        return self._overflow_time
+
+    def reset(self):
+        self._overflow_time = 0
+
+    def decode(self, records):
+        """ Decode a block of records continuing the previous block.
+
+        @param numpy.ndarray records: uint32 record array
+
+        @return TTTREvents: decoded records
+        """
+        records = np.asarray(records, dtype=np.uint32)
+        fmt = self._format
+        if fmt.device == 'PicoHarp':
+            channels = (records >> 28).astype(np.int8)
+            special = channels == 15
+            if fmt.mode == 2:
+                times = (records & 0x0FFFFFFF).astype(np.int64)
+                dtimes = None
+                markers = np.where(special, times & 0xF, 0)
+                # the marker bits replace the lowest time tag bits
+                times -= markers
+            else:
+                times = (records & 0xFFFF).astype(np.int64)
+                dtimes = ((records >> 16) & 0xFFF).astype(np.int64)
+                markers = np.where(special, dtimes & 0xF, 0)
+            overflow = special & (markers == 0)
+            overflow_count = overflow
+        else:
+            special = (records >> 31).astype(bool)
+            codes = ((records >> 25) & 0x3F).astype(np.int8)
+            if fmt.mode == 2:
+                times = (records & 0x1FFFFFF).astype(np.int64)
+                dtimes = None
+            else:
+                times = (records & 0x3FF).astype(np.int64)
+                dtimes = ((records >> 10) & 0x7FFF).astype(np.int64)
+            overflow = special & (codes == 63)
+            # An overflow record with count 0 represents a single overflow
+            overflow_count = np.where(overflow, np.maximum(times, 1), 0)
+            markers = np.where(special & (codes >= 1) & (codes <= 15), codes, 0)
+            channels = codes + 1
+            if fmt.mode == 2:
+                channels[special & (codes == 0)] = 0
+                special &= codes != 0
+        channels[special] = -1
+
+        if overflow.any():
+            offsets = np.cumsum(overflow_count * np.int64(fmt.overflow_period))
+            offsets += self._overflow_time
+            self._overflow_time = int(offsets[-1])
+            times += offsets
+            keep = ~overflow
+            return TTTREvents(channels=channels[keep],
+                              times=times[keep],
+                              dtimes=None if dtimes is None else dtimes[keep],
+                              markers=markers[keep].astype(np.uint8))
+        times += self._overflow_time
+        return TTTREvents(channels=channels,
+                          times=times,
+                          dtimes=dtimes,
+                          markers=markers.astype(np.uint8))
+
+
+class TTTRHistogrammer:
+    """ Accumulates TTTR records into a time histogram of photon arrivals after the sync.
+
+    In T2 mode the arrival time is the time tag difference to the most recent sync record, in T3
+    mode it is the start-stop time (dtime). If gated, each sync starts the next gate.
+    """
+
+    def __init__(self, record_format, bin_width, number_of_bins, number_of_gates=0, channels=None):
+        """
+        @param TTTRRecordFormat record_format: Format of the records
+        @param int bin_width: Histogram bin width in units of the T2 time tag or T3 dtime
+        @param int number_of_bins: Number of histogram bins (per gate)
+        @param int number_of_gates: optional, number of gates. 0 for an ungated histogram.
+        @param int[] channels: optional, input channels to count. All channels if None.
+        """
+        if bin_width < 1:
+            raise ValueError(f'Histogram bin width must be >= 1 (received: {bin_width})')
+        self._decoder = TTTRDecoder(record_format)
+        self._bin_width = int(bin_width)
+        self._number_of_bins = int(number_of_bins)
+        self._number_of_gates = int(number_of_gates) if number_of_gates else 0
+        self._channels = None if channels is None else np.asarray(channels, dtype=np.int8)
+        if self._number_of_gates > 0:
+            shape = (self._number_of_gates, self._number_of_bins)
+        else:
+            shape = (self._number_of_bins,)
+        self._histogram = np.zeros(shape, dtype=np.int64)
+        self._last_sync_time = None
+        self._sync_count = 0
+        self._record_count = 0
+
+    @property
+    def record_format(self):
+        return self._decoder.record_format
+
+    @property
+    def histogram(self):
+        """ Copy of the accumulated histogram (1D, or 2D with shape (gates, bins) if gated) """
+        return self._histogram.copy()
+
+    @property
+    def record_count(self):
+        """ Number of records processed since the last reset """
+        return self._record_count
+
+    def reset(self):
+        self._decoder.reset()
+        self._histogram[...] = 0
+        self._last_sync_time = None
+        self._sync_count = 0
+        self._record_count = 0
+
+    def add_records(self, records, continuous=True):
+        """ Decode a block of records and add the photons to the histogram.
+
+        @param numpy.ndarray records: uint32 record array continuing the previous block
+        @param bool continuous: optional, False if records have been lost since the previous
+                                block. Photons (T2) are then only counted after the next sync.
+
+        @return int: Number of photons added to the histogram
+        """
+        if not continuous:
+            self._last_sync_time = None
+        events = self._decoder.decode(records)
+        self._record_count += len(records)
+        if self._channels is None:
+            photon_index = np.flatnonzero(events.channels > 0)
+        else:
+            photon_index = np.flatnonzero(np.isin(events.channels, self._channels))
+
+        if self.record_format.mode == 2:
+            arrival, gate = self._t2_arrival_times(events, photon_index)
+        else:
+            arrival = events.dtimes[photon_index]
+            if self._number_of_gates > 0:
+                gate = events.times[photon_index] % self._number_of_gates
+            else:
+                gate = None
+
+        bins = arrival // self._bin_width
+        valid = (bins >= 0) & (bins < self._number_of_bins)
+        if gate is not None:
+            bins += gate * self._number_of_bins
+        bins = bins[valid]
+        if bins.size > 0:
+            self._histogram += np.bincount(bins, minlength=self._histogram.size).reshape(
+                self._histogram.shape)
+        return bins.size
+
+    def _t2_arrival_times(self, events, photon_index):
+        """ Time tag differences of photons to the most recent sync and the corresponding gates.
+        """
+        sync_index = np.flatnonzero(events.channels == 0)
+        # Reference syncs with the last sync of the previous block at position 0
+        sync_times = np.empty(sync_index.size + 1, dtype=np.int64)
+        sync_times[0] = -1 if self._last_sync_time is None else self._last_sync_time
+        sync_times[1:] = events.times[sync_index]
+        reference = np.searchsorted(sync_index, photon_index)
+
+        arrival = events.times[photon_index] - sync_times[reference]
+        if self._last_sync_time is None:
+            # Photons before the first sync are dropped by the histogram range check
+            arrival[reference == 0] = np.iinfo(np.int64).max // 2
+        if self._number_of_gates > 0:
+            gate = (self._sync_count - 1 + reference) % self._number_of_gates
+        else:
+            gate = None
+
+        if sync_index.size > 0:
+            self._last_sync_time = int(sync_times[-1])
+            self._sync_count += sync_index.size
+        return arrival, gate
+
+
+def generate_records(record_format, number_of_syncs, sync_period, photons_per_sync=1.0,
+                     decay_time=None, channel=1, marker_interval=0, seed=None
+                     ) -> Tuple[np.ndarray, TTTREvents]:
+    """ Generate a synthetic stream of TTTR records including overflow records, e.g. to test and
+    benchmark the decoder without a device.
+
+    Photons arrive with exponentially distributed delays after each sync (wrapped into the sync
+    period). The number of photons per sync is poisson distributed.
+
+    @param TTTRRecordFormat record_format: Format of the records to generate
+    @param int number_of_syncs: Number of sync periods to generate
+    @param int sync_period: Sync period in units of the time tag (T2). In T3 mode this is the
+                            range of the start-stop times (dtime) of the photons.
+    @param float photons_per_sync: optional, mean number of photons per sync period
+    @param float decay_time: optional, decay time of the photon delays (default: sync_period / 4)
+    @param int channel: optional, input channel of the photons (>= 1)
+    @param int marker_interval: optional, add a marker record every marker_interval syncs
+    @param int seed: optional, random number generator seed
+
+    @return tuple: uint32 record array and the expected TTTREvents decoding all records at once
+    """
+    fmt = TTTRRecordFormat(record_format)
+    rng = np.random.default_rng(seed)
+    sync_period = int(sync_period)
+    if fmt.mode == 3 and sync_period > fmt.dtime_range:
+        raise ValueError(f'T3 sync period must not exceed the dtime range {fmt.dtime_range}')
+    if decay_time is None:
+        decay_time = sync_period / 4
+
+    photon_sync = np.repeat(np.arange(number_of_syncs, dtype=np.int64),
+                            rng.poisson(photons_per_sync, number_of_syncs))
+    delays = rng.exponential(decay_time, photon_sync.size).astype(np.int64)
+    if fmt.mode == 2:
+        # Photons arrive strictly after their sync
+        delays = 1 + delays % (sync_period - 1)
+    else:
+        delays %= sync_period
+    if marker_interval > 0:
+        marker_sync = np.arange(0, number_of_syncs, marker_interval, dtype=np.int64)
+    else:
+        marker_sync = np.empty(0, dtype=np.int64)
+
+    if fmt.mode == 2:
+        sync_times = np.arange(number_of_syncs, dtype=np.int64) * sync_period
+        # PicoHarp markers have the lowest 4 time tag bits cleared
+        times = np.concatenate([marker_sync * sync_period & ~np.int64(0xF),
+                                sync_times,
+                                photon_sync * sync_period + delays])
+        dtimes = None
+        channels = np.concatenate([np.full(marker_sync.size, -1, dtype=np.int8),
+                                   np.zeros(number_of_syncs, dtype=np.int8),
+                                   np.full(photon_sync.size, channel, dtype=np.int8)])
+        order = np.argsort(times, kind='stable')
+    else:
+        times = np.concatenate([marker_sync, photon_sync])
+        dtimes = np.concatenate([np.zeros(marker_sync.size, dtype=np.int64), delays])
+        channels = np.concatenate([np.full(marker_sync.size, -1, dtype=np.int8),
+                                   np.full(photon_sync.size, channel, dtype=np.int8)])
+        order = np.lexsort((dtimes, times))
+        dtimes = dtimes[order]
+    times = times[order]
+    channels = channels[order]
+    markers = np.where(channels == -1, 1, 0).astype(np.uint8)
+    events = TTTREvents(channels=channels, times=times, dtimes=dtimes, markers=markers)
+    return _encode_records(fmt, events), events
+
+
+def _encode_records(fmt, events):
+    """ Encode events into records and insert the overflow records """
+    period = fmt.overflow_period
+    fields = (events.times % period).astype(np.uint32)
+    channels = events.channels.astype(np.int64)
+    is_marker = channels == -1
+    markers = events.markers.astype(np.uint32)
+    if fmt.device == 'PicoHarp':
+        codes = np.where(is_marker, 15, channels).astype(np.uint32) << 28
+        if fmt.mode == 2:
+            words = codes | fields | np.where(is_marker, markers, 0).astype(np.uint32)
+        else:
+            dtimes = np.where(is_marker, markers, events.dtimes).astype(np.uint32)
+            words = codes | (dtimes << 16) | fields
+        overflow_word = np.uint32(15 << 28)
+    else:
+        special = np.where(is_marker | (channels == 0), 1, 0).astype(np.uint32) << 31
+        codes = np.where(is_marker, markers, np.maximum(channels - 1, 0)).astype(np.uint32) << 25
+        words = special | codes | fields
+        if fmt.mode == 3:
+            dtimes = np.where(is_marker, 0, events.dtimes).astype(np.uint32)
+            words |= dtimes << 10
+        overflow_word = np.uint32((1 << 31) | (63 << 25))
+
+    # Number of overflows and overflow records preceding each event
+    overflows = np.diff(events.times // period, prepend=0)
+    max_count = fmt._max_overflow_count
+    overflow_records = -(-overflows // max_count)
+    record_count = words.size + int(overflow_records.sum())
+    records = np.full(record_count, overflow_word, dtype=np.uint32)
+    event_index = np.arange(words.size) + np.cumsum(overflow_records)
+    records[event_index] = words
+    if fmt.device != 'PicoHarp' and overflow_records.size > 0:
+        # Overflow count of each overflow record: max_count except for the last one of an event
+        owner = np.repeat(np.arange(words.size), overflow_records)
+        first = np.cumsum(overflow_records) - overflow_records
+        within = np.arange(owner.size) - first[owner]
+        counts = np.where(within == overflow_records[owner] - 1,
+                          overflows[owner] - (overflow_records[owner] - 1) * max_count,
+                          max_count)
+        is_overflow = np.ones(record_count, dtype=bool)
+        is_overflow[event_index] = False
+        records[is_overflow] |= counts.astype(np.uint32)
+    return records
+
+
+def benchmark_histogrammer(record_format, number_of_records=131072, repetitions=20,
+                           sync_period=None, number_of_bins=1024, photons_per_sync=4.0,
+                           seed=None) -> float:
+    """ Measure the throughput of TTTRHistogrammer.add_records for blocks of synthetic records.
+
+    @param TTTRRecordFormat record_format: Format of the records
+    @param int number_of_records: optional, records per block (default: TTREADMAX of the devices)
+    @param int repetitions: optional, number of blocks to process
+    @param int sync_period: optional, see generate_records. Defaults to 2**18 time tag units for
+                            T2 mode and the dtime range for T3 mode.
+    @param int number_of_bins: optional, number of histogram bins spanning the sync period
+    @param float photons_per_sync: optional, mean number of photons per sync period
+    @param int seed: optional, random number generator seed
+
+    @return float: Processed records per second
+    """
+    fmt = TTTRRecordFormat(record_format)
+    if sync_period is None:
+        sync_period = 2 ** 18 if fmt.mode == 2 else fmt.dtime_range
+    number_of_syncs = int(number_of_records * repetitions / (photons_per_sync + 1)) + 1
+    records, _ = generate_records(fmt,
+                                  number_of_syncs=number_of_syncs,
+                                  sync_period=sync_period,
+                                  photons_per_sync=photons_per_sync,
+                                  seed=seed)
+    blocks = [records[i:i + number_of_records] for i in
+              range(0, min(records.size, number_of_records * repetitions), number_of_records)]
+    histogrammer = TTTRHistogrammer(fmt,
+                                    bin_width=max(1, sync_period // number_of_bins),
+                                    number_of_bins=number_of_bins)
+    start = time.perf_counter()
+    for block in blocks:
+        histogrammer.add_records(block)
+    return histogrammer.record_count / (time.perf_counter() - start)
@@ -175,3 +175,25 @@ class FastCounterInterface(Base):
         If the hardware does not support these features, the values should be None
         """
         pass
+
+    @property
+    def supports_data_trace_increment(self):
+        """ Flag indicating if the optional method get_data_trace_increment is implemented.
+
+        @return bool: True if get_data_trace_increment is supported, False otherwise (default)
+        """
+        return False
+
+    def get_data_trace_increment(self):
+        """ Polls the counts acquired since the last call of this method (or since the start of the
+        measurement for the first call).
+
+        Optional feature used by the incremental mode of the pulsed measurement logic. Counters
+        implementing it must also return True for supports_data_trace_increment. Other counters
+        are polled via get_data_trace instead.
+
+        Return value has the same format as get_data_trace, i.e. a tuple (numpy-array, info_dict).
+        The values in info_dict ('elapsed_sweeps' and 'elapsed_time') refer to the whole
+        measurement and not only to the increment.
+        """
+        raise NotImplementedError
@@ -322,7 +322,12 @@ class ScanData:
             new_inst._position_data = {ch: arr.copy() for ch, arr in self._position_data.items()}
         return new_inst
 
-    def to_dict(self):
+    def to_dict(self, include_data=True):
+        """ Serialize to dict. If include_data is False, the data and position_data arrays are
+        omitted (None), e.g. to store them separately.
+        """
+        include_data = include_data and self._data is not None
+        include_position_data = include_data and self._position_data is not None
         dict_repr = {
             'scan_axes': tuple(ax.to_dict() for ax in self._scan_axes),
             'scan_range': self._scan_range,
@@ -332,9 +337,9 @@ class ScanData:
             'position_feedback_axes': None if self._position_feedback_axes is None else tuple(
                 ax.to_dict() for ax in self._position_feedback_axes),
             'timestamp': None if self._timestamp is None else self._timestamp.timestamp(),
-            'data': None if self._data is None else {ch: d.copy() for ch, d in self._data.items()},
-            'position_data': None if self._position_data is None else {ax: d.copy() for ax, d in
-                                                                       self._position_data.items()}
+            'data': {ch: d.copy() for ch, d in self._data.items()} if include_data else None,
+            'position_data': {ax: d.copy() for ax, d in
+                              self._position_data.items()} if include_position_data else None
         }
         return dict_repr
 
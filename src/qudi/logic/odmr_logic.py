@@ -50,6 +50,7 @@ class OdmrLogic(LogicBase):
             data_scanner: <data_scanner_name>
         options:
             default_scan_mode: 'JUMP_LIST'  # optional
+            sweeps_per_frame: 1  # optional
     """
 
     # declare connectors
@@ -61,6 +62,13 @@ class OdmrLogic(LogicBase):
     _default_scan_mode = ConfigOption(name='default_scan_mode',
                                       default='JUMP_LIST',
                                       constructor=lambda x: SamplingOutputMode[x.upper()])
+    # Number of frequency sweeps to acquire in a single hardware-timed frame of the data scanner.
+    # The frequency list of the microwave scan ("JUMP_LIST" mode) is repeated accordingly and each
+    # frame is split into sweeps afterwards. Reduces the dead time between sweeps.
+    _sweeps_per_frame = ConfigOption(name='sweeps_per_frame',
+                                     default=1,
+                                     missing='nothing',
+                                     constructor=lambda x: max(1, int(x)))
 
     # declare status variables
     _cw_frequency = StatusVar(name='cw_frequency', default=2870e6)
@@ -116,6 +124,7 @@ class OdmrLogic(LogicBase):
         self._elapsed_time = 0.0
         self._elapsed_sweeps = 0
         self.__estimated_lines = 0
+        self.__frame_sweeps = 1
         self._start_time = 0.0
         self._fit_container = None
         self._fit_config_model = None
@@ -124,6 +133,12 @@ class OdmrLogic(LogicBase):
         self._signal_data = None
         self._frequency_data = None
         self._fit_results = None
+        # Line buffers backing the raw data matrices and running sums of valid raw data values
+        # (all sweeps and the last <scans_to_average> sweeps) for each channel and range
+        self._raw_data_buffer = None
+        self._raw_data_lines = 0
+        self._raw_data_sums = None
+        self._raw_data_window_sums = None
 
     def on_activate(self):
         """
@@ -190,41 +205,131 @@ class OdmrLogic(LogicBase):
         """ Initializing the ODMR data arrays (signal and raw data matrix). """
         self._frequency_data = [np.linspace(*r) for r in self._scan_frequency_ranges]
 
-        self._raw_data = dict()
+        self._raw_data_buffer = dict()
+        self._raw_data_lines = 0
+        self._raw_data_sums = dict()
+        self._raw_data_window_sums = dict()
         self._fit_results = dict()
         self._signal_data = dict()
         estimated_samples = self._run_time * self._data_rate
         samples_per_line = sum(freq_range[-1] for freq_range in self._scan_frequency_ranges)
-        # Add 5% Safety; Minimum of 1 line
+        # Add 5% Safety; Minimum of 1 line; Multiple of sweeps per frame
         self.__estimated_lines = max(1, int(1.05 * estimated_samples / samples_per_line))
+        frames = -(-self.__estimated_lines // self.__frame_sweeps)
+        self.__estimated_lines = frames * self.__frame_sweeps
         for channel in self._data_scanner().constraints.channel_names:
-            self._raw_data[channel] = [
-                np.full((freq_arr.size, self.__estimated_lines), np.nan) for freq_arr in
+            # The line buffer is twice the size of the raw data matrix (see _update_raw_data_views)
+            self._raw_data_buffer[channel] = [
+                np.full((freq_arr.size, 2 * self.__estimated_lines), np.nan) for freq_arr in
+                self._frequency_data
+            ]
+            # sum and number of valid values for each frequency
+            self._raw_data_sums[channel] = [
+                (np.zeros(freq_arr.size), np.zeros(freq_arr.size, dtype=int)) for freq_arr in
+                self._frequency_data
+            ]
+            self._raw_data_window_sums[channel] = [
+                (np.zeros(freq_arr.size), np.zeros(freq_arr.size, dtype=int)) for freq_arr in
                 self._frequency_data
             ]
             self._signal_data[channel] = [
                 np.zeros(freq_arr.size) for freq_arr in self._frequency_data
             ]
             self._fit_results[channel] = [None] * len(self._frequency_data)
+        self._update_raw_data_views()
+
+    def _update_raw_data_views(self):
+        """ Update the raw data matrices, i.e. views into the line buffers.
+
+        Sweep number i (see _raw_data_lines) is written to column (line_buffer_size - 1 - i) of the
+        line buffer which is twice the size of the raw data matrix. The raw data matrix view
+        starting at the most recent sweep hence contains all sweeps in reverse chronological order
+        followed by (never written) NaN columns.
+        """
+        line_buffer_size = next(iter(self._raw_data_buffer.values()))[0].shape[1] // 2
+        start = line_buffer_size - self._raw_data_lines
+        self._raw_data = {
+            ch: [buffer[:, start:start + line_buffer_size] for buffer in range_list] for
+            ch, range_list in self._raw_data_buffer.items()
+        }
+
+    def _add_raw_data_line(self, new_counts):
+        """ Write the data of a new sweep into the line buffers and update the running sums.
+
+        @param dict new_counts: count data of the sweep for each channel
+        """
+        # Expand line buffers if they are too small
+        line_buffer_size = next(iter(self._raw_data_buffer.values()))[0].shape[1] // 2
+        if self._raw_data_lines == line_buffer_size:
+            self.log.debug(f'extending data grid for sweep number {self._raw_data_lines}')
+            new_size = line_buffer_size + self.__estimated_lines
+            for range_list in self._raw_data_buffer.values():
+                for range_index, buffer in enumerate(range_list):
+                    new_buffer = np.full((buffer.shape[0], 2 * new_size), np.nan)
+                    new_buffer[:, new_size - line_buffer_size:new_size] = \
+                        buffer[:, :line_buffer_size]
+                    range_list[range_index] = new_buffer
+            self.log.warning(
+                'raw data scan line buffer was not big enough for the entire measurement. '
+                'Buffer will be expanded.\nOld line buffer size was {0:d}, new line buffer '
+                'size is {1:d}.'.format(line_buffer_size, new_size)
+            )
+            line_buffer_size = new_size
+
+        column = line_buffer_size - 1 - self._raw_data_lines
+        for ch, range_list in self._raw_data_buffer.items():
+            start = 0
+            for range_index, range_params in enumerate(self._scan_frequency_ranges):
+                buffer = range_list[range_index]
+                tmp = new_counts[ch][start:start + range_params[-1]]
+                buffer[0:len(tmp), column] = tmp
+                start += range_params[-1]
+                # Update running sums of valid (finite) values
+                line = buffer[:, column]
+                valid = np.isfinite(line)
+                valid_line = np.where(valid, line, 0)
+                line_sum, line_count = self._raw_data_sums[ch][range_index]
+                line_sum += valid_line
+                line_count += valid
+                if self._scans_to_average > 0:
+                    window_sum, window_count = self._raw_data_window_sums[ch][range_index]
+                    window_sum += valid_line
+                    window_count += valid
+                    if self._raw_data_lines >= self._scans_to_average:
+                        # remove the sweep leaving the averaging window
+                        old_line = buffer[:, column + self._scans_to_average]
+                        old_valid = np.isfinite(old_line)
+                        window_sum -= np.where(old_valid, old_line, 0)
+                        window_count -= old_valid
+        self._raw_data_lines += 1
+        self._update_raw_data_views()
+
+    def _calculate_window_sums(self):
+        """ (Re-)calculate the running sums over the last <scans_to_average> sweeps. """
+        for ch, range_list in self._raw_data.items():
+            for range_index, raw_data in enumerate(range_list):
+                window_data = raw_data[:, :self._scans_to_average]
+                valid = np.isfinite(window_data)
+                self._raw_data_window_sums[ch][range_index] = (
+                    np.sum(np.where(valid, window_data, 0), axis=1),
+                    np.sum(valid, axis=1)
+                )
 
     def _calculate_signal_data(self):
-        for channel, raw_data_list in self._raw_data.items():
-            for range_index, raw_data in enumerate(raw_data_list):
-                masked_raw_data = np.ma.masked_invalid(raw_data)
-                if masked_raw_data.compressed().size == 0:
-                    arr_size = self._frequency_data[range_index].size
-                    self._signal_data[channel][range_index] = np.zeros(arr_size)
-                elif self._scans_to_average > 0:
-                    self._signal_data[channel][range_index] = np.mean(
-                        masked_raw_data[:, :self._scans_to_average],
-                        axis=1
-                    ).compressed()
-                    if self._signal_data[channel][range_index].size == 0:
-                        arr_size = self._frequency_data[range_index].size
-                        self._signal_data[channel][range_index] = np.zeros(arr_size)
-                else:
-                    self._signal_data[channel][range_index] = np.mean(masked_raw_data,
-                                                                      axis=1).compressed()
+        """ Calculate the averaged signal from the running sums of valid raw data values.
+        Frequencies without any valid value are omitted.
+        """
+        if self._scans_to_average > 0:
+            raw_data_sums = self._raw_data_window_sums
+        else:
+            raw_data_sums = self._raw_data_sums
+        for channel, sums_list in raw_data_sums.items():
+            for range_index, (data_sum, data_count) in enumerate(sums_list):
+                valid = data_count > 0
+                signal = data_sum[valid] / data_count[valid]
+                if signal.size == 0:
+                    signal = np.zeros(self._frequency_data[range_index].size)
+                self._signal_data[channel][range_index] = signal
 
     @property
     def fit_config_model(self):
@@ -276,6 +381,7 @@ class OdmrLogic(LogicBase):
             scans_to_average = int(number_of_scans)
             if scans_to_average != self._scans_to_average:
                 self._scans_to_average = scans_to_average
+                self._calculate_window_sums()
                 self._calculate_signal_data()
                 self.sigScanParametersUpdated.emit({'averaged_scans': self._scans_to_average})
                 self.sigScanDataUpdated.emit()
@@ -525,11 +631,24 @@ class OdmrLogic(LogicBase):
                                   'output mode "JUMP_LIST".')
                 else:
                     mode = self._default_scan_mode
+                if self._sweeps_per_frame > 1 and mode != SamplingOutputMode.JUMP_LIST:
+                    if microwave.constraints.mode_supported(SamplingOutputMode.JUMP_LIST):
+                        mode = SamplingOutputMode.JUMP_LIST
+                        self.log.info('Multiple sweeps per frame set up. Trying to switch scanner '
+                                      'to output mode "JUMP_LIST".')
+                    else:
+                        self.log.warning('Multiple sweeps per frame require the "JUMP_LIST" output '
+                                         'mode. Acquiring a single sweep per frame instead.')
+                self.__frame_sweeps = 1
                 if mode == SamplingOutputMode.JUMP_LIST:
                     frequencies = np.concatenate(self._frequency_data)
                     if self._oversampling_factor > 1:
                         frequencies = np.repeat(frequencies, self._oversampling_factor)
                     samples = len(frequencies)
+                    if self._sweeps_per_frame > 1:
+                        self.__frame_sweeps = self._get_frame_sweeps(samples)
+                        frequencies = np.tile(frequencies, self.__frame_sweeps)
+                        samples = len(frequencies)
                 elif mode == SamplingOutputMode.EQUIDISTANT_SWEEP:
                     frequencies = self._scan_frequency_ranges[0]
                     samples = frequencies[-1]
@@ -556,6 +675,22 @@ class OdmrLogic(LogicBase):
             self._start_time = time.time()
             self._sigNextLine.emit()
 
+    def _get_frame_sweeps(self, samples_per_sweep):
+        """ Get the number of sweeps per frame (ConfigOption sweeps_per_frame) limited by the
+        maximum scan size of the microwave and the maximum frame size of the data scanner.
+
+        @param int samples_per_sweep: Number of samples of a single frequency sweep
+        @return int: Number of sweeps to acquire per frame
+        """
+        max_samples = min(self.microwave_constraints.max_scan_size,
+                          self.data_constraints.max_frame_size)
+        max_sweeps = max(1, int(max_samples // samples_per_sweep))
+        if self._sweeps_per_frame > max_sweeps:
+            self.log.warning(f'{self._sweeps_per_frame:d} sweeps per frame exceed the maximum scan '
+                             f'size of the hardware. Acquiring {max_sweeps:d} sweeps per frame.')
+            return max_sweeps
+        return self._sweeps_per_frame
+
     @QtCore.Slot()
     def continue_odmr_scan(self):
         """ Continue ODMR scan.
@@ -601,7 +736,8 @@ class OdmrLogic(LogicBase):
 
     @QtCore.Slot()
     def _scan_odmr_line(self):
-        """ Perform a single scan over the specified frequency range
+        """ Perform a single scan (or multiple scans, see ConfigOption sweeps_per_frame) over the
+        specified frequency range
         """
         with self._threadlock:
             # If the odmr measurement is not running do nothing and break the Qt signal loop
@@ -623,37 +759,21 @@ class OdmrLogic(LogicBase):
                 self.stop_odmr_scan()
                 return
 
-            # Add new count data to raw_data array and append if array is too small
-            current_line_buffer_size = next(iter(self._raw_data.values()))[0].shape[1]
-            if self._elapsed_sweeps == current_line_buffer_size:
-                self.log.debug(f'extending data grid for sweep number {self._elapsed_sweeps}')
-                expand_arrays = tuple(np.full((r[-1], self.__estimated_lines), np.nan) for r in
-                                      self._scan_frequency_ranges)
-                self._raw_data = {
-                    ch: [np.concatenate((r, expand_arrays[ii]), axis=0) for ii, r in
-                         enumerate(range_list)] for ch, range_list in self._raw_data.items()
-                }
-                self.log.warning(
-                    'raw data scan line buffer was not big enough for the entire measurement. '
-                    'Buffer will be expanded.\nOld line buffer size was {0:d}, new line buffer '
-                    'size is {1:d}.'.format(current_line_buffer_size,
-                                            current_line_buffer_size + self.__estimated_lines)
-                )
-
-            # shift data in the array "up" and add new data at the "bottom"
-            for ch, range_list in self._raw_data.items():
-                start = 0
-                for range_index, range_params in enumerate(self._scan_frequency_ranges):
-                    range_list[range_index] = np.roll(range_list[range_index], 1, axis=1)
-                    tmp = new_counts[ch][start:start + range_params[-1]]
-                    range_list[range_index][0:len(tmp), 0] = tmp
-                    start += range_params[-1]
+            # Split frame into sweeps and add them to raw data line buffers (expanded if too small)
+            if self.__frame_sweeps > 1:
+                sweep_counts = {ch: np.split(counts, self.__frame_sweeps) for ch, counts in
+                                new_counts.items()}
+                for sweep in range(self.__frame_sweeps):
+                    self._add_raw_data_line({ch: counts[sweep] for ch, counts in
+                                             sweep_counts.items()})
+            else:
+                self._add_raw_data_line(new_counts)
 
             # Calculate averaged signal
             self._calculate_signal_data()
 
             # Update elapsed time/sweeps
-            self._elapsed_sweeps += 1
+            self._elapsed_sweeps += self.__frame_sweeps
             self._elapsed_time = time.time() - self._start_time
 
             # Fire update signals
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains the vectorized sampling engine used by the Qudi sequence generator logic to
+create the samples of a PulseBlockEnsemble.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import sys
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class EnsembleSampler:
+    """
+    Helper class to sample a PulseBlockEnsemble chunk by chunk without iterating over every single
+    repetition and PulseBlockElement in Python.
+
+    Upon construction the element boundaries (in bins) are precomputed from the
+    "elements_length_bins" array returned by SequenceGeneratorLogic.analyze_block_ensemble.
+    Each element in the waveform is mapped onto the (few) unique PulseBlockElement instances of the
+    used PulseBlocks.
+    Digital samples are then filled by run-length expansion (numpy.repeat) of the element states.
+    Analog samples are calculated with a single call per unique sampling function and channel,
+    provided the sampling function is flagged as "is_pointwise". All other sampling functions are
+    evaluated element by element just like before.
+
+    Instances of this class hold no reference to the logic module and can be pickled.
+    """
+
+    def __init__(self, ensemble, blocks, elements_length_bins, sample_rate, analog_amplitudes,
+                 analog_channels, digital_channels):
+        """
+        @param PulseBlockEnsemble ensemble: The ensemble to sample
+        @param dict blocks: PulseBlock instances used in the ensemble (keys are the block names)
+        @param numpy.ndarray elements_length_bins: element lengths in bins (incl. repetitions)
+        @param float sample_rate: The sample rate in samples/s
+        @param dict analog_amplitudes: peak-to-peak amplitudes for all analog channels
+        @param set analog_channels: analog channels to sample
+        @param set digital_channels: digital channels to sample
+        """
+        self.sample_rate = float(sample_rate)
+        self.rotating_frame = ensemble.rotating_frame
+        self.analog_channels = set(analog_channels)
+        self.digital_channels = set(digital_channels)
+        self._analog_norm = {chnl: analog_amplitudes[chnl] / 2 for chnl in self.analog_channels}
+
+        # Collect the unique PulseBlockElement instances and the chronological order in which
+        # they occur in the waveform (incl. repetitions)
+        unique_elements = list()
+        block_offsets = dict()
+        element_index = list()
+        for block_name, reps in ensemble.block_list:
+            if block_name not in block_offsets:
+                block_offsets[block_name] = len(unique_elements)
+                unique_elements.extend(blocks[block_name].element_list)
+            offset = block_offsets[block_name]
+            block_indices = np.arange(offset, offset + len(blocks[block_name]), dtype='int64')
+            element_index.append(np.tile(block_indices, reps + 1))
+        if element_index:
+            self._element_index = np.concatenate(element_index)
+        else:
+            self._element_index = np.empty(0, dtype='int64')
+
+        elements_length_bins = np.asarray(elements_length_bins, dtype='int64')
+        if len(elements_length_bins) != len(self._element_index):
+            raise ValueError('Number of element lengths ({0:d}) does not match the number of '
+                             'elements in PulseBlockEnsemble "{1}" ({2:d}).'
+                             ''.format(len(elements_length_bins),
+                                       ensemble.name,
+                                       len(self._element_index)))
+        # Start bin of each element. The last entry is the total number of samples.
+        self._element_start_bins = np.zeros(len(elements_length_bins) + 1, dtype='int64')
+        np.cumsum(elements_length_bins, out=self._element_start_bins[1:])
+
+        # Digital channel state lookup for each unique element
+        self._digital_states = dict()
+        for chnl in self.digital_channels:
+            self._digital_states[chnl] = np.array(
+                [elem.digital_high[chnl] for elem in unique_elements], dtype=bool)
+
+        # Group the unique elements by equal sampling function for each analog channel.
+        # Lookup array contains the function index for each unique element.
+        self._analog_functions = dict()
+        self._analog_function_index = dict()
+        for chnl in self.analog_channels:
+            functions = list()
+            function_keys = list()
+            function_index = np.empty(len(unique_elements), dtype='int64')
+            for elem_no, elem in enumerate(unique_elements):
+                func = elem.pulse_function[chnl]
+                key = self._get_function_key(func)
+                try:
+                    function_index[elem_no] = function_keys.index(key)
+                except ValueError:
+                    function_index[elem_no] = len(functions)
+                    functions.append(func)
+                    function_keys.append(key)
+            self._analog_functions[chnl] = functions
+            self._analog_function_index[chnl] = function_index
+
+    @property
+    def number_of_samples(self):
+        return int(self._element_start_bins[-1])
+
+    @staticmethod
+    def _get_function_key(func):
+        # Same criteria as used in SamplingBase.__eq__
+        return (type(func).__name__, *(getattr(func, param) for param in func.params))
+
+    def sample_chunk(self, start_bin, analog_samples, digital_samples, offset_bin=0):
+        """ Calculate the samples starting at sample index "start_bin" of the ensemble and write them
+        into the provided sample arrays. The number of samples to calculate is given by the length
+        of the sample arrays.
+
+        @param int start_bin: Index of the first sample to calculate within the ensemble
+        @param dict analog_samples: preallocated float32 arrays to fill for each analog channel
+        @param dict digital_samples: preallocated bool arrays to fill for each digital channel
+        @param int offset_bin: Offset bin of the first sample in the ensemble used to maintain the
+                               rotating frame (same meaning as in sample_pulse_block_ensemble)
+        """
+        if analog_samples:
+            chunk_length = len(next(iter(analog_samples.values())))
+        elif digital_samples:
+            chunk_length = len(next(iter(digital_samples.values())))
+        else:
+            return
+        if chunk_length == 0:
+            return
+        stop_bin = start_bin + chunk_length
+
+        # Find all elements overlapping with the current chunk and clip their boundaries
+        first = np.searchsorted(self._element_start_bins, start_bin, side='right') - 1
+        last = np.searchsorted(self._element_start_bins, stop_bin, side='left')
+        piece_starts = np.maximum(self._element_start_bins[first:last], start_bin) - start_bin
+        piece_stops = np.minimum(self._element_start_bins[first + 1:last + 1], stop_bin) - start_bin
+        piece_lengths = piece_stops - piece_starts
+        element_index = self._element_index[first:last]
+
+        for chnl, samples in digital_samples.items():
+            samples[:] = np.repeat(self._digital_states[chnl][element_index], piece_lengths)
+
+        if not analog_samples:
+            return
+
+        # Time bins for each sample within the chunk. If the rotating frame is not preserved, each
+        # element (or element part within a chunk) starts at offset_bin.
+        if self.rotating_frame:
+            time_bins = np.arange(offset_bin + start_bin,
+                                  offset_bin + stop_bin,
+                                  dtype='int64')
+        else:
+            time_bins = np.arange(chunk_length, dtype='int64') + offset_bin
+            time_bins -= np.repeat(piece_starts, piece_lengths)
+
+        for chnl, samples in analog_samples.items():
+            norm = self._analog_norm[chnl]
+            functions = self._analog_functions[chnl]
+            piece_functions = self._analog_function_index[chnl][element_index]
+            used_functions = np.unique(piece_functions)
+            sample_functions = None
+            for func_no in used_functions:
+                func = functions[func_no]
+                if func.is_pointwise:
+                    if len(used_functions) == 1:
+                        samples[:] = func.get_samples(time_bins / self.sample_rate) / norm
+                    else:
+                        if sample_functions is None:
+                            sample_functions = np.repeat(piece_functions, piece_lengths)
+                        indices = np.flatnonzero(sample_functions == func_no)
+                        samples[indices] = func.get_samples(
+                            time_bins[indices] / self.sample_rate) / norm
+                else:
+                    for piece_no in np.flatnonzero(piece_functions == func_no):
+                        if piece_lengths[piece_no] == 0:
+                            continue
+                        piece = slice(piece_starts[piece_no], piece_stops[piece_no])
+                        samples[piece] = func.get_samples(
+                            time_bins[piece] / self.sample_rate) / norm
+
+
+class SharedSampleBuffer:
+    """
+    Sample arrays for all channels of a waveform backed by shared memory.
+
+    The buffer is created by the owning process which also has to release it by calling "close".
+    Worker processes can fill the buffer after attaching to it by name, see
+    "sample_into_shared_buffer".
+    """
+
+    def __init__(self, analog_channels, digital_channels, number_of_samples):
+        self.number_of_samples = int(number_of_samples)
+        self._shared_memory = dict()
+        self.analog_samples = dict()
+        self.digital_samples = dict()
+        try:
+            for chnl in analog_channels:
+                self._shared_memory[chnl] = shared_memory.SharedMemory(
+                    create=True, size=max(4 * self.number_of_samples, 1))
+                self.analog_samples[chnl] = np.ndarray(self.number_of_samples,
+                                                       dtype='float32',
+                                                       buffer=self._shared_memory[chnl].buf)
+            for chnl in digital_channels:
+                self._shared_memory[chnl] = shared_memory.SharedMemory(
+                    create=True, size=max(self.number_of_samples, 1))
+                self.digital_samples[chnl] = np.ndarray(self.number_of_samples,
+                                                        dtype=bool,
+                                                        buffer=self._shared_memory[chnl].buf)
+        except:
+            self.close()
+            raise
+
+    @property
+    def names(self):
+        """ Dict containing the shared memory block names for each channel """
+        return {chnl: shm.name for chnl, shm in self._shared_memory.items()}
+
+    def close(self):
+        """ Release the shared memory. The sample arrays can not be used afterwards. """
+        self.analog_samples = dict()
+        self.digital_samples = dict()
+        for shm in self._shared_memory.values():
+            shm.close()
+            shm.unlink()
+        self._shared_memory = dict()
+
+
+def sample_into_shared_buffer(sampler, buffer_names, offset_bin=0):
+    """ Sample a complete PulseBlockEnsemble into a SharedSampleBuffer. Meant to be called in a
+    worker process.
+
+    @param EnsembleSampler sampler: The sampler instance of the ensemble
+    @param dict buffer_names: shared memory block names for each channel (SharedSampleBuffer.names)
+    @param int offset_bin: Offset bin of the first sample to maintain the rotating frame
+    """
+    number_of_samples = sampler.number_of_samples
+    shared = dict()
+    try:
+        for chnl, name in buffer_names.items():
+            shared[chnl] = shared_memory.SharedMemory(name=name)
+        analog_samples = {chnl: np.ndarray(number_of_samples, dtype='float32', buffer=shared[chnl].buf)
+                          for chnl in sampler.analog_channels}
+        digital_samples = {chnl: np.ndarray(number_of_samples, dtype=bool, buffer=shared[chnl].buf)
+                           for chnl in sampler.digital_channels}
+        sampler.sample_chunk(0, analog_samples, digital_samples, offset_bin)
+        del analog_samples, digital_samples
+    finally:
+        for shm in shared.values():
+            shm.close()
+
+
+def init_sampling_worker(import_paths):
+    """ Initializer for worker processes to make additional sampling function modules importable.
+
+    @param list import_paths: additional paths to append to sys.path
+    """
+    for path in import_paths:
+        if path not in sys.path:
+            sys.path.append(path)
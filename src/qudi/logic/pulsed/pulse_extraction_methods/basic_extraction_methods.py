@@ -166,12 +166,20 @@ class BasicPulseExtractor(PulseExtractorBase):
         rising_ind = np.empty(number_of_lasers, dtype='int64')
         falling_ind = np.empty(number_of_lasers, dtype='int64')
 
+        # The global maxima and minima are not searched in the whole array for each laser pulse.
+        # Instead the largest and smallest values are determined once and consumed in order while
+        # skipping the positions that have been set to 0 in the meantime.
+        zeroed = np.zeros(conv_deriv.size, dtype=bool)
+        expected_count = number_of_lasers * (int(4 * conv_std_dev) + 2)
+        max_search = _ExtremumSearch(conv_deriv, zeroed, True, expected_count)
+        min_search = _ExtremumSearch(conv_deriv, zeroed, False, expected_count)
+
         # Find as many rising and falling flanks as there are laser pulses in
         # the trace:
         for i in range(number_of_lasers):
             # save the index of the absolute maximum of the derived time trace
             # as rising edge position
-            rising_ind[i] = np.argmax(conv_deriv)
+            rising_ind[i] = max_search.next()
 
             # refine the rising edge detection, by using a small and fixed
             # conv_std_dev parameter to find the inflection point more precise
@@ -199,10 +207,11 @@ class BasicPulseExtractor(PulseExtractorBase):
             else:
                 del_ind_stop = rising_ind[i] + int(2 * conv_std_dev)
                 conv_deriv[del_ind_start:del_ind_stop] = 0
+                zeroed[del_ind_start:del_ind_stop] = True
 
             # save the index of the absolute minimum of the derived time trace
             # as falling edge position
-            falling_ind[i] = np.argmin(conv_deriv)
+            falling_ind[i] = min_search.next()
 
             # refine the falling edge detection, by using a small and fixed
             # conv_std_dev parameter to find the inflection point more precise
@@ -230,6 +239,7 @@ class BasicPulseExtractor(PulseExtractorBase):
             else:
                 del_ind_stop = falling_ind[i] + int(2 * conv_std_dev)
             conv_deriv[del_ind_start:del_ind_stop] = 0
+            zeroed[del_ind_start:del_ind_stop] = True
 
         # sort all indices of rising and falling flanks
         rising_ind.sort()
@@ -241,13 +251,13 @@ class BasicPulseExtractor(PulseExtractorBase):
         # initialize the empty output array
         laser_arr = np.zeros((number_of_lasers, laser_length), dtype='int64')
         # slice the detected laser pulses of the timetrace and save them in the
-        # output array according to the found rising edge
-        for i in range(number_of_lasers):
-            if rising_ind[i] + laser_length > count_data.size:
-                lenarr = count_data[rising_ind[i]:].size
-                laser_arr[i, 0:lenarr] = count_data[rising_ind[i]:]
-            else:
-                laser_arr[i] = count_data[rising_ind[i]:rising_ind[i] + laser_length]
+        # output array according to the found rising edge. Pulses exceeding the timetrace are
+        # padded with zeros.
+        if laser_length > 0:
+            padded_data = np.zeros(count_data.size + laser_length, dtype=count_data.dtype)
+            padded_data[:count_data.size] = count_data
+            laser_arr[:] = np.lib.stride_tricks.sliding_window_view(padded_data,
+                                                                    laser_length)[rising_ind]
 
         return_dict['laser_counts_arr'] = laser_arr.astype('int64')
         return_dict['laser_indices_rising'] = rising_ind
@@ -426,4 +436,70 @@ class BasicPulseExtractor(PulseExtractorBase):
                        'laser_indices_rising': np.arange(len(count_data)),
                        'laser_indices_falling': np.arange(len(count_data))}
 
-        return return_dict
\ No newline at end of file
+        return return_dict
+
+
+class _ExtremumSearch:
+    """
+    Helper to repeatedly find the index of the global maximum (or minimum) of an array, while parts
+    of the array are set to 0 between the searches. Yields the same indices as calling
+    numpy.argmax (numpy.argmin) on the modified array each time.
+
+    Instead of searching the whole array each time, the largest (smallest) values are selected by
+    partitioning and sorted once. Positions that have been set to 0 in the meantime (flagged in the
+    "zeroed" array) are skipped. If only values <= 0 (>= 0) are left, the whole array is searched.
+    """
+
+    def __init__(self, data, zeroed, find_max, count):
+        """
+        @param numpy.ndarray data: 1D array to search. Entries will be set to 0 by the caller.
+        @param numpy.ndarray zeroed: bool array flagging the entries of data set to 0 by the caller
+        @param bool find_max: Search for maxima if True, for minima otherwise
+        @param int count: Number of largest (smallest) values to preselect
+        """
+        self._data = data
+        self._zeroed = zeroed
+        self._sign = 1 if find_max else -1
+        self._count = max(int(count), 1)
+        self._candidates = np.empty(0, dtype='int64')
+        self._position = 0
+        self._complete = False
+        self._select_candidates()
+
+    def _select_candidates(self):
+        # Indices of all values larger than the count-th largest value (for maxima), sorted by
+        # descending value and ascending index (same tie breaking as numpy.argmax).
+        values = self._sign * self._data
+        if self._count >= values.size:
+            candidates = np.arange(values.size)
+            self._complete = True
+        else:
+            threshold = np.partition(values, values.size - self._count)[values.size - self._count]
+            candidates = np.flatnonzero(values > threshold)
+        self._candidates = candidates[np.argsort(-values[candidates], kind='stable')]
+        self._position = 0
+
+    def next(self):
+        """ Get the index of the current global maximum (minimum).
+
+        @return int: index of the extremum
+        """
+        while True:
+            # skip all entries that have been set to 0
+            while self._position < self._candidates.size and \
+                    self._zeroed[self._candidates[self._position]]:
+                self._position += 1
+            if self._position < self._candidates.size:
+                index = self._candidates[self._position]
+                if self._sign * self._data[index] > 0:
+                    return int(index)
+                break
+            if self._complete:
+                break
+            # All preselected values used up. Select more candidates.
+            self._count *= 2
+            self._select_candidates()
+        # Entries set to 0 compete with the remaining values. Search the whole array.
+        if self._sign > 0:
+            return int(np.argmax(self._data))
+        return int(np.argmin(self._data))
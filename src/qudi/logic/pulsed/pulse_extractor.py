@@ -21,8 +21,10 @@ If not, see <https://www.gnu.org/licenses/>.
 
 import os
 import sys
+import copy
 import inspect
 import importlib
+import numpy as np
 
 from qudi.util.helpers import natural_sort, iter_modules_recursive
 
@@ -79,6 +81,9 @@ class PulseExtractor(PulseExtractorBase):
 
     See BasicPulseExtractor class for an example usage.
     """
+    # A decrease of the fraction of counts within the locked laser pulse windows is only considered
+    # a drift if it exceeds this many standard deviations of the counting statistics.
+    _drift_significance = 3
 
     def __init__(self, pulsedmeasurementlogic):
         # Init base class
@@ -92,6 +97,16 @@ class PulseExtractor(PulseExtractorBase):
         # Currently selected extraction method
         self._current_extraction_method = None
 
+        # Locked extraction geometry. If locked, the laser pulse positions are detected once and
+        # reused for subsequent extractions (see extract_laser_pulses).
+        self._geometry_locked = False
+        self._geometry = None
+        # Name of the last extraction method whose laser pulse positions could not be locked
+        self._unlockable_method = None
+        # Maximum relative decrease of the fraction of counts within the locked laser pulse
+        # windows before the laser pulses are detected again.
+        self._drift_tolerance = float(pulsedmeasurementlogic.extraction_drift_tolerance)
+
         # import extraction modules from default namespace package
         # "qudi.logic.pulse_extraction_methods"
         try:
@@ -202,8 +217,34 @@ class PulseExtractor(PulseExtractorBase):
             else:
                 self.log.warning('No extraction parameter "{0}" found in PulseExtractor.\n'
                                  'Parameter will be ignored.'.format(parameter))
+        # Changed settings require a new detection of the laser pulses
+        self.reset_geometry()
         return
 
+    @property
+    def geometry_locked(self):
+        """
+        Flag indicating if the extraction geometry (i.e. the positions of the laser pulses) is
+        locked. If True, the laser pulses are detected once with the current extraction method and
+        subsequently gathered from the same positions, until reset_geometry is called or a drift
+        is detected.
+
+        @return bool: geometry lock flag
+        """
+        return self._geometry_locked
+
+    @geometry_locked.setter
+    def geometry_locked(self, locked):
+        self._geometry_locked = bool(locked)
+        self.reset_geometry()
+
+    def reset_geometry(self):
+        """
+        Discard the locked extraction geometry. The laser pulses are detected again upon the next
+        extraction.
+        """
+        self._geometry = None
+
     @property
     def extraction_methods(self):
         """
@@ -248,8 +289,154 @@ class PulseExtractor(PulseExtractorBase):
             extraction_method = self._gated_extraction_methods[self._current_extraction_method]
         else:
             extraction_method = self._ungated_extraction_methods[self._current_extraction_method]
+
+        # Gather laser pulses from the locked positions if possible
+        if self._geometry_locked and self._geometry is not None:
+            return_dict = self._extract_with_geometry(count_data)
+            if return_dict is not None:
+                return return_dict
+
         kwargs = self._get_extraction_method_kwargs(extraction_method)
-        return extraction_method(count_data=count_data, **kwargs)
+        return_dict = extraction_method(count_data=count_data, **kwargs)
+        if self._geometry_locked:
+            self._lock_geometry(count_data, return_dict)
+        return return_dict
+
+    def gather_laser_pulses(self, count_data):
+        """
+        Gather the laser pulses from the locked extraction geometry without running the
+        extraction method. Can be used for count data increments since gathering is linear in the
+        count data. The counts of consecutive increments are pooled for the drift detection until
+        a drift by the tolerance would be statistically significant.
+
+        @param numpy.ndarray count_data: 1D (ungated) or 2D (gated) array of count data increment
+        @return dict: result dictionary like returned by extract_laser_pulses or None if no
+                      extraction geometry is locked or the laser pulses need to be detected again
+        """
+        if not self._geometry_locked or self._geometry is None:
+            return None
+        return self._extract_with_geometry(count_data, increment=True)
+
+    def _lock_geometry(self, count_data, return_dict):
+        """
+        Store the positions of the laser pulses found by an extraction method to gather them from
+        subsequent count data. Failed extractions (laser pulses containing only zeros) are ignored.
+        The positions are only locked if gathering them reproduces the laser pulses returned by
+        the extraction method.
+
+        @param numpy.ndarray count_data: count data the laser pulses have been extracted from
+        @param dict return_dict: result dictionary of the extraction method
+        """
+        laser_arr = return_dict['laser_counts_arr']
+        if laser_arr.ndim != 2 or not laser_arr.any():
+            return
+        rising = return_dict['laser_indices_rising']
+        falling = return_dict['laser_indices_falling']
+        if count_data.ndim > 1:
+            # gated count data: the same slice of time bins for all gates
+            if np.ndim(rising) != 0 or laser_arr.shape[0] != count_data.shape[0]:
+                self._refuse_geometry_lock('Laser pulse indices do not match the gated count data.')
+                return
+            index = slice(int(rising), int(rising) + laser_arr.shape[1])
+            valid = None
+            if not np.array_equal(count_data[:, index], laser_arr):
+                self._refuse_geometry_lock('Laser pulses are not a slice of the count data.')
+                return
+        else:
+            # ungated count data: a window of the laser array width starting at each rising flank
+            if np.ndim(rising) != 1 or len(rising) != laser_arr.shape[0]:
+                self._refuse_geometry_lock('Extraction method does not return the positions of '
+                                           'the laser pulses within the count data.')
+                return
+            rising_arr = np.asarray(rising, dtype='int64')
+            index = rising_arr[:, np.newaxis] + np.arange(laser_arr.shape[1], dtype='int64')
+            valid = index < count_data.size
+            index[~valid] = 0
+            window_arr = count_data.take(index)
+            window_arr[~valid] = 0
+            if not np.array_equal(window_arr, laser_arr):
+                # Laser pulses of variable length are zero-padded after their falling flank.
+                # Mask the bins past the end of each pulse (falling index inclusive or exclusive).
+                lengths = np.asarray(falling, dtype='int64') - rising_arr
+                for pulse_lengths in (lengths + 1, lengths):
+                    pulse_valid = valid & (index - rising_arr[:, np.newaxis] <
+                                           pulse_lengths[:, np.newaxis])
+                    if np.array_equal(np.where(pulse_valid, window_arr, 0), laser_arr):
+                        valid = pulse_valid
+                        break
+                else:
+                    self._refuse_geometry_lock('Laser pulses do not match the windows starting at '
+                                               'the rising flanks.')
+                    return
+                index[~valid] = 0
+        self._geometry = {'shape': count_data.shape,
+                          'index': index,
+                          'valid': valid,
+                          'rising': rising,
+                          'falling': return_dict['laser_indices_falling'],
+                          'count_fraction': laser_arr.sum() / count_data.sum(),
+                          # counts of the increments since the last drift evaluation
+                          'pending_window_counts': 0,
+                          'pending_total_counts': 0}
+
+    def _refuse_geometry_lock(self, reason):
+        """
+        Log (once per extraction method) that the laser pulse positions can not be locked for the
+        current extraction method. The laser pulses are detected in each extraction instead.
+
+        @param str reason: reason why the positions can not be locked
+        """
+        if self._unlockable_method != self._current_extraction_method:
+            self._unlockable_method = self._current_extraction_method
+            self.log.warning(f'Unable to lock the extraction geometry for extraction method '
+                             f'"{self._current_extraction_method}". {reason} Laser pulses are '
+                             f'detected in each extraction.')
+
+    def _extract_with_geometry(self, count_data, increment=False):
+        """
+        Gather the laser pulses from the locked positions.
+
+        @param numpy.ndarray count_data: count data to extract the laser pulses from
+        @param bool increment: optional, count_data is an increment. Its counts are pooled with
+                               the previous increments for the drift detection.
+        @return dict: result dictionary like the extraction methods return or None if the laser
+                      pulses need to be detected again (changed data shape or drift)
+        """
+        geometry = self._geometry
+        if count_data.shape != geometry['shape']:
+            return None
+        if count_data.ndim > 1:
+            laser_arr = count_data[:, geometry['index']].astype('int64')
+        else:
+            laser_arr = count_data.take(geometry['index']).astype('int64')
+            laser_arr[~geometry['valid']] = 0
+
+        # Detect drift of the laser pulse positions by the fraction of counts within the windows
+        window_counts = int(laser_arr.sum())
+        total_counts = int(count_data.sum())
+        if increment:
+            window_counts += geometry['pending_window_counts']
+            total_counts += geometry['pending_total_counts']
+        if total_counts > 0:
+            reference = geometry['count_fraction']
+            deficit = reference - window_counts / total_counts
+            # standard deviation of the count fraction for total_counts counts
+            sigma = np.sqrt(reference * (1 - reference) / total_counts)
+            if deficit > max(reference * self._drift_tolerance,
+                             self._drift_significance * sigma):
+                self.log.debug('Drift of laser pulse positions detected. Detecting laser pulses '
+                               'again.')
+                return None
+        if increment:
+            if total_counts > 0 and \
+                    reference * self._drift_tolerance >= self._drift_significance * sigma:
+                # Enough counts to detect a drift by the tolerance. Start a new evaluation window.
+                window_counts = total_counts = 0
+            geometry['pending_window_counts'] = window_counts
+            geometry['pending_total_counts'] = total_counts
+        return {'laser_counts_arr': laser_arr,
+                'laser_indices_rising': copy.copy(geometry['rising']),
+                'laser_indices_falling': copy.copy(geometry['falling'])}
 
     def _get_extraction_method_kwargs(self, method):
         """
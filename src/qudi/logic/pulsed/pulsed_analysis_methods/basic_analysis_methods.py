@@ -56,35 +56,26 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         norm_start_bin = round(norm_start / bin_width)
         norm_end_bin = round(norm_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum and mean of the data in the normalization window
-            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
-            reference_sum = np.sum(tmp_data)
-            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # calculate the sum and mean of the data in the signal window
-            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
-            signal_sum = np.sum(tmp_data)
-            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
-
-            # Calculate normalized signal while avoiding division by zero
-            if reference_mean > 0 and signal_mean >= 0:
-                signal_data[ii] = signal_mean / reference_mean
-            else:
-                signal_data[ii] = 0.0
-
-            # Calculate measurement error while avoiding division by zero
-            if reference_sum > 0 and signal_sum > 0:
-                # calculate with respect to gaussian error 'evolution'
-                error_data[ii] = signal_data[ii] * np.sqrt(1 / signal_sum + 1 / reference_sum)
-            else:
-                error_data[ii] = 0.0
-
+        # calculate the sum and mean of the data in the normalization window for all laser pulses
+        reference_sum, reference_mean = self._get_window_sum_mean(laser_data,
+                                                                  norm_start_bin,
+                                                                  norm_end_bin)
+        # calculate the sum and mean of the data in the signal window for all laser pulses
+        signal_sum, signal_mean = self._get_window_sum_mean(laser_data,
+                                                            signal_start_bin,
+                                                            signal_end_bin)
+
+        # Calculate normalized signal while avoiding division by zero
+        signal_data = np.zeros(num_of_lasers, dtype=float)
+        valid = (reference_mean > 0) & (signal_mean >= 0)
+        np.divide(signal_mean, reference_mean, out=signal_data, where=valid)
+
+        # Calculate measurement error while avoiding division by zero
+        # calculate with respect to gaussian error 'evolution'
+        error_data = np.zeros(num_of_lasers, dtype=float)
+        valid = (reference_sum > 0) & (signal_sum > 0)
+        error_data[valid] = signal_data[valid] * np.sqrt(1 / signal_sum[valid] +
+                                                         1 / reference_sum[valid])
         return signal_data, error_data
 
     def analyse_sum(self, laser_data, signal_start=0.0, signal_end=200e-9):
@@ -106,24 +97,12 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
+        # calculate the sum of the data in the signal window for all laser pulses
+        signal_data = laser_data[:, signal_start_bin:signal_end_bin].sum(axis=1).astype(float)
 
+        # Avoid numpy C type variables overflow and NaN values
+        signal_data[~(signal_data >= 0)] = 0.0
+        error_data = np.sqrt(signal_data)
         return signal_data, error_data
 
     def analyse_mean(self, laser_data, signal_start=0.0, signal_end=200e-9):
@@ -146,25 +125,21 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         signal_start_bin = round(signal_start / bin_width)
         signal_end_bin = round(signal_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
-
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the mean of the data in the signal window
-            signal = laser_arr[signal_start_bin:signal_end_bin].mean()
-            signal_sum = laser_arr[signal_start_bin:signal_end_bin].sum()
-            signal_error = np.sqrt(signal_sum) / (signal_end_bin - signal_start_bin)
-
-            # Avoid numpy C type variables overflow and NaN values
-            if signal < 0 or signal != signal:
-                signal_data[ii] = 0.0
-                error_data[ii] = 0.0
-            else:
-                signal_data[ii] = signal
-                error_data[ii] = signal_error
+        # The mean of an empty signal window is not defined
+        if laser_data[:, signal_start_bin:signal_end_bin].shape[1] == 0:
+            return np.zeros(num_of_lasers), np.zeros(num_of_lasers)
 
+        # calculate the sum and mean of the data in the signal window for all laser pulses
+        signal_sum, signal_data = self._get_window_sum_mean(laser_data,
+                                                            signal_start_bin,
+                                                            signal_end_bin)
+        with np.errstate(invalid='ignore'):
+            error_data = np.sqrt(signal_sum) / (signal_end_bin - signal_start_bin)
+
+        # Avoid numpy C type variables overflow and NaN values
+        invalid = ~(signal_data >= 0)
+        signal_data[invalid] = 0.0
+        error_data[invalid] = 0.0
         return signal_data, error_data
 
     def analyse_pass_through(self, laser_data):
@@ -214,25 +189,37 @@ class BasicPulseAnalyzer(PulseAnalyzerBase):
         norm_start_bin = round(norm_start / bin_width)
         norm_end_bin = round(norm_end / bin_width)
 
-        # initialize data arrays for signal and measurement error
-        signal_data = np.empty(num_of_lasers, dtype=float)
-        error_data = np.empty(num_of_lasers, dtype=float)
+        # calculate the sum and mean of the data in the normalization window for all laser pulses
+        reference_sum, reference_mean = self._get_window_sum_mean(laser_data,
+                                                                  norm_start_bin,
+                                                                  norm_end_bin)
+        # calculate the sum and mean of the data in the signal window for all laser pulses
+        signal_sum, signal_mean = self._get_window_sum_mean(laser_data,
+                                                            signal_start_bin,
+                                                            signal_end_bin)
 
-        # loop over all laser pulses and analyze them
-        for ii, laser_arr in enumerate(laser_data):
-            # calculate the sum and mean of the data in the normalization window
-            tmp_data = laser_arr[norm_start_bin:norm_end_bin]
-            reference_sum = np.sum(tmp_data)
-            reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        signal_data = signal_mean - reference_mean
 
-            # calculate the sum and mean of the data in the signal window
-            tmp_data = laser_arr[signal_start_bin:signal_end_bin]
-            signal_sum = np.sum(tmp_data)
-            signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        # calculate with respect to gaussian error 'evolution'
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error_data = signal_data * np.sqrt(1 / np.abs(signal_sum) + 1 / np.abs(reference_sum))
+        return signal_data, error_data
 
-            signal_data[ii] = signal_mean - reference_mean
+    @staticmethod
+    def _get_window_sum_mean(laser_data, start_bin, end_bin):
+        """ Calculate the sum and mean of the data within a time window for all laser pulses.
+        The mean of an empty window is 0.
 
-            # calculate with respect to gaussian error 'evolution'
-            error_data[ii] = signal_data[ii] * np.sqrt(1 / abs(signal_sum) + 1 / abs(reference_sum))
+        @param 2D numpy.ndarray laser_data: the laser pulses (dim 0: laser number; dim 1: time bin)
+        @param int start_bin: start index of the window
+        @param int end_bin: end index of the window (exclusive)
 
-        return signal_data, error_data
+        @return numpy.ndarray, numpy.ndarray: sum and mean of the window for each laser pulse
+        """
+        window = laser_data[:, start_bin:end_bin]
+        window_sum = window.sum(axis=1)
+        if window.shape[1] != 0:
+            window_mean = window_sum / window.shape[1]
+        else:
+            window_mean = np.zeros(window_sum.shape, dtype=float)
+        return window_sum, window_mean
@@ -64,6 +64,8 @@ class PulsedMeasurementLogic(LogicBase):
             raw_data_save_type: 'text'
             #additional_extraction_path: # optional
             #additional_analysis_path:   # optional
+            #extraction_drift_tolerance: 0.05 # optional, only used with locked extraction geometry
+            #incremental_raw_data: False # optional, accumulate raw data increments
         connect:
             fastcounter: 'fast_counter_dummy'
             pulsegenerator: 'pulser_dummy'
@@ -84,6 +86,19 @@ class PulsedMeasurementLogic(LogicBase):
                                              default='text',
                                              constructor=_data_storage_from_cfg_option)
     _save_thumbnails = ConfigOption(name='save_thumbnails', default=True)
+    # Maximum relative decrease of the fraction of counts within the laser pulses before the laser
+    # pulses are detected again if the extraction geometry is locked. The decrease must also be
+    # statistically significant (3 sigma), so increments are pooled until they contain enough
+    # counts.
+    extraction_drift_tolerance = ConfigOption(name='extraction_drift_tolerance',
+                                              default=0.05,
+                                              missing='nothing')
+    # Accumulate the raw data from increments instead of replacing it by the complete trace in each
+    # analysis step. Fast counters supporting "get_data_trace_increment" only transfer the
+    # increment.
+    _incremental_raw_data = ConfigOption(name='incremental_raw_data',
+                                         default=False,
+                                         missing='nothing')
 
     # status variables
     # ext. microwave settings
@@ -112,6 +127,7 @@ class PulsedMeasurementLogic(LogicBase):
 
     # PulseExtractor settings
     extraction_parameters = StatusVar(default=None)
+    _extraction_geometry_locked = StatusVar(name='extraction_geometry_locked', default=False)
     analysis_parameters = StatusVar(default=None)
 
     # Container to store measurement information about the currently loaded sequence
@@ -234,6 +250,9 @@ class PulsedMeasurementLogic(LogicBase):
 
         self._saved_raw_data = dict()  # temporary saved raw data
         self._recalled_raw_data_tag = None  # the currently recalled raw data dict key
+        # incremental raw data accumulation
+        self._raw_data_initialized = False  # raw_data contains the accumulated increments
+        self._last_fc_data = None  # last full trace of counters not supporting increments
 
         # Paused measurement flag
         self.__is_paused = False
@@ -252,6 +271,7 @@ class PulsedMeasurementLogic(LogicBase):
         """
         # Create an instance of PulseExtractor
         self._pulseextractor = PulseExtractor(pulsedmeasurementlogic=self)
+        self._pulseextractor.geometry_locked = self._extraction_geometry_locked
         self._pulseanalyzer = PulseAnalyzer(pulsedmeasurementlogic=self)
 
         # QTimer must be created here instead of __init__ because otherwise the timer will not run
@@ -806,6 +826,40 @@ class PulsedMeasurementLogic(LogicBase):
             self.sigExtractionSettingsUpdated.emit(self.extraction_settings)
         return
 
+    @property
+    def extraction_geometry_locked(self):
+        return self._extraction_geometry_locked
+
+    @extraction_geometry_locked.setter
+    def extraction_geometry_locked(self, locked):
+        self.set_extraction_geometry_locked(locked)
+
+    @QtCore.Slot(bool)
+    def set_extraction_geometry_locked(self, locked):
+        """
+        Lock the extraction geometry, i.e. detect the laser pulse positions once per measurement
+        with the current extraction method and gather the laser pulses from these positions
+        afterwards. The laser pulses are detected again if a drift is detected (see ConfigOption
+        "extraction_drift_tolerance") or upon calling redetect_laser_pulses.
+
+        @param bool locked: Lock the extraction geometry (True) or detect laser pulses in each
+                            analysis step (False)
+        """
+        with self._threadlock:
+            self._extraction_geometry_locked = bool(locked)
+            self._pulseextractor.geometry_locked = self._extraction_geometry_locked
+        return
+
+    @QtCore.Slot()
+    def redetect_laser_pulses(self):
+        """
+        Discard the locked extraction geometry. The laser pulses will be detected again during the
+        next analysis step.
+        """
+        with self._threadlock:
+            self._pulseextractor.reset_geometry()
+        return
+
     @QtCore.Slot(dict)
     def set_measurement_settings(self, settings_dict=None, **kwargs):
         """
@@ -907,6 +961,13 @@ class PulsedMeasurementLogic(LogicBase):
                 # initialize data arrays
                 self._initialize_data_arrays()
 
+                # detect laser pulses again for the new measurement
+                self._pulseextractor.reset_geometry()
+
+                # reset raw data accumulation
+                self._raw_data_initialized = False
+                self._last_fc_data = None
+
                 # recall stashed raw data
                 if stashed_raw_data_tag in self._saved_raw_data:
                     self._recalled_raw_data_tag = stashed_raw_data_tag
@@ -1219,10 +1280,8 @@ class PulsedMeasurementLogic(LogicBase):
             calculates fluorescence signal and creates plots.
         """
         with self._threadlock:
-            if self.module_state() == 'locked':
-                # Update elapsed time
-
-                self._extract_laser_pulses()
+            # Skip the analysis if no new data has been acquired since the last analysis step
+            if self.module_state() == 'locked' and self._extract_laser_pulses():
 
                 tmp_signal, tmp_error = self._analyze_laser_pulses()
 
@@ -1265,6 +1324,14 @@ class PulsedMeasurementLogic(LogicBase):
             return
 
     def _extract_laser_pulses(self):
+        """
+        Update the raw data and extract the laser pulses from it.
+
+        @return bool: True if the raw data has changed and needs to be analyzed, False otherwise
+        """
+        if self._incremental_raw_data:
+            return self._extract_laser_pulses_incremental()
+
         # Get counter raw data (including recalled raw data from previous measurement)
         fc_data, info_dict = self._get_raw_data()
         self.raw_data = fc_data
@@ -1274,7 +1341,53 @@ class PulsedMeasurementLogic(LogicBase):
         # extract laser pulses from raw data
         return_dict = self._pulseextractor.extract_laser_pulses(self.raw_data)
         self.laser_data = return_dict['laser_counts_arr']
-        return
+        return True
+
+    def _extract_laser_pulses_incremental(self):
+        """
+        Add the counts acquired since the last analysis step to the raw data. If the extraction
+        geometry is locked, only the increment is gathered and added to the laser data. Otherwise
+        the laser pulses are extracted from the accumulated raw data.
+
+        @return bool: True if new counts have been acquired, False otherwise
+        """
+        fc_increment, info_dict = self._get_raw_data_increment()
+        self.__elapsed_sweeps = info_dict['elapsed_sweeps']
+        self.__elapsed_time = info_dict['elapsed_time']
+
+        if not self._raw_data_initialized:
+            self.raw_data = np.array(fc_increment, dtype='int64')
+            # add old raw data from previous measurements once
+            if self._saved_raw_data.get(self._recalled_raw_data_tag) is not None:
+                recalled_data = self._saved_raw_data[self._recalled_raw_data_tag][0]
+                if recalled_data.shape == self.raw_data.shape:
+                    self.raw_data += recalled_data
+                else:
+                    self.log.warning('Recalled raw data has not the same shape as current data.'
+                                     '\nDid NOT add recalled raw data to current time trace.')
+            self._raw_data_initialized = True
+        elif fc_increment.shape != self.raw_data.shape:
+            self.log.error('Shape of fast counter data changed during measurement. '
+                           'Restarting raw data accumulation.')
+            self.raw_data = np.array(fc_increment, dtype='int64')
+        elif not fc_increment.any():
+            return False
+        else:
+            self.raw_data += fc_increment
+            # Only gather the increment if the laser pulse positions are known
+            return_dict = self._pulseextractor.gather_laser_pulses(fc_increment)
+            if return_dict is not None and return_dict['laser_counts_arr'].shape == self.laser_data.shape:
+                self.laser_data += return_dict['laser_counts_arr']
+                return True
+            # The pooled increments indicated a significant drift (or changed shape) of the laser
+            # pulses. The drift is diluted in the accumulated raw data, so force detecting the
+            # laser pulses again.
+            self._pulseextractor.reset_geometry()
+
+        # extract laser pulses from accumulated raw data
+        return_dict = self._pulseextractor.extract_laser_pulses(self.raw_data)
+        self.laser_data = np.array(return_dict['laser_counts_arr'], dtype='int64')
+        return True
 
     def _analyze_laser_pulses(self):
         # analyze pulses and get data points for signal array. Also check if extraction
@@ -1295,29 +1408,14 @@ class PulsedMeasurementLogic(LogicBase):
                                                  info_dict with keys 'elapsed_sweeps' and 'elapsed_time'
         """
         # get raw data from fast counter
-        fc_data = self._fastcounter().get_data_trace()
-        if type(fc_data) == tuple and len(fc_data) == 2:  # if the hardware implement the new version of the interface
-            fc_data, info_dict = fc_data
-        else:
-            info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
-        fc_data = netobtain(fc_data)
-
-        if isinstance(info_dict, dict) and info_dict.get('elapsed_sweeps') is not None:
-            elapsed_sweeps = info_dict['elapsed_sweeps']
-        else:
-            elapsed_sweeps = -1
-
-        if isinstance(info_dict, dict) and info_dict.get('elapsed_time') is not None:
-            elapsed_time = info_dict['elapsed_time']
-        else:
-            elapsed_time = time.time() - self.__start_time
+        fc_data, elapsed_sweeps, elapsed_time = self._unpack_fast_counter_data(
+            self._fastcounter().get_data_trace()
+        )
 
         # add old raw data from previous measurements if necessary
         if self._saved_raw_data.get(self._recalled_raw_data_tag) is not None:
             # self.log.info('Found old saved raw data with tag "{0}".'
             #               ''.format(self._recalled_raw_data_tag))
-            elapsed_sweeps += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_sweeps']
-            elapsed_time += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_time']
             if not fc_data.any():
                 self.log.warning('Only zeros received from fast counter!\n'
                                  'Using recalled raw data only.')
@@ -1334,6 +1432,62 @@ class PulsedMeasurementLogic(LogicBase):
 
         return fc_data, {'elapsed_sweeps': elapsed_sweeps, 'elapsed_time': elapsed_time}
 
+    def _get_raw_data_increment(self):
+        """
+        Get the counts acquired since the last call from the fast counting hardware.
+        Fast counters not supporting "get_data_trace_increment" (see
+        FastCounterInterface.supports_data_trace_increment) are polled for the complete trace and
+        the difference to the previously received trace is returned.
+        @return tuple(numpy.ndarray, info_dict): The count data increment (1D for ungated, 2D for
+                                                 gated counter) and info_dict with keys
+                                                 'elapsed_sweeps' and 'elapsed_time'
+        """
+        fastcounter = self._fastcounter()
+        if fastcounter.supports_data_trace_increment:
+            fc_data, elapsed_sweeps, elapsed_time = self._unpack_fast_counter_data(
+                fastcounter.get_data_trace_increment()
+            )
+            return fc_data, {'elapsed_sweeps': elapsed_sweeps, 'elapsed_time': elapsed_time}
+
+        fc_data, elapsed_sweeps, elapsed_time = self._unpack_fast_counter_data(
+            fastcounter.get_data_trace()
+        )
+        fc_data = np.array(fc_data, dtype='int64')
+        if self._last_fc_data is None or self._last_fc_data.shape != fc_data.shape:
+            fc_increment = fc_data.copy()
+        else:
+            fc_increment = fc_data - self._last_fc_data
+        self._last_fc_data = fc_data
+        return fc_increment, {'elapsed_sweeps': elapsed_sweeps, 'elapsed_time': elapsed_time}
+
+    def _unpack_fast_counter_data(self, fc_data):
+        """
+        Unpack the return value of the fast counter data trace methods.
+        Elapsed sweeps and time of recalled raw data are added.
+        @param fc_data: return value of get_data_trace or get_data_trace_increment
+        @return tuple(numpy.ndarray, int, float): count data, elapsed sweeps, elapsed time
+        """
+        if type(fc_data) == tuple and len(fc_data) == 2:  # if the hardware implement the new version of the interface
+            fc_data, info_dict = fc_data
+        else:
+            info_dict = {'elapsed_sweeps': None, 'elapsed_time': None}
+        fc_data = netobtain(fc_data)
+
+        if isinstance(info_dict, dict) and info_dict.get('elapsed_sweeps') is not None:
+            elapsed_sweeps = info_dict['elapsed_sweeps']
+        else:
+            elapsed_sweeps = -1
+
+        if isinstance(info_dict, dict) and info_dict.get('elapsed_time') is not None:
+            elapsed_time = info_dict['elapsed_time']
+        else:
+            elapsed_time = time.time() - self.__start_time
+
+        if self._saved_raw_data.get(self._recalled_raw_data_tag) is not None:
+            elapsed_sweeps += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_sweeps']
+            elapsed_time += self._saved_raw_data[self._recalled_raw_data_tag][1]['elapsed_time']
+        return fc_data, elapsed_sweeps, elapsed_time
+
     def _initialize_data_arrays(self):
         """
         Initializing the signal, error, laser and raw data arrays.
@@ -102,8 +102,13 @@ class DDMethods(Enum):
 class SamplingBase:
     """
     Base class for all sampling functions
+
+    Set the class attribute "is_pointwise" to True if each sample only depends on its own time
+    value and not on the time array as a whole (e.g. start time or duration of the element).
+    Sampling functions marked like this can be evaluated in one call for many elements at once.
     """
     params = dict()
+    is_pointwise = False
     log = logging.getLogger(__name__)
 
     def __repr__(self):
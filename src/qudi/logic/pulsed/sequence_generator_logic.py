@@ -28,6 +28,11 @@ import copy
 import traceback
 import datetime
 import re
+import hashlib
+import tempfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from PySide2 import QtCore
 from qudi.core.statusvariable import StatusVar
@@ -40,6 +45,9 @@ from qudi.core.module import LogicBase
 from qudi.logic.pulsed.pulse_objects import PulseBlock, PulseBlockEnsemble, PulseSequence
 from qudi.logic.pulsed.pulse_objects import PulseObjectGenerator, PulseBlockElement
 from qudi.logic.pulsed.sampling_functions import SamplingFunctions
+from qudi.logic.pulsed.ensemble_sampler import EnsembleSampler, SharedSampleBuffer
+from qudi.logic.pulsed.ensemble_sampler import sample_into_shared_buffer, init_sampling_worker
+from qudi.logic.pulsed.waveform_cache import WaveformCache
 from qudi.interface.pulser_interface import SequenceOption
 from qudi.util.benchmark import BenchmarkTool
 
@@ -66,6 +74,12 @@ class SequenceGeneratorLogic(LogicBase):
         #     additional_predefined_methods_path: # optional
         #     additional_sampling_functions_path: # optional
         #     assets_storage_path: # optional
+        #     waveform_cache_path: # optional, enables on-disk cache of sampled waveforms
+        #     waveform_cache_max_bytes: 4294967296 # optional
+        #     parallel_sampling_processes: 0 # optional, number of worker processes for sequences
+        #     overhead_bytes: 0 # optional, limits memory usage by writing waveforms chunkwise
+        #     pipelined_writing: True # optional, sample next chunk while writing the current one
+        #     sample_staging_path: # optional, stage large waveforms in temporary files
         connect:
             pulsegenerator: 'pulser_dummy'
     """
@@ -87,6 +101,18 @@ class SequenceGeneratorLogic(LogicBase):
                                                    missing='nothing')
     _info_on_estimated_upload_time = ConfigOption(name='info_on_estimated_upload_time', default=60, missing='nothing')
     _disable_bench_prompt = ConfigOption(name='disable_benchmark_prompt', default=False, missing='nothing')
+    # Optional directory to cache sampled waveforms in. Caching is disabled if not given.
+    _waveform_cache_dir = ConfigOption(name='waveform_cache_path', default=None, missing='nothing')
+    _waveform_cache_max_bytes = ConfigOption(name='waveform_cache_max_bytes', default=2**32, missing='nothing')
+    # Number of worker processes used to sample the ensembles of a PulseSequence in parallel.
+    # Parallel sampling is disabled if 0.
+    _parallel_sampling_processes = ConfigOption(name='parallel_sampling_processes', default=0, missing='nothing')
+    # Calculate the next chunk in a background thread while writing the current one to the device
+    # if the waveform is written chunkwise (see overhead_bytes).
+    _pipelined_writing = ConfigOption(name='pipelined_writing', default=True, missing='nothing')
+    # Optional scratch directory to stage the samples of waveforms exceeding overhead_bytes (or
+    # available memory) in temporary files. The waveform is written at once if given.
+    _sample_staging_dir = ConfigOption(name='sample_staging_path', default=None, missing='nothing')
 
     # status vars
     # Global parameters describing the channel usage and common parameters used during pulsed object
@@ -116,11 +142,17 @@ class SequenceGeneratorLogic(LogicBase):
     _benchmark_load = BenchmarkTool()
     _benchmark_load_state = StatusVar(representer=_benchmark_load.save, constructor=_benchmark_load.load_from_dict)
 
+    # Sampling hash and created waveform names for each waveform name tag written to the device.
+    # Used to skip re-sampling if identical waveforms are already present on the device.
+    _sampled_waveform_hashes = StatusVar(name='sampled_waveform_hashes', default=dict())
+
     # define signals
     sigBlockDictUpdated = QtCore.Signal(dict)
     sigEnsembleDictUpdated = QtCore.Signal(dict)
     sigSequenceDictUpdated = QtCore.Signal(dict)
     sigSampleEnsembleComplete = QtCore.Signal(object)
+    # Waveform name and fraction of samples written to the device during chunkwise writing
+    sigSampleEnsembleProgress = QtCore.Signal(str, float)
     sigSampleSequenceComplete = QtCore.Signal(object)
     sigLoadedAssetUpdated = QtCore.Signal(str, str)
     sigGeneratorSettingsUpdated = QtCore.Signal(dict)
@@ -154,6 +186,21 @@ class SequenceGeneratorLogic(LogicBase):
         # Get instance of PulseObjectGenerator which takes care of collecting all predefined methods
         self._pog = None
 
+        # On-disk cache for sampled waveforms (optional)
+        self._waveform_cache = None
+
+        # Process pool for parallel sampling of sequences (optional) and additional import paths
+        # for sampling functions needed by the worker processes.
+        self._sampling_pool = None
+        self._sampling_futures = set()
+        self._sampling_function_paths = list()
+
+        # Memoized analysis results of PulseBlocks (keys are block names) and PulseBlockEnsembles
+        # (keys are tuples of block list, sample rate and laser channel).
+        # Invalidated whenever a PulseBlock is saved or deleted.
+        self._block_analysis_cache = dict()
+        self._ensemble_analysis_cache = dict()
+
         # The created pulse objects (PulseBlock, PulseBlockEnsemble, PulseSequence) are saved in
         # these dictionaries. The keys are the names.
         self._saved_pulse_blocks = dict()
@@ -201,6 +248,13 @@ class SequenceGeneratorLogic(LogicBase):
                 self.log.error('ConfigOption additional_sampling_functions_path needs to either be a string or '
                                'a list of strings.')
         SamplingFunctions.import_sampling_functions(sf_path_list)
+        self._sampling_function_paths = sf_path_list
+
+        if self._waveform_cache_dir:
+            self._waveform_cache = WaveformCache(path=self._waveform_cache_dir,
+                                                 max_bytes=self._waveform_cache_max_bytes)
+        else:
+            self._waveform_cache = None
 
         # Read back settings from device and update instance variables accordingly
         self._read_settings_from_device()
@@ -223,6 +277,13 @@ class SequenceGeneratorLogic(LogicBase):
     def on_deactivate(self):
         """ Deinitialisation performed during deactivation of the module.
         """
+        if self._sampling_pool is not None:
+            # Executor.shutdown(cancel_futures=True) is only available for Python >= 3.9
+            for future in list(self._sampling_futures):
+                future.cancel()
+            self._sampling_pool.shutdown(wait=True)
+            self._sampling_pool = None
+            self._sampling_futures.clear()
         return
 
     # @_saved_pulse_blocks.constructor
@@ -468,6 +529,7 @@ class SequenceGeneratorLogic(LogicBase):
             self.log.error('Can´t clear the pulser as it is running. Switch off the pulser and try again.')
             return -1
         self.pulsegenerator().clear_all()
+        self._sampled_waveform_hashes = dict()
         # Delete all sampling information from all PulseBlockEnsembles and PulseSequences
         for seq_name in self.saved_pulse_sequences:
             seq = self.saved_pulse_sequences[seq_name]
@@ -740,6 +802,7 @@ class SequenceGeneratorLogic(LogicBase):
         @param PulseBlock block: PulseBlock instance to save
         """
         self._saved_pulse_blocks[block.name] = block
+        self._invalidate_analysis_cache(block.name)
         self._save_block_to_file(block)
         self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
         return
@@ -763,6 +826,7 @@ class SequenceGeneratorLogic(LogicBase):
         # Delete from dict
         if name in self.saved_pulse_blocks:
             del (self._saved_pulse_blocks[name])
+        self._invalidate_analysis_cache(name)
 
         # Delete from disk
         filepath = os.path.join(self._assets_storage_dir, '{0}.block'.format(name))
@@ -809,6 +873,7 @@ class SequenceGeneratorLogic(LogicBase):
             block = self._load_block_from_file(block_name)
             if block is not None:
                 self._saved_pulse_blocks[block_name] = block
+                self._invalidate_analysis_cache(block_name)
 
         self.sigBlockDictUpdated.emit(self._saved_pulse_blocks)
         return
@@ -1290,94 +1355,88 @@ class SequenceGeneratorLogic(LogicBase):
         laser_channel = self.generation_parameters['gate_channel'] if self.generation_parameters[
             'gate_channel'] else self.generation_parameters['laser_channel']
 
-        # memorize the digital channel state of the previous element
-        tmp_digital_high = dict()
-        # memorize the laser_on flag of the previous element (in case of non-digital laser channel)
-        tmp_laser_on = False
+        # Return memoized result if this ensemble has been analyzed before with the same settings
+        cache_key = (tuple((name, reps) for name, reps in ensemble.block_list),
+                     self.__sample_rate,
+                     laser_channel)
+        if cache_key in self._ensemble_analysis_cache:
+            return_dict = copy.deepcopy(self._ensemble_analysis_cache[cache_key])
+            return_dict['generation_parameters'] = self.generation_parameters.copy()
+            return return_dict
+
         # Set of used analog and digital channels
         digital_channels = set()
         analog_channels = set()
-        # check for active channels and initialize tmp_digital_high/tmp_laser_on with the state of
-        # the very last element in the ensemble
+        # Lists of length, digital channel states and laser_on flag of all elements including
+        # repetitions in the order they are occuring in the waveform later on.
+        element_lengths = list()
+        digital_high = dict()
+        laser_on = list()
+        # Flag indicating if the last block is empty. If not, the channel states of the very last
+        # element in the ensemble are the initial states to check transitions against.
+        last_block_empty = True
         if len(ensemble) > 0:
             block = self.get_block(ensemble[0][0])
             digital_channels = block.digital_channels
             analog_channels = block.analog_channels
-            block = self.get_block(ensemble[-1][0])
-            if len(block) > 0:
-                tmp_digital_high = block[-1].digital_high.copy()
-                tmp_laser_on = block[-1].laser_on
-            else:
-                tmp_digital_high = {chnl: False for chnl in digital_channels}
-                tmp_laser_on = False
-
-        # dicts containing the bins where the digital channels are rising/falling
-        digital_rising_bins = {chnl: list() for chnl in digital_channels}
-        digital_falling_bins = {chnl: list() for chnl in digital_channels}
-        laser_rising_bins = list()
-        laser_falling_bins = list()
+            digital_high = {chnl: list() for chnl in digital_channels}
+            last_block_empty = len(self.get_block(ensemble[-1][0])) == 0
 
-        # Array to store the length in bins for all elements including repetitions in the order
-        # they are occuring in the waveform later on.
-        elements_length_bins = list()
-
-        # variables to keep track of the current timeframe
-        current_end_time = 0.0
-        current_start_bin = 0
-
-        # Loop through all blocks in the ensemble
+        # Expand the memoized element parameters of each block arithmetically for all repetitions
         for block_name, reps in ensemble:
-            # Get the stored PulseBlock instance
-            block = self.get_block(block_name)
-
-            # Iterate over all repetitions of the current block
-            for rep_no in range(reps + 1):
-                # Iterate over the Block_Elements inside the current block
-                for element in block:
-                    # save bin position if a transition from low to high or vice versa has occurred
-                    # in a digital channel
-                    if tmp_digital_high != element.digital_high:
-                        for chnl, state in element.digital_high.items():
-                            if not tmp_digital_high[chnl] and state:
-                                digital_rising_bins[chnl].append(current_start_bin)
-                            elif tmp_digital_high[chnl] and not state:
-                                digital_falling_bins[chnl].append(current_start_bin)
-                        tmp_digital_high = element.digital_high.copy()
-
-                    if not laser_channel.startswith('d') and tmp_laser_on != element.laser_on:
-                        if not tmp_laser_on and element.laser_on:
-                            laser_rising_bins.append(current_start_bin)
-                        else:
-                            laser_falling_bins.append(current_start_bin)
-                        tmp_laser_on = element.laser_on
-
-                    # Calculate length of the current element with current repetition count in sec
-                    # and add this to the ideal end time for the sequence up until this point.
-                    current_end_time += element.init_length_s + rep_no * element.increment_s
-
-                    # Nearest possible match including the discretization in bins
-                    current_end_bin = int(np.rint(current_end_time * self.__sample_rate))
-
-                    # append current element length in discrete bins to temporary array
-                    elements_length_bins.append(current_end_bin - current_start_bin)
-
-                    # advance bin offset for next element
-                    current_start_bin = current_end_bin
-
-        elements_length_bins = np.array(elements_length_bins, dtype='int64')
-
-        # convert rising/falling indices to numpy.ndarrays. Remove duplicates.
+            block_info = self._analyze_block(block_name)
+            if len(block_info['init_length_s']) == 0:
+                continue
+            if reps > 0 and np.any(block_info['increment_s']):
+                rep_no = np.arange(reps + 1, dtype='int64')
+                element_lengths.append(
+                    (block_info['init_length_s'] + rep_no[:, np.newaxis] * block_info['increment_s']).ravel()
+                )
+            else:
+                element_lengths.append(np.tile(block_info['init_length_s'], reps + 1))
+            for chnl in digital_channels:
+                digital_high[chnl].append(np.tile(block_info['digital_high'][chnl], reps + 1))
+            laser_on.append(np.tile(block_info['laser_on'], reps + 1))
+
+        if element_lengths:
+            element_lengths = np.concatenate(element_lengths)
+            digital_high = {chnl: np.concatenate(states) for chnl, states in digital_high.items()}
+            laser_on = np.concatenate(laser_on)
+        else:
+            element_lengths = np.empty(0, dtype='float64')
+            laser_on = np.empty(0, dtype=bool)
+
+        # Ideal end times of all elements and nearest possible match including the discretization
+        # in bins. The cumulative sum is evaluated sequentially, i.e. with the same rounding errors
+        # as adding up element by element.
+        end_times = np.cumsum(element_lengths)
+        end_bins = np.rint(end_times * self.__sample_rate).astype('int64')
+        start_bins = np.empty(len(end_bins), dtype='int64')
+        if len(end_bins) > 0:
+            start_bins[0] = 0
+            start_bins[1:] = end_bins[:-1]
+        elements_length_bins = end_bins - start_bins
+
+        # dicts containing the bins where the digital channels are rising/falling. Transitions are
+        # checked with respect to the state of the very last element in the ensemble.
+        digital_rising_bins = dict()
+        digital_falling_bins = dict()
         for chnl in digital_channels:
-            digital_rising_bins[chnl] = sorted(set(digital_rising_bins[chnl]))
-            digital_falling_bins[chnl] = sorted(set(digital_falling_bins[chnl]))
-            digital_rising_bins[chnl] = np.array(digital_rising_bins[chnl], dtype='int64')
-            digital_falling_bins[chnl] = np.array(digital_falling_bins[chnl], dtype='int64')
+            states = digital_high[chnl]
+            prev_states = np.roll(states, 1)
+            if last_block_empty and len(prev_states) > 0:
+                prev_states[0] = False
+            digital_rising_bins[chnl] = self._sorted_unique(start_bins[~prev_states & states])
+            digital_falling_bins[chnl] = self._sorted_unique(start_bins[prev_states & ~states])
         if laser_channel.startswith('d'):
             laser_rising_bins = digital_rising_bins[laser_channel]
             laser_falling_bins = digital_falling_bins[laser_channel]
         else:
-            laser_rising_bins = np.array(sorted(set(laser_rising_bins)), dtype='int64')
-            laser_falling_bins = np.array(sorted(set(laser_falling_bins)), dtype='int64')
+            prev_laser_on = np.roll(laser_on, 1)
+            if last_block_empty and len(prev_laser_on) > 0:
+                prev_laser_on[0] = False
+            laser_rising_bins = self._sorted_unique(start_bins[~prev_laser_on & laser_on])
+            laser_falling_bins = self._sorted_unique(start_bins[prev_laser_on & ~laser_on])
 
         return_dict = dict()
         return_dict['number_of_samples'] = np.sum(elements_length_bins)
@@ -1389,11 +1448,60 @@ class SequenceGeneratorLogic(LogicBase):
         return_dict['digital_channels'] = digital_channels
         return_dict['channel_set'] = analog_channels.union(digital_channels)
         return_dict['generation_parameters'] = self.generation_parameters.copy()
-        return_dict['ideal_length'] = current_end_time
+        return_dict['ideal_length'] = float(end_times[-1]) if len(end_times) > 0 else 0.0
         return_dict['laser_rising_bins'] = laser_rising_bins
         return_dict['laser_falling_bins'] = laser_falling_bins
+
+        # Memorize result. Only keep a limited number of ensembles.
+        if len(self._ensemble_analysis_cache) >= 100:
+            del self._ensemble_analysis_cache[next(iter(self._ensemble_analysis_cache))]
+        self._ensemble_analysis_cache[cache_key] = copy.deepcopy(return_dict)
         return return_dict
 
+    def _analyze_block(self, block_name):
+        """ Helper method to collect the element parameters of a PulseBlock relevant for
+        analyze_block_ensemble as arrays. Results are memoized until the block is saved again.
+
+        @param str block_name: The name of the saved PulseBlock to analyze
+        @return dict: init_length_s (1D numpy.ndarray[float]),
+                      increment_s (1D numpy.ndarray[float]),
+                      digital_high (dict of 1D numpy.ndarray[bool] for each digital channel),
+                      laser_on (1D numpy.ndarray[bool])
+        """
+        block_info = self._block_analysis_cache.get(block_name)
+        if block_info is None:
+            block = self.get_block(block_name)
+            block_info = dict()
+            block_info['init_length_s'] = np.array([elem.init_length_s for elem in block],
+                                                   dtype='float64')
+            block_info['increment_s'] = np.array([elem.increment_s for elem in block],
+                                                 dtype='float64')
+            block_info['digital_high'] = {
+                chnl: np.array([elem.digital_high[chnl] for elem in block], dtype=bool)
+                for chnl in block.digital_channels
+            }
+            block_info['laser_on'] = np.array([elem.laser_on for elem in block], dtype=bool)
+            self._block_analysis_cache[block_name] = block_info
+        return block_info
+
+    @staticmethod
+    def _sorted_unique(bins):
+        """ Sorted unique values of an integer array. Faster than numpy.unique for large arrays
+        that are already (almost) sorted, like transition bins in chronological order.
+        """
+        bins = np.sort(bins)
+        if len(bins) > 1:
+            bins = bins[np.concatenate(([True], bins[1:] != bins[:-1]))]
+        return bins
+
+    def _invalidate_analysis_cache(self, block_name):
+        """ Remove memoized analysis results of a PulseBlock and all PulseBlockEnsembles.
+
+        @param str block_name: The name of the PulseBlock that has changed
+        """
+        self._block_analysis_cache.pop(block_name, None)
+        self._ensemble_analysis_cache.clear()
+
     def analyze_sequence(self, sequence):
         """
         This helper method runs through each step of a PulseSequence object and extracts
@@ -1655,8 +1763,65 @@ class SequenceGeneratorLogic(LogicBase):
         # Return error code
         return -1 if ensembles_missing else 0
 
+    def _extend_to_waveform_granularity(self, ensemble):
+        """ Analyze a PulseBlockEnsemble and make sure the number of samples is a multiple of the
+        waveform length step size of the pulse generator. If not, an idle block is appended to the
+        ensemble.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble to analyze and extend
+        @return dict: ensemble information as returned by analyze_block_ensemble
+        """
+        # get important parameters from the ensemble
+        ensemble_info = self.analyze_block_ensemble(ensemble)
+
+        # Make sure the length of the channel is a multiple of the step size.
+        # This is done by appending an idle block
+        granularity = self.pulse_generator_constraints.waveform_length.step
+        self.log.debug('length: {0}, mod {1}'.format(
+            ensemble_info['number_of_samples'], ensemble_info['number_of_samples'] % granularity))
+        if ensemble_info['number_of_samples'] % granularity != 0:
+            self.log.warn('Length {0} does not fulfil step constraint {1}.'.format(
+                ensemble_info['number_of_samples'], granularity))
+            # TODO: take care of rounding errors!
+            extension_samples = granularity - ensemble_info['number_of_samples'] % granularity
+            target_total_samples = ensemble_info['number_of_samples'] + extension_samples
+            extension_seconds = (target_total_samples / self.__sample_rate) - ensemble_info[
+                'ideal_length']
+
+            pb_element = PulseBlockElement(
+                init_length_s=extension_seconds,
+                increment_s=0,
+                pulse_function={chnl: SamplingFunctions.Idle() for chnl in self.analog_channels},
+                digital_high={chnl: False for chnl in self.digital_channels})
+            idle_extension = PulseBlock('idle_extension', element_list=[pb_element])
+
+            # appending idle element invalidates meta-info. Restore meta-info here.
+            temp_generation_parameters = copy.deepcopy(ensemble.generation_method_parameters)
+            temp_measurement_information = copy.deepcopy(ensemble.measurement_information)
+            ensemble.append((idle_extension.name, 0))
+
+            ensemble.measurement_information = temp_measurement_information
+            ensemble.generation_method_parameters = temp_generation_parameters
+
+            self.save_block(idle_extension)
+            self.save_ensemble(ensemble)
+
+            # get important parameters from the ensemble
+            ensemble_info = self.analyze_block_ensemble(ensemble)
+            if ensemble_info['number_of_samples'] != target_total_samples:
+                self.log.error('Expanding the PulseBlockEnsemble to match the waveform granularity '
+                               'has failed.\nTarget number of samples was {0:d}.\nfinal number of '
+                               'samples is {1:d}.\nThis is probably due to a rounding error in '
+                               'SequenceGeneratorLogic.sample_pulse_block_ensemble.'
+                               ''.format(target_total_samples, ensemble_info['number_of_samples']))
+            else:
+                self.log.warn('Extending waveform {0} by {2} bins. New length {1}.'.format(
+                    ensemble.name, ensemble_info['number_of_samples'], extension_samples))
+
+        return ensemble_info
+
     @QtCore.Slot(str)
-    def sample_pulse_block_ensemble(self, ensemble, offset_bin=0, name_tag=None):
+    def sample_pulse_block_ensemble(self, ensemble, offset_bin=0, name_tag=None, presampled=None):
         """ General sampling of a PulseBlockEnsemble object, which serves as the construction plan.
 
         @param str|PulseBlockEnsemble ensemble: PulseBlockEnsemble instance or name of a saved
@@ -1667,6 +1832,9 @@ class SequenceGeneratorLogic(LogicBase):
         @param str name_tag: a name tag, which is used to keep the sampled files together, which
                              where sampled from the same PulseBlockEnsemble object but where
                              different offset_bins were used.
+        @param tuple presampled: optional tuple of (sampling_hash, analog_samples, digital_samples)
+                                 holding the complete sample arrays of the ensemble (e.g. calculated
+                                 in a worker process). Only used if the sampling hash matches.
 
         @return tuple: of length 3 with
                        (offset_bin, created_waveforms, ensemble_info).
@@ -1679,9 +1847,9 @@ class SequenceGeneratorLogic(LogicBase):
 
         This method is creating the actual samples (voltages and logic states) for each time step
         of the analog and digital channels specified in the PulseBlockEnsemble.
-        Therefore it iterates through all blocks, repetitions and elements of the ensemble and
-        calculates the exact voltages (float64) according to the specified math_function. The
-        samples are later on stored inside a float32 array.
+        Therefore the element boundaries of all blocks, repetitions and elements of the ensemble are
+        precomputed (see EnsembleSampler) and the exact voltages (float64) are calculated according
+        to the specified math_function. The samples are later on stored inside a float32 array.
         So each element is calculated with high precision (float64) and then down-converted to
         float32 to be stored.
 
@@ -1693,6 +1861,9 @@ class SequenceGeneratorLogic(LogicBase):
         The chunkwise write mode is used to save memory usage at the expense of time.
         In other words: The whole sample arrays are never created at any time. This results in more
         function calls and general overhead causing much longer time to complete.
+        Unless disabled by the "pipelined_writing" ConfigOption, the next chunk is calculated in a
+        background thread while the current chunk is written to the device. The progress is
+        reported via sigSampleEnsembleProgress.
 
         In addition the pulse_block_ensemble gets analyzed and important parameters used during
         sampling get stored in the ensemble object "sampling_information" attribute.
@@ -1722,58 +1893,42 @@ class SequenceGeneratorLogic(LogicBase):
         # Set the waveform name (excluding the device specific channel naming suffix, i.e. '_ch1')
         waveform_name = name_tag if name_tag else ensemble.name
 
+        # Skip sampling if identical waveforms are already present on the device
+        sampling_hash = self._get_sampling_hash(ensemble, offset_bin)
+        written_waveforms = self._get_present_waveforms(waveform_name, sampling_hash)
+        if written_waveforms is not None:
+            self.log.debug('Identical waveforms for "{0}" already present on device. Sampling '
+                           'skipped.'.format(waveform_name))
+            ensemble_info = self.analyze_block_ensemble(ensemble)
+            if waveform_name == ensemble.name:
+                ensemble.sampling_information = dict()
+                ensemble.sampling_information.update(ensemble_info)
+                ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
+                ensemble.sampling_information['sampling_hash'] = sampling_hash
+                ensemble.sampling_information['waveforms'] = written_waveforms
+                self.save_ensemble(ensemble)
+            if ensemble.rotating_frame:
+                offset_bin += ensemble_info['number_of_samples']
+            if not self.__sequence_generation_in_progress:
+                self.module_state.unlock()
+            self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+            self.sigSampleEnsembleComplete.emit(ensemble)
+            return offset_bin, written_waveforms, ensemble_info
+
         # check for old waveforms associated with the ensemble and delete them from pulse generator.
         self._delete_waveform_by_nametag(waveform_name)
 
         # Take current time
         start_time = time.time()
 
-        # get important parameters from the ensemble
-        ensemble_info = self.analyze_block_ensemble(ensemble)
-
-        # Make sure the length of the channel is a multiple of the step size.
-        # This is done by appending an idle block
-        granularity = self.pulse_generator_constraints.waveform_length.step
-        self.log.debug('length: {0}, mod {1}'.format(
-            ensemble_info['number_of_samples'], ensemble_info['number_of_samples'] % granularity))
-        if ensemble_info['number_of_samples'] % granularity != 0:
-            self.log.warn('Length {0} does not fulfil step constraint {1}.'.format(
-                ensemble_info['number_of_samples'], granularity))
-            # TODO: take care of rounding errors!
-            extension_samples = granularity - ensemble_info['number_of_samples'] % granularity
-            target_total_samples = ensemble_info['number_of_samples'] + extension_samples
-            extension_seconds = (target_total_samples / self.__sample_rate) - ensemble_info[
-                'ideal_length']
-
-            pb_element = PulseBlockElement(
-                init_length_s=extension_seconds,
-                increment_s=0,
-                pulse_function={chnl: SamplingFunctions.Idle() for chnl in self.analog_channels},
-                digital_high={chnl: False for chnl in self.digital_channels})
-            idle_extension = PulseBlock('idle_extension', element_list=[pb_element])
-
-            # appending idle element invalidates meta-info. Restore meta-info here.
-            temp_generation_parameters = copy.deepcopy(ensemble.generation_method_parameters)
-            temp_measurement_information = copy.deepcopy(ensemble.measurement_information)
-            ensemble.append((idle_extension.name, 0))
-
-            ensemble.measurement_information = temp_measurement_information
-            ensemble.generation_method_parameters = temp_generation_parameters
-
-            self.save_block(idle_extension)
-            self.save_ensemble(ensemble)
-
-            # get important parameters from the ensemble
-            ensemble_info = self.analyze_block_ensemble(ensemble)
-            if ensemble_info['number_of_samples'] != target_total_samples:
-                self.log.error('Expanding the PulseBlockEnsemble to match the waveform granularity '
-                               'has failed.\nTarget number of samples was {0:d}.\nfinal number of '
-                               'samples is {1:d}.\nThis is probably due to a rounding error in '
-                               'SequenceGeneratorLogic.sample_pulse_block_ensemble.'
-                               ''.format(target_total_samples, ensemble_info['number_of_samples']))
-            else:
-                self.log.warn('Extending waveform {0} by {2} bins. New length {1}.'.format(
-                    ensemble.name, ensemble_info['number_of_samples'], extension_samples))
+        # get important parameters from the ensemble and make sure the length of the channel is a
+        # multiple of the step size.
+        ensemble_info = self._extend_to_waveform_granularity(ensemble)
+        sampling_hash = self._get_sampling_hash(ensemble, offset_bin)
+        if presampled is not None and presampled[0] != sampling_hash:
+            self.log.debug('Presampled waveforms for "{0}" are outdated and will be sampled again.'
+                           ''.format(waveform_name))
+            presampled = None
 
         # Calculate the byte size per sample.
         # One analog sample per channel is 4 bytes (np.float32) and one digital sample per channel
@@ -1785,10 +1940,24 @@ class SequenceGeneratorLogic(LogicBase):
         bytes_per_ensemble = bytes_per_sample * ensemble_info['number_of_samples']
 
         # Determine the size of the sample arrays to be written as a whole.
+        # In pipelined mode two sets of sample arrays are used alternately, so each of them is
+        # limited to half of the overhead bytes.
+        # In staging mode the sample arrays for the whole waveform are backed by temporary files
+        # and written at once. The samples are calculated in chunks limited by the overhead bytes.
+        staged = False
         if bytes_per_ensemble <= self._overhead_bytes or self._overhead_bytes == 0:
             array_length = ensemble_info['number_of_samples']
+            pipelined = False
+        elif self._sample_staging_dir:
+            array_length = ensemble_info['number_of_samples']
+            pipelined = False
+            staged = True
+        elif self._pipelined_writing:
+            array_length = max(self._overhead_bytes // (2 * bytes_per_sample), 1)
+            pipelined = True
         else:
             array_length = self._overhead_bytes // bytes_per_sample
+            pipelined = False
 
         n_max_samples = self.pulsegenerator().get_constraints().waveform_length.max
         if n_max_samples > 0. and ensemble_info['number_of_samples'] > n_max_samples:
@@ -1800,24 +1969,6 @@ class SequenceGeneratorLogic(LogicBase):
             self.sigSampleEnsembleComplete.emit(None)
             return -1, list(), dict()
 
-        # Allocate the sample arrays that are used for a single write command
-        analog_samples = dict()
-        digital_samples = dict()
-        try:
-            for chnl in ensemble_info['analog_channels']:
-                analog_samples[chnl] = np.empty(array_length, dtype='float32')
-            for chnl in ensemble_info['digital_channels']:
-                digital_samples[chnl] = np.empty(array_length, dtype=bool)
-        except MemoryError:
-            self.log.error('Sampling of PulseBlockEnsemble "{0}" failed due to a MemoryError.\n'
-                           'The sample array needed is too large to allocate in memory.\n'
-                           'Try using the overhead_bytes ConfigOption to limit memory usage.'
-                           ''.format(ensemble.name))
-            if not self.__sequence_generation_in_progress:
-                self.module_state.unlock()
-            self.sigSampleEnsembleComplete.emit(None)
-            return -1, list(), dict()
-
         t_est_upload = self._benchmark_write.estimate_time(ensemble_info['number_of_samples'])
         if t_est_upload > self._info_on_estimated_upload_time:
             now = datetime.datetime.now()
@@ -1825,105 +1976,228 @@ class SequenceGeneratorLogic(LogicBase):
                           " {0:%Y-%m-%d %H:%M:%S} ({1:d} s)".format(
                 (now + datetime.timedelta(0, t_est_upload)), int(t_est_upload)))
 
-        # integer to keep track of the sampls already processed
+        # Full-length sample arrays to read from instead of sampling (presampled or from waveform
+        # cache). Create a new cache entry to store the samples in if they are not cached yet.
+        source_analog, source_digital = None, None
+        cache_analog, cache_digital = None, None
+        if presampled is not None:
+            source_analog, source_digital = presampled[1], presampled[2]
+        elif self._waveform_cache is not None:
+            source_analog, source_digital = self._waveform_cache.get(sampling_hash)
+            if source_analog is not None:
+                self.log.debug('Reading samples of "{0}" from waveform cache.'.format(waveform_name))
+        if self._waveform_cache is not None and (source_analog is None or presampled is not None):
+            cache_analog, cache_digital = self._waveform_cache.create(
+                key=sampling_hash,
+                analog_channels=ensemble_info['analog_channels'],
+                digital_channels=ensemble_info['digital_channels'],
+                number_of_samples=ensemble_info['number_of_samples'])
+
+        # Allocate the sample arrays that are used for a single write command (two sets of arrays
+        # in pipelined mode). If the sample arrays do not fit into memory, stage them in temporary
+        # files if a staging directory is configured.
+        # Cached samples are passed to the device as they are in staging mode.
+        sample_buffers = list()
+        staging_files = list()
+        source_passthrough = staged and source_analog is not None and presampled is None
+        if source_passthrough:
+            sample_buffers.append((source_analog, source_digital))
+        else:
+            try:
+                for _ in range(2 if pipelined else 1):
+                    if staged:
+                        analog_samples, digital_samples = self._create_staging_arrays(
+                            ensemble_info['analog_channels'],
+                            ensemble_info['digital_channels'],
+                            array_length,
+                            staging_files)
+                    else:
+                        analog_samples = dict()
+                        digital_samples = dict()
+                        for chnl in ensemble_info['analog_channels']:
+                            analog_samples[chnl] = np.empty(array_length, dtype='float32')
+                        for chnl in ensemble_info['digital_channels']:
+                            digital_samples[chnl] = np.empty(array_length, dtype=bool)
+                    sample_buffers.append((analog_samples, digital_samples))
+            except MemoryError:
+                sample_buffers = list()
+                if self._sample_staging_dir and not staged:
+                    self.log.warning('Not enough memory to sample PulseBlockEnsemble "{0}". Staging '
+                                     'samples in "{1}".'.format(ensemble.name,
+                                                                self._sample_staging_dir))
+                    pipelined = False
+                    staged = True
+                    array_length = ensemble_info['number_of_samples']
+                    try:
+                        sample_buffers.append(self._create_staging_arrays(
+                            ensemble_info['analog_channels'],
+                            ensemble_info['digital_channels'],
+                            array_length,
+                            staging_files))
+                    except OSError:
+                        self.log.exception('Unable to create staging files.')
+                        sample_buffers = list()
+            except OSError:
+                self.log.exception('Unable to create staging files.')
+                sample_buffers = list()
+            if not sample_buffers:
+                for file in staging_files:
+                    file.close()
+                if cache_analog is not None:
+                    del cache_analog, cache_digital
+                    self._waveform_cache.discard(sampling_hash)
+                self.log.error('Sampling of PulseBlockEnsemble "{0}" failed due to a MemoryError.\n'
+                               'The sample array needed is too large to allocate in memory.\n'
+                               'Try using the overhead_bytes ConfigOption to limit memory usage or '
+                               'the sample_staging_path ConfigOption to stage samples on disk.'
+                               ''.format(ensemble.name))
+                if not self.__sequence_generation_in_progress:
+                    self.module_state.unlock()
+                self.sigSampleEnsembleComplete.emit(None)
+                return -1, list(), dict()
+        # Number of samples to calculate at once (only smaller than a chunk in staging mode)
+        if staged and self._overhead_bytes > 0:
+            fill_length = max(self._overhead_bytes // bytes_per_sample, 1)
+        elif staged:
+            fill_length = 2**22
+        else:
+            fill_length = max(array_length, 1)
+
+        # Precompute the element boundaries and channel states of the whole ensemble
+        sampler = EnsembleSampler(ensemble=ensemble,
+                                  blocks={name: self.get_block(name) for name, _ in ensemble.block_list},
+                                  elements_length_bins=ensemble_info['elements_length_bins'],
+                                  sample_rate=self.__sample_rate,
+                                  analog_amplitudes=self.__analog_levels[0],
+                                  analog_channels=ensemble_info['analog_channels'],
+                                  digital_channels=ensemble_info['digital_channels'])
+
+        def _fill_chunk(start_bin, analog_samples, digital_samples):
+            # Calculate the sample arrays for a chunk or read them from the source arrays
+            stop_bin = min(start_bin + array_length, ensemble_info['number_of_samples'])
+            if source_passthrough:
+                return
+            for fill_start in range(start_bin, stop_bin, fill_length):
+                chunk = slice(fill_start, min(fill_start + fill_length, stop_bin))
+                part = slice(chunk.start - start_bin, chunk.stop - start_bin)
+                analog_part = {chnl: arr[part] for chnl, arr in analog_samples.items()}
+                digital_part = {chnl: arr[part] for chnl, arr in digital_samples.items()}
+                if source_analog is None:
+                    sampler.sample_chunk(start_bin=fill_start,
+                                         analog_samples=analog_part,
+                                         digital_samples=digital_part,
+                                         offset_bin=offset_bin)
+                else:
+                    for chnl, samples in analog_part.items():
+                        samples[:] = source_analog[chnl][chunk]
+                    for chnl, samples in digital_part.items():
+                        samples[:] = source_digital[chnl][chunk]
+                if cache_analog is not None:
+                    for chnl, samples in analog_part.items():
+                        cache_analog[chnl][chunk] = samples
+                    for chnl, samples in digital_part.items():
+                        cache_digital[chnl][chunk] = samples
+
+        def _get_chunk_buffers(chunk_index):
+            # Sample arrays for a chunk. The last chunk can be shorter than the previous ones.
+            start_bin = chunk_index * array_length
+            length = min(array_length, ensemble_info['number_of_samples'] - start_bin)
+            analog_samples, digital_samples = sample_buffers[chunk_index % len(sample_buffers)]
+            if length < array_length:
+                analog_samples = {chnl: arr[:length] for chnl, arr in analog_samples.items()}
+                digital_samples = {chnl: arr[:length] for chnl, arr in digital_samples.items()}
+            return start_bin, analog_samples, digital_samples
+
+        if array_length > 0:
+            number_of_chunks = -(-ensemble_info['number_of_samples'] // array_length)
+        else:
+            number_of_chunks = 0
+        # In pipelined mode the next chunk is calculated in a background thread while the current
+        # chunk is written to the device.
+        chunk_executor = ThreadPoolExecutor(max_workers=1) if pipelined else None
+        next_chunk = None
+        if chunk_executor is not None and number_of_chunks > 0:
+            next_chunk = chunk_executor.submit(_fill_chunk, *_get_chunk_buffers(0))
+
+        # integer to keep track of the samples already processed
         processed_samples = 0
-        # Index to keep track of the samples written into the preallocated samples array
-        array_write_index = 0
-        # Keep track of the number of elements already written
-        element_count = 0
         # set of written waveform names on the device
         written_waveforms = set()
-        # Iterate over all blocks within the PulseBlockEnsemble object
-        for block_name, reps in ensemble.block_list:
-            block = self.get_block(block_name)
-            # Iterate over all repetitions of the current block
-            for rep_no in range(reps + 1):
-                # Iterate over the PulseBlockElement instances inside the current block
-                for element in block.element_list:
-                    digital_high = element.digital_high
-                    pulse_function = element.pulse_function
-                    element_length_bins = ensemble_info['elements_length_bins'][element_count]
-
-                    # Indicator on how many samples of this element have been written already
-                    element_samples_written = 0
-
-                    while element_samples_written != element_length_bins:
-                        samples_to_add = min(array_length - array_write_index,
-                                             element_length_bins - element_samples_written)
-                        # create floating point time array for the current element inside rotating
-                        # frame if analog samples are to be calculated.
-                        if pulse_function:
-                            time_arr = (offset_bin + np.arange(
-                                samples_to_add, dtype='float64')) / self.__sample_rate
-
-                        # Calculate respective part of the sample arrays
-                        for chnl in digital_high:
-                            digital_samples[chnl][array_write_index:array_write_index + samples_to_add] = digital_high[
-                                chnl]
-                        for chnl in pulse_function:
-                            analog_samples[chnl][array_write_index:array_write_index + samples_to_add] = pulse_function[
-                                                                                                             chnl].get_samples(
-                                time_arr) / (self.__analog_levels[0][chnl] / 2)
-
-                        # Free memory
-                        if pulse_function:
-                            del time_arr
-
-                        element_samples_written += samples_to_add
-                        array_write_index += samples_to_add
-                        processed_samples += samples_to_add
-                        # if the rotating frame should be preserved (default) increment the offset
-                        # counter for the time array.
-                        if ensemble.rotating_frame:
-                            offset_bin += samples_to_add
-
-                        # Check if the temporary sample array is full and write to the device if so.
-                        if array_write_index == array_length:
-                            # Set first/last chunk flags
-                            is_first_chunk = array_write_index == processed_samples
-                            is_last_chunk = processed_samples == ensemble_info['number_of_samples']
-                            written_samples, wfm_list = self.pulsegenerator().write_waveform(
-                                name=waveform_name,
-                                analog_samples=analog_samples,
-                                digital_samples=digital_samples,
-                                is_first_chunk=is_first_chunk,
-                                is_last_chunk=is_last_chunk,
-                                total_number_of_samples=ensemble_info['number_of_samples'])
-
-                            # Update written waveforms set
-                            written_waveforms.update(wfm_list)
-
-                            # check if write process was successful
-                            if written_samples != array_length:
-                                self.log.error('Sampling of block "{0}" in ensemble "{1}" failed. '
-                                               'Write to device was unsuccessful.\nThe number of '
-                                               'actually written samples ({2:d}) does not match '
-                                               'the number of samples staged to write ({3:d}).'
-                                               ''.format(block_name, ensemble.name, written_samples,
-                                                         array_length))
-                                if not self.__sequence_generation_in_progress:
-                                    self.module_state.unlock()
-                                self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
-                                self.sigSampleEnsembleComplete.emit(None)
-                                return -1, list(), dict()
-
-                            # Reset array write start pointer
-                            array_write_index = 0
-
-                            # check if the temporary write array needs to be truncated for the next
-                            # part. (because it is the last part of the ensemble to write which can
-                            # be shorter than the previous chunks)
-                            if array_length > ensemble_info['number_of_samples'] - processed_samples:
-                                array_length = ensemble_info['number_of_samples'] - processed_samples
-                                analog_samples = dict()
-                                digital_samples = dict()
-                                for chnl in ensemble_info['analog_channels']:
-                                    analog_samples[chnl] = np.empty(array_length, dtype='float32')
-                                for chnl in ensemble_info['digital_channels']:
-                                    digital_samples[chnl] = np.empty(array_length, dtype=bool)
-
-                    # Increment element index
-                    element_count += 1
+        # Sample and write the ensemble chunk by chunk
+        try:
+            for chunk_index in range(number_of_chunks):
+                start_bin, analog_samples, digital_samples = _get_chunk_buffers(chunk_index)
+                array_length_chunk = min(array_length,
+                                         ensemble_info['number_of_samples'] - start_bin)
+                if next_chunk is None:
+                    _fill_chunk(start_bin, analog_samples, digital_samples)
+                else:
+                    next_chunk.result()
+                    if chunk_index + 1 < number_of_chunks:
+                        next_chunk = chunk_executor.submit(_fill_chunk,
+                                                           *_get_chunk_buffers(chunk_index + 1))
+                    else:
+                        next_chunk = None
+
+                # Set first/last chunk flags
+                is_first_chunk = processed_samples == 0
+                processed_samples += array_length_chunk
+                is_last_chunk = processed_samples == ensemble_info['number_of_samples']
+                written_samples, wfm_list = self.pulsegenerator().write_waveform(
+                    name=waveform_name,
+                    analog_samples=analog_samples,
+                    digital_samples=digital_samples,
+                    is_first_chunk=is_first_chunk,
+                    is_last_chunk=is_last_chunk,
+                    total_number_of_samples=ensemble_info['number_of_samples'])
+
+                # Update written waveforms set
+                written_waveforms.update(wfm_list)
+
+                # check if write process was successful
+                if written_samples != array_length_chunk:
+                    self.log.error('Sampling of ensemble "{0}" failed. Write to device was '
+                                   'unsuccessful.\nThe number of actually written samples ({1:d}) '
+                                   'does not match the number of samples staged to write ({2:d}).'
+                                   ''.format(ensemble.name, written_samples, array_length_chunk))
+                    if next_chunk is not None:
+                        next_chunk.cancel()
+                        chunk_executor.shutdown(wait=True)
+                        next_chunk = None
+                    if cache_analog is not None:
+                        del cache_analog, cache_digital
+                        self._waveform_cache.discard(sampling_hash)
+                    if not self.__sequence_generation_in_progress:
+                        self.module_state.unlock()
+                    self.sigAvailableWaveformsUpdated.emit(self.sampled_waveforms)
+                    self.sigSampleEnsembleComplete.emit(None)
+                    return -1, list(), dict()
+
+                if number_of_chunks > 1:
+                    self.sigSampleEnsembleProgress.emit(
+                        waveform_name, processed_samples / ensemble_info['number_of_samples'])
+        finally:
+            if chunk_executor is not None:
+                chunk_executor.shutdown(wait=True)
+            # Release staged sample arrays. The temporary files are deleted when closed.
+            sample_buffers = analog_samples = digital_samples = None
+            for file in staging_files:
+                file.close()
+
+        # Finalize the new waveform cache entry
+        if cache_analog is not None:
+            self._waveform_cache.commit(sampling_hash, cache_analog, cache_digital)
+            del cache_analog, cache_digital
+        del source_analog, source_digital
+
+        # Remember the waveforms written to the device and the hash of their samples
+        self._sampled_waveform_hashes[waveform_name] = {'hash': sampling_hash,
+                                                        'waveforms': natural_sort(written_waveforms)}
+
+        # if the rotating frame should be preserved (default) increment the offset counter for the
+        # next ensemble.
+        if ensemble.rotating_frame:
+            offset_bin += processed_samples
 
         # Save sampling related parameters to the sampling_information container within the
         # PulseBlockEnsemble.
@@ -1933,6 +2207,7 @@ class SequenceGeneratorLogic(LogicBase):
             ensemble.sampling_information = dict()
             ensemble.sampling_information.update(ensemble_info)
             ensemble.sampling_information['pulse_generator_settings'] = self.pulse_generator_settings
+            ensemble.sampling_information['sampling_hash'] = sampling_hash
             ensemble.sampling_information['waveforms'] = natural_sort(written_waveforms)
             self.save_ensemble(ensemble)
 
@@ -2020,6 +2295,15 @@ class SequenceGeneratorLogic(LogicBase):
         #           (('waveform3', 'waveform4'), seq_param_dict2)]
         sequence_param_dict_list = list()
 
+        # If enabled, sample the ensembles in worker processes beforehand. Writing the samples to
+        # the device is still done one after another in order of the sequence steps.
+        if self._parallel_sampling_processes > 0:
+            parallel_jobs = self._get_parallel_sampling_jobs(sequence)
+        else:
+            parallel_jobs = list()
+        presampled_tags = {job[0] for job in parallel_jobs}
+        presampler = self._run_parallel_sampling_jobs(parallel_jobs)
+
         # if all the Pulse_Block_Ensembles should be in the rotating frame, then each ensemble
         # will be created in general with a different offset_bin. Therefore, in order to keep track
         # of the sampled Pulse_Block_Ensembles one has to introduce a running number as an
@@ -2038,15 +2322,32 @@ class SequenceGeneratorLogic(LogicBase):
                     not self.get_ensemble(name_tag).sampling_information or \
                     self.get_ensemble(name_tag).sampling_information['pulse_generator_settings'] != self.pulse_generator_settings:
 
-                offset_bin, waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
-                    ensemble=seq_step.ensemble,
-                    offset_bin=offset_bin,
-                    name_tag=name_tag)
+                # Get the samples from the worker process if the ensemble has been presampled
+                presampled = None
+                sample_buffer = None
+                if name_tag in presampled_tags:
+                    presampled_tags.remove(name_tag)
+                    _, sampling_hash, sample_buffer = next(presampler)
+                    if sample_buffer is not None:
+                        presampled = (sampling_hash,
+                                      sample_buffer.analog_samples,
+                                      sample_buffer.digital_samples)
+                try:
+                    offset_bin, waveform_list, ensemble_info = self.sample_pulse_block_ensemble(
+                        ensemble=seq_step.ensemble,
+                        offset_bin=offset_bin,
+                        name_tag=name_tag,
+                        presampled=presampled)
+                finally:
+                    del presampled
+                    if sample_buffer is not None:
+                        sample_buffer.close()
 
                 if len(waveform_list) == 0:
                     self.log.error('Sampling of PulseBlockEnsemble "{0}" failed during sampling of '
                                    'PulseSequence "{1}".\nFailed to create waveforms on device.'
                                    ''.format(seq_step.ensemble, sequence.name))
+                    presampler.close()
                     self.module_state.unlock()
                     self.__sequence_generation_in_progress = False
                     self.sigSampleSequenceComplete.emit(None)
@@ -2070,6 +2371,7 @@ class SequenceGeneratorLogic(LogicBase):
             # Append written sequence step to sequence_param_dict_list
             sequence_param_dict_list.append(
                 (tuple(generated_ensembles[name_tag]['waveforms']), seq_step))
+        presampler.close()
 
         # pass the whole information to the sequence creation method:
         steps_written = self.pulsegenerator().write_sequence(sequence.name,
@@ -2100,6 +2402,199 @@ class SequenceGeneratorLogic(LogicBase):
         self.sigSampleSequenceComplete.emit(sequence)
         return
 
+    def _get_sampling_hash(self, ensemble, offset_bin=0):
+        """ Calculate a hash of everything the samples of a PulseBlockEnsemble depend on, i.e. the
+        ensemble itself, all referenced PulseBlocks, the offset bin as well as the sample rate,
+        activation config and analog amplitudes of the pulse generator.
+
+        @param PulseBlockEnsemble ensemble: The PulseBlockEnsemble to calculate the hash for
+        @param int offset_bin: The offset bin used for sampling
+        @return str: hexadecimal digest
+        """
+        hash_items = [repr(ensemble.block_list),
+                      ensemble.rotating_frame,
+                      int(offset_bin),
+                      float(self.__sample_rate),
+                      sorted(self.__activation_config[1]),
+                      sorted(self.__analog_levels[0].items())]
+        for block_name in sorted({name for name, _ in ensemble.block_list}):
+            hash_items.append(repr(self.get_block(block_name)))
+        return hashlib.sha1(repr(hash_items).encode()).hexdigest()
+
+    def _create_staging_arrays(self, analog_channels, digital_channels, number_of_samples,
+                               staging_files):
+        """ Create sample arrays for a whole waveform backed by temporary files in the staging
+        directory (ConfigOption "sample_staging_path"). The files are deleted once they are closed.
+
+        @param iterable analog_channels: analog channel descriptors
+        @param iterable digital_channels: digital channel descriptors
+        @param int number_of_samples: Number of samples per channel
+        @param list staging_files: list to append the opened temporary files to. The caller is
+                                   responsible to close them.
+
+        @return (dict, dict): memory-mapped analog and digital sample arrays
+        """
+        if not os.path.exists(self._sample_staging_dir):
+            os.makedirs(self._sample_staging_dir)
+        analog_samples = dict()
+        digital_samples = dict()
+        for chnl in analog_channels:
+            file = tempfile.TemporaryFile(dir=self._sample_staging_dir)
+            staging_files.append(file)
+            analog_samples[chnl] = np.memmap(file,
+                                             dtype='float32',
+                                             mode='w+',
+                                             shape=(int(number_of_samples),))
+        for chnl in digital_channels:
+            file = tempfile.TemporaryFile(dir=self._sample_staging_dir)
+            staging_files.append(file)
+            digital_samples[chnl] = np.memmap(file,
+                                              dtype=bool,
+                                              mode='w+',
+                                              shape=(int(number_of_samples),))
+        return analog_samples, digital_samples
+
+    def _get_parallel_sampling_jobs(self, sequence):
+        """ Determine the PulseBlockEnsembles of a PulseSequence that need to be sampled and can be
+        sampled independently in worker processes. Ensembles are extended to match the waveform
+        granularity and the offset bins to maintain the rotating frame are calculated beforehand
+        just like sample_pulse_sequence would do it step by step.
+
+        @param PulseSequence sequence: The PulseSequence to be sampled
+        @return list: job tuples (name_tag, sampling_hash, offset_bin, EnsembleSampler) in order of
+                      the sequence steps
+        """
+        jobs = list()
+        name_tags = set()
+        offset_bin = 0
+        for step_index, seq_step in enumerate(sequence):
+            ensemble = self.get_ensemble(seq_step.ensemble)
+            if sequence.rotating_frame:
+                name_tag = seq_step.ensemble + '_' + str(step_index).zfill(3)
+            else:
+                name_tag = seq_step.ensemble
+                offset_bin = 0
+                if name_tag in name_tags:
+                    continue
+                if ensemble.sampling_information and ensemble.sampling_information[
+                        'pulse_generator_settings'] == self.pulse_generator_settings:
+                    continue
+            name_tags.add(name_tag)
+
+            # Extending an ensemble to the waveform granularity (re-)defines the shared
+            # "idle_extension" block. Sample all remaining steps in order in the logic thread.
+            ensemble_info = self.analyze_block_ensemble(ensemble)
+            granularity = self.pulse_generator_constraints.waveform_length.step
+            if ensemble_info['number_of_samples'] % granularity != 0:
+                break
+            sampling_hash = self._get_sampling_hash(ensemble, offset_bin)
+            step_offset_bin = offset_bin
+            if ensemble.rotating_frame:
+                offset_bin += ensemble_info['number_of_samples']
+
+            # No need to sample if identical samples are already present on the device or cached
+            if self._get_present_waveforms(name_tag, sampling_hash) is not None:
+                continue
+            if self._waveform_cache is not None and sampling_hash in self._waveform_cache:
+                continue
+            # Chunkwise writing needed to limit memory usage. Sample in logic thread instead.
+            bytes_per_sample = len(ensemble_info['analog_channels']) * 4 + len(
+                ensemble_info['digital_channels'])
+            if 0 < self._overhead_bytes < bytes_per_sample * ensemble_info['number_of_samples']:
+                continue
+            if ensemble_info['number_of_samples'] == 0:
+                continue
+
+            sampler = EnsembleSampler(
+                ensemble=ensemble,
+                blocks={name: self.get_block(name) for name, _ in ensemble.block_list},
+                elements_length_bins=ensemble_info['elements_length_bins'],
+                sample_rate=self.__sample_rate,
+                analog_amplitudes=self.__analog_levels[0],
+                analog_channels=ensemble_info['analog_channels'],
+                digital_channels=ensemble_info['digital_channels'])
+            jobs.append((name_tag, sampling_hash, step_offset_bin, sampler))
+        return jobs
+
+    def _run_parallel_sampling_jobs(self, jobs):
+        """ Generator submitting sampling jobs (see _get_parallel_sampling_jobs) to the worker
+        process pool. Only a limited number of jobs is processed ahead in order to limit memory
+        usage.
+
+        Yields tuples (name_tag, sampling_hash, SharedSampleBuffer) in order of the jobs.
+        The buffer is None if sampling in the worker process failed. The caller is responsible to
+        close the yielded buffers.
+
+        @param list jobs: job tuples as returned by _get_parallel_sampling_jobs
+        """
+        if not jobs:
+            return
+        if self._sampling_pool is None:
+            self._sampling_pool = ProcessPoolExecutor(
+                max_workers=self._parallel_sampling_processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_sampling_worker,
+                initargs=(self._sampling_function_paths,))
+
+        pending = deque()
+        jobs = iter(jobs)
+        try:
+            while True:
+                # Keep all worker processes busy
+                while len(pending) < 2 * self._parallel_sampling_processes:
+                    job = next(jobs, None)
+                    if job is None:
+                        break
+                    name_tag, sampling_hash, offset_bin, sampler = job
+                    try:
+                        sample_buffer = SharedSampleBuffer(sampler.analog_channels,
+                                                           sampler.digital_channels,
+                                                           sampler.number_of_samples)
+                    except (OSError, MemoryError):
+                        self.log.exception('Unable to allocate shared memory for parallel sampling '
+                                           'of "{0}".'.format(name_tag))
+                        pending.append((name_tag, sampling_hash, None, None))
+                        continue
+                    future = self._sampling_pool.submit(sample_into_shared_buffer,
+                                                        sampler,
+                                                        sample_buffer.names,
+                                                        offset_bin)
+                    self._sampling_futures.add(future)
+                    future.add_done_callback(self._sampling_futures.discard)
+                    pending.append((name_tag, sampling_hash, sample_buffer, future))
+                if not pending:
+                    return
+
+                name_tag, sampling_hash, sample_buffer, future = pending.popleft()
+                if future is not None:
+                    try:
+                        future.result()
+                    except Exception:
+                        self.log.exception('Parallel sampling of "{0}" failed. Sampling in logic '
+                                           'thread instead.'.format(name_tag))
+                        sample_buffer.close()
+                        sample_buffer = None
+                yield name_tag, sampling_hash, sample_buffer
+        finally:
+            for _, _, sample_buffer, future in pending:
+                if future is not None:
+                    future.cancel()
+                if sample_buffer is not None:
+                    sample_buffer.close()
+
+    def _get_present_waveforms(self, waveform_name, sampling_hash):
+        """ Check if waveforms with the given name tag and sampling hash are present on the device.
+
+        @param str waveform_name: The waveform name tag (without channel suffix)
+        @param str sampling_hash: The sampling hash as returned by _get_sampling_hash
+        @return list: sorted waveform names present on the device, None if not present
+        """
+        present_waveforms = self._sampled_waveform_hashes.get(waveform_name)
+        if present_waveforms and present_waveforms['hash'] == sampling_hash and \
+                set(present_waveforms['waveforms']).issubset(self.sampled_waveforms):
+            return natural_sort(present_waveforms['waveforms'])
+        return None
+
     def _delete_waveform(self, names):
         if isinstance(names, str):
             names = [names]
@@ -2116,6 +2611,7 @@ class SequenceGeneratorLogic(LogicBase):
         wfm_to_delete = [wfm for wfm in self.sampled_waveforms if
                          wfm.rsplit('_', 1)[0] == nametag]
         self._delete_waveform(wfm_to_delete)
+        self._sampled_waveform_hashes.pop(nametag, None)
         # Erase sampling information if a PulseBlockEnsemble by the same name can be found in saved
         # ensembles
         if nametag in self.saved_pulse_block_ensembles:
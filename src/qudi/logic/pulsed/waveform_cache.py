@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+This file contains an on-disk cache for sampled waveforms used by the Qudi sequence generator logic.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import logging
+import numpy as np
+
+
+class WaveformCache:
+    """
+    Content-addressed storage of sampled waveforms on disk.
+
+    Each cache entry is a directory named by the sampling hash of a PulseBlockEnsemble (see
+    SequenceGeneratorLogic) containing one ".npy" file per channel. An entry is only valid once it
+    has been committed, i.e. all samples have been written.
+    Sample arrays are memory-mapped, so entries can be written and read back chunk by chunk
+    without holding the whole waveform in memory.
+    If the total size of all entries exceeds max_bytes, the least recently used entries are removed.
+    """
+    _complete_marker = 'complete'
+
+    def __init__(self, path, max_bytes=0):
+        """
+        @param str path: Directory to store the cache entries in
+        @param int max_bytes: Maximum size of the cache on disk. Unlimited if <= 0.
+        """
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.log = logging.getLogger(__name__)
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key)
+
+    def __contains__(self, key):
+        return os.path.isfile(os.path.join(self._entry_path(key), self._complete_marker))
+
+    def get(self, key):
+        """ Get memory-mapped sample arrays of a cache entry. The arrays are mapped copy-on-write,
+        i.e. they can be modified in memory without altering the cache entry.
+
+        @param str key: The sampling hash of the entry
+        @return (dict, dict): analog and digital sample arrays or (None, None) if not cached
+        """
+        if key not in self:
+            return None, None
+        entry_path = self._entry_path(key)
+        analog_samples = dict()
+        digital_samples = dict()
+        try:
+            with os.scandir(entry_path) as scan:
+                for file in scan:
+                    if not file.name.endswith('.npy'):
+                        continue
+                    chnl = file.name[:-4]
+                    samples = np.load(file.path, mmap_mode='c')
+                    if chnl.startswith('a'):
+                        analog_samples[chnl] = samples
+                    else:
+                        digital_samples[chnl] = samples
+            # mark as recently used
+            os.utime(os.path.join(entry_path, self._complete_marker))
+        except (OSError, ValueError):
+            self.log.exception('Failed to read waveform cache entry "{0}". Removing entry.'
+                               ''.format(key))
+            self.discard(key)
+            return None, None
+        return analog_samples, digital_samples
+
+    def create(self, key, analog_channels, digital_channels, number_of_samples):
+        """ Create a new cache entry and return writeable memory-mapped sample arrays for it.
+        The entry must be finalized by calling "commit" after all samples have been written.
+
+        @param str key: The sampling hash of the entry
+        @param iterable analog_channels: analog channel descriptors
+        @param iterable digital_channels: digital channel descriptors
+        @param int number_of_samples: Total number of samples per channel
+        @return (dict, dict): analog and digital sample arrays or (None, None) if creation failed
+        """
+        number_of_samples = int(number_of_samples)
+        if number_of_samples < 1:
+            return None, None
+        self.discard(key)
+        entry_path = self._entry_path(key)
+        analog_samples = dict()
+        digital_samples = dict()
+        try:
+            os.makedirs(entry_path)
+            for chnl in analog_channels:
+                analog_samples[chnl] = np.lib.format.open_memmap(
+                    os.path.join(entry_path, '{0}.npy'.format(chnl)),
+                    mode='w+',
+                    dtype='float32',
+                    shape=(number_of_samples,))
+            for chnl in digital_channels:
+                digital_samples[chnl] = np.lib.format.open_memmap(
+                    os.path.join(entry_path, '{0}.npy'.format(chnl)),
+                    mode='w+',
+                    dtype=bool,
+                    shape=(number_of_samples,))
+        except OSError:
+            self.log.exception('Failed to create waveform cache entry "{0}".'.format(key))
+            del analog_samples, digital_samples
+            self.discard(key)
+            return None, None
+        return analog_samples, digital_samples
+
+    def commit(self, key, analog_samples, digital_samples):
+        """ Flush the sample arrays returned by "create" to disk and mark the entry as valid.
+
+        @param str key: The sampling hash of the entry
+        @param dict analog_samples: memory-mapped analog sample arrays returned by "create"
+        @param dict digital_samples: memory-mapped digital sample arrays returned by "create"
+        """
+        for samples in (*analog_samples.values(), *digital_samples.values()):
+            samples.flush()
+        with open(os.path.join(self._entry_path(key), self._complete_marker), 'w'):
+            pass
+        self._evict(keep=key)
+
+    def discard(self, key):
+        """ Remove a cache entry (complete or not) from disk.
+
+        @param str key: The sampling hash of the entry
+        """
+        entry_path = self._entry_path(key)
+        if os.path.exists(entry_path):
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+    def clear(self):
+        """ Remove all cache entries from disk.
+        """
+        with os.scandir(self.path) as scan:
+            keys = [entry.name for entry in scan if entry.is_dir()]
+        for key in keys:
+            self.discard(key)
+
+    def _evict(self, keep=None):
+        """ Remove least recently used entries until the cache size is below max_bytes.
+        """
+        if self.max_bytes <= 0:
+            return
+        entries = list()
+        total_bytes = 0
+        with os.scandir(self.path) as scan:
+            for entry in scan:
+                if not entry.is_dir():
+                    continue
+                marker = os.path.join(entry.path, self._complete_marker)
+                if not os.path.isfile(marker):
+                    continue
+                with os.scandir(entry.path) as entry_scan:
+                    size = sum(f.stat().st_size for f in entry_scan if f.is_file())
+                entries.append((os.path.getmtime(marker), entry.name, size))
+                total_bytes += size
+        for _, key, size in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.discard(key)
+            total_bytes -= size
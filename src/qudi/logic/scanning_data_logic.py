@@ -21,10 +21,13 @@ If not, see <https://www.gnu.org/licenses/>.
 """
 
 
+import os
 import time
 import copy
+import uuid
 import datetime
 import numpy as np
+from collections import OrderedDict
 from functools import reduce
 import operator
 
@@ -38,6 +41,7 @@ from qudi.core.connector import Connector
 from qudi.core.configoption import ConfigOption
 from qudi.core.statusvariable import StatusVar
 from qudi.util.datastorage import ImageFormat, NpyDataStorage, TextDataStorage
+from qudi.util.paths import get_appdata_dir
 from qudi.util.units import ScaledFloat
 
 from qudi.interface.scanning_probe_interface import ScanData
@@ -46,13 +50,20 @@ from qudi.interface.scanning_probe_interface import ScanData
 class ScanningDataLogic(LogicBase):
     """
     Todo: add some info about this module
-    
+
+    The scan history is kept as one compressed .npz file per scan in "history_dir" (named
+    "scan_history_<module name>_<uuid>.npz"). Only the scan metadata is kept in the status
+    variables and the image arrays are loaded on demand. The last "history_cache_length" loaded
+    scans are kept in memory.
+
     Example config:
     
     scanning_data_logic:
         module.Class: 'scanning_data_logic.ScanningDataLogic'
         options:
             max_history_length: 50
+            history_cache_length: 5  # optional
+            history_dir: 'C:/Data/scan_history'  # optional, defaults to qudi appdata dir
         connect:
             scan_logic: scanning_probe_logic
     
@@ -63,6 +74,8 @@ class ScanningDataLogic(LogicBase):
 
     # config options
     _max_history_length = ConfigOption(name='max_history_length', default=10)
+    _history_cache_length = ConfigOption(name='history_cache_length', default=5)
+    _history_dir = ConfigOption(name='history_dir', default=None, missing='nothing')
 
     # status variables
     _scan_history = StatusVar(name='scan_history', default=list())
@@ -77,16 +90,22 @@ class ScanningDataLogic(LogicBase):
         self._thread_lock = RecursiveMutex()
 
         self._curr_history_index = 0
+        # Most recent history entry per scan axes
         self._curr_data_per_scan = dict()
+        # Loaded ScanData instances by history file name in least recently used order
+        self._history_cache = OrderedDict()
         self._logic_id = None
         return
 
     def on_activate(self):
         """ Initialisation performed during activation of the module.
         """
+        self._scan_history = [entry for entry in self._scan_history if self._check_entry(entry)]
         self._shrink_history()
+        self._remove_orphaned_history_files()
         if self._scan_history:
-            self._curr_data_per_scan = {sd.scan_axes: sd for sd in self._scan_history}
+            self._curr_data_per_scan = {self._entry_axes(entry): entry for entry in
+                                        self._scan_history}
             self.restore_from_history(-1)
         else:
             self._curr_history_index = 0
@@ -99,14 +118,29 @@ class ScanningDataLogic(LogicBase):
         """
         self._scan_logic().sigScanStateChanged.disconnect(self._update_scan_state)
         self._curr_data_per_scan = dict()
+        self._history_cache.clear()
 
     @_scan_history.representer
     def __scan_history_to_dicts(self, history):
-        return [data.to_dict() for data in history]
+        return [dict(entry) for entry in history]
 
     @_scan_history.constructor
     def __scan_history_from_dicts(self, history_dicts):
-        return [ScanData.from_dict(hist_dict) for hist_dict in history_dicts]
+        history = list()
+        for hist_dict in history_dicts:
+            if 'file' in hist_dict:
+                history.append(hist_dict)
+            else:
+                # Full scan data stored by earlier versions of this module
+                history.append(self._store_scan_data(ScanData.from_dict(hist_dict)))
+        return history
+
+    @property
+    def history_dir(self):
+        """ Directory containing the compressed scan history files """
+        if self._history_dir is None:
+            return os.path.join(get_appdata_dir(True), 'scan_history', self.module_name)
+        return self._history_dir
 
     def get_current_scan_data(self, scan_axes=None):
         """
@@ -117,10 +151,11 @@ class ScanningDataLogic(LogicBase):
         with self._thread_lock:
             if scan_axes is None:
                 try:
-                    scan_axes = self._scan_history[-1].scan_axes
+                    scan_axes = self._entry_axes(self._scan_history[-1])
                 except IndexError:
                     return None
-            return self._curr_data_per_scan.get(scan_axes, None)
+            entry = self._curr_data_per_scan.get(scan_axes, None)
+            return None if entry is None else self._get_scan_data(entry)
 
     def get_current_scan_id(self, scan_axes=None):
         """
@@ -130,8 +165,8 @@ class ScanningDataLogic(LogicBase):
         with self._thread_lock:
             ret_id = np.nan
             idx_i = -1
-            for scan_data in reversed(self._scan_history):
-                if scan_data.scan_axes == scan_axes or scan_axes is None:
+            for entry in reversed(self._scan_history):
+                if self._entry_axes(entry) == scan_axes or scan_axes is None:
                     ret_id = idx_i
                     break
                 idx_i -= 1
@@ -139,12 +174,11 @@ class ScanningDataLogic(LogicBase):
             if np.isnan(ret_id):
                 return np.nan
 
-            assert self._scan_history[ret_id] == self.get_current_scan_data(scan_axes)
             return self._abs_index(ret_id)
 
     def get_all_current_scan_data(self):
         with self._thread_lock:
-            return list(self._curr_data_per_scan.copy().values())
+            return [self._get_scan_data(entry) for entry in self._curr_data_per_scan.values()]
 
     def history_previous(self):
         with self._thread_lock:
@@ -174,10 +208,14 @@ class ScanningDataLogic(LogicBase):
             index = self._abs_index(index)
 
             try:
-                data = self._scan_history[index]
+                entry = self._scan_history[index]
+                data = self._get_scan_data(entry)
             except IndexError:
                 self.log.exception('Unable to restore scan history with index "{0}"'.format(index))
                 return
+            except (OSError, KeyError, ValueError):
+                self.log.exception(f'Unable to load scan history file "{entry["file"]}"')
+                return
 
             settings = {
                 'range': {ax: data.scan_range[i] for i, ax in enumerate(data.scan_axes)},
@@ -189,7 +227,7 @@ class ScanningDataLogic(LogicBase):
             #self.log.debug(f"Restoring hist settings from index {index} with {settings}")
 
             self._curr_history_index = index
-            self._curr_data_per_scan[data.scan_axes] = data
+            self._set_current_entry(entry)
             self.sigHistoryScanDataRestored.emit(data)
             return
 
@@ -204,15 +242,23 @@ class ScanningDataLogic(LogicBase):
         with self._thread_lock:
             if not running and caller_id is self._logic_id:
                 #self.log.debug(f"Adding to data history with settings {settings}")
-                self._scan_history.append(data)
+                try:
+                    entry = self._store_scan_data(data)
+                except OSError:
+                    self.log.exception('Unable to add scan data to scan history:')
+                    return
+                self._cache_scan_data(entry, data)
+                self._scan_history.append(entry)
+                self._set_current_entry(entry)
                 self._shrink_history()
-                self._curr_data_per_scan[data.scan_axes] = data
                 self._curr_history_index = len(self._scan_history) - 1
                 self.sigHistoryScanDataRestored.emit(data)
 
     def _shrink_history(self):
         while len(self._scan_history) > self._max_history_length:
-            self._scan_history.pop(0)
+            entry = self._scan_history.pop(0)
+            if entry not in self._curr_data_per_scan.values():
+                self._remove_history_file(entry)
 
     def _abs_index(self, index):
         if index < 0:
@@ -220,6 +266,110 @@ class ScanningDataLogic(LogicBase):
 
         return index
 
+    @staticmethod
+    def _entry_axes(entry):
+        return tuple(ax['name'] for ax in entry['scan_axes'])
+
+    def _set_current_entry(self, entry):
+        """ Make a history entry the current one for its scan axes. The file of the replaced entry
+        is removed if it is no longer part of the history.
+        """
+        scan_axes = self._entry_axes(entry)
+        old_entry = self._curr_data_per_scan.get(scan_axes, None)
+        self._curr_data_per_scan[scan_axes] = entry
+        if old_entry is not None and old_entry is not entry \
+                and old_entry not in self._scan_history:
+            self._remove_history_file(old_entry)
+
+    def _store_scan_data(self, data):
+        """ Save the arrays of a ScanData instance to a new compressed file in the history
+        directory.
+
+        @param ScanData data: scan data to store
+
+        @return dict: history entry containing the scan metadata and the file name
+        """
+        entry = data.to_dict(include_data=False)
+        del entry['data'], entry['position_data']
+        entry['file'] = f'{self._history_file_prefix}{uuid.uuid4().hex}.npz'
+        arrays = dict()
+        if data.data is not None:
+            arrays.update({f'data_{i}': data.data[ch] for i, ch in enumerate(data.channels)})
+        if data.position_data is not None:
+            arrays.update({f'position_data_{i}': arr for i, arr in
+                           enumerate(data.position_data.values())})
+        os.makedirs(self.history_dir, exist_ok=True)
+        np.savez_compressed(os.path.join(self.history_dir, entry['file']), **arrays)
+        return entry
+
+    def _load_scan_data(self, entry):
+        """ Load a ScanData instance from a history entry and its compressed file """
+        with np.load(os.path.join(self.history_dir, entry['file'])) as npz_file:
+            if 'data_0' in npz_file.files:
+                data = {ch['name']: npz_file[f'data_{i}'] for i, ch in
+                        enumerate(entry['channels'])}
+            else:
+                data = None
+            if 'position_data_0' in npz_file.files:
+                position_data = {ax['name']: npz_file[f'position_data_{i}'] for i, ax in
+                                 enumerate(entry['position_feedback_axes'])}
+            else:
+                position_data = None
+        # ScanData.from_dict alters the (nested) dict passed
+        dict_repr = copy.deepcopy(entry)
+        dict_repr['data'] = data
+        dict_repr['position_data'] = position_data
+        return ScanData.from_dict(dict_repr)
+
+    def _get_scan_data(self, entry):
+        """ Get the ScanData instance of a history entry from the cache or load it from file """
+        data = self._history_cache.get(entry['file'], None)
+        if data is None:
+            data = self._load_scan_data(entry)
+        self._cache_scan_data(entry, data)
+        return data
+
+    def _cache_scan_data(self, entry, data):
+        self._history_cache[entry['file']] = data
+        self._history_cache.move_to_end(entry['file'])
+        while len(self._history_cache) > max(1, self._history_cache_length):
+            self._history_cache.popitem(last=False)
+
+    def _check_entry(self, entry):
+        if os.path.isfile(os.path.join(self.history_dir, entry['file'])):
+            return True
+        self.log.warning(f'Scan history file "{entry["file"]}" not found. Removing scan from '
+                         f'history.')
+        return False
+
+    def _remove_history_file(self, entry):
+        self._history_cache.pop(entry['file'], None)
+        try:
+            os.remove(os.path.join(self.history_dir, entry['file']))
+        except OSError:
+            self.log.exception(f'Unable to remove scan history file "{entry["file"]}":')
+
+    @property
+    def _history_file_prefix(self):
+        """ File name prefix of the scan history files created by this module """
+        return f'scan_history_{self.module_name}_'
+
+    def _remove_orphaned_history_files(self):
+        """ Remove scan history files created by this module that are no longer in the history.
+        Other files in "history_dir" (e.g. of other modules sharing the directory) are left alone.
+        """
+        if not os.path.isdir(self.history_dir):
+            return
+        history_files = {entry['file'] for entry in self._scan_history}
+        prefix = self._history_file_prefix
+        for file_name in os.listdir(self.history_dir):
+            if file_name.startswith(prefix) and file_name.endswith('.npz') and \
+                    file_name not in history_files:
+                try:
+                    os.remove(os.path.join(self.history_dir, file_name))
+                except OSError:
+                    self.log.exception(f'Unable to remove scan history file "{file_name}":')
+
     def draw_1d_scan_figure(self, scan_data, channel):
         """ Create an XY plot of 1D scan data.
 
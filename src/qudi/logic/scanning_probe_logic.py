@@ -63,6 +63,8 @@ class ScanningProbeLogic(LogicBase):
 
     # signals
     sigScanStateChanged = QtCore.Signal(bool, object, object)
+    # (scan_data, (first_line, stop_line), caller_id) of newly completed scan lines
+    sigScanLinesUpdated = QtCore.Signal(object, tuple, object)
     sigScannerTargetChanged = QtCore.Signal(dict, object)
     sigScanSettingsChanged = QtCore.Signal(dict)
 
@@ -75,6 +77,7 @@ class ScanningProbeLogic(LogicBase):
         self.__scan_poll_timer = None
         self.__scan_poll_interval = 0
         self.__scan_stop_requested = True
+        self.__completed_lines = 0
         self._curr_caller_id = self.module_uuid
         return
 
@@ -385,6 +388,7 @@ class ScanningProbeLogic(LogicBase):
                 self.log.error("Couldn't start scan.")
                 return -1
 
+            self.__completed_lines = 0
             self.sigScanStateChanged.emit(True, self.scan_data, self._curr_caller_id)
             self.__start_timer()
             return 0
@@ -418,8 +422,15 @@ class ScanningProbeLogic(LogicBase):
                 if self._scanner().module_state() == 'idle':
                     self.stop_scan()
                     return
-                # TODO Added the following line as a quick test; Maybe look at it with more caution if correct
-                self.sigScanStateChanged.emit(True, self.scan_data, self._curr_caller_id)
+                # Only announce newly completed lines. Subscribers can update their display
+                # incrementally from the (shared) scan data.
+                scan_data = self.scan_data
+                first_line = self.__completed_lines
+                self.__completed_lines = self._count_completed_lines(scan_data, first_line)
+                if self.__completed_lines > first_line:
+                    self.sigScanLinesUpdated.emit(scan_data,
+                                                  (first_line, self.__completed_lines),
+                                                  self._curr_caller_id)
 
                 # Queue next call to this slot
                 self.__scan_poll_timer.start()
@@ -429,6 +440,26 @@ class ScanningProbeLogic(LogicBase):
                 self.log.exception('An exception was raised while polling the scan:')
             return
 
+    @staticmethod
+    def _count_completed_lines(scan_data, start=0):
+        """ Count the consecutive scan lines without NaN values in any channel. Scan lines are
+        the columns (last axis) of 2D scan data and the single points of 1D scan data.
+
+        @param ScanData scan_data: The scan data to check
+        @param int start: Number of lines already known to be complete
+
+        @return int: Number of completed lines
+        """
+        if scan_data is None or not scan_data.data:
+            return start
+        channel_data = tuple(scan_data.data.values())
+        line_count = channel_data[0].shape[-1]
+        line = start
+        while line < line_count and not any(np.isnan(data[..., line]).any()
+                                            for data in channel_data):
+            line += 1
+        return line
+
     def set_full_scan_ranges(self):
         scan_range = {ax: axis.value_range for ax, axis in self.scanner_constraints.axes.items()}
         return self.set_scan_range(scan_range)
@@ -19,6 +19,8 @@ You should have received a copy of the GNU Lesser General Public License along w
 If not, see <https://www.gnu.org/licenses/>.
 """
 
+import os
+import time
 import numpy as np
 import datetime as dt
 import matplotlib.pyplot as plt
@@ -35,8 +37,12 @@ from qudi.util.helpers import is_integer_type
 from qudi.util.network import netobtain
 from qudi.interface.data_instream_interface import StreamingMode, SampleTiming
 from qudi.interface.data_instream_interface import DataInStreamConstraints
-from qudi.util.datastorage import TextDataStorage
+from qudi.util.datastorage import TextDataStorage, NpyDataStorage, get_timestamp_filename
+from qudi.util.datastorage import create_dir_for_file
 from qudi.util.units import ScaledFloat
+from qudi.util.ring_buffer import RingBuffer
+from qudi.util.decimation import MinMaxPyramid
+from qudi.util.stream_recorder import StreamRecorder
 
 
 class TimeSeriesReaderLogic(LogicBase):
@@ -49,8 +55,11 @@ class TimeSeriesReaderLogic(LogicBase):
         module.Class: 'time_series_reader_logic.TimeSeriesReaderLogic'
         options:
             max_frame_rate: 20  # optional (default: 20Hz)
+            max_display_rate: 20  # optional (default: 20Hz, 0 disables rate limit)
+            max_display_points: 4096  # optional (default: 4096, 0 disables decimation)
             channel_buffer_size: 1048576  # optional (default: 1MSample)
             max_raw_data_bytes: 1073741824  # optional (default: 1GB)
+            stream_recording_to_disk: False  # optional (default: False)
         connect:
             streamer: <streamer_name>
     """
@@ -67,6 +76,12 @@ class TimeSeriesReaderLogic(LogicBase):
 
     # config options
     _max_frame_rate = ConfigOption('max_frame_rate', default=20, missing='warn')
+    # Maximum rate of trace updates (sigDataChanged) independent of the acquisition frame rate.
+    # Set to 0 to emit an update for each acquired frame.
+    _max_display_rate = ConfigOption('max_display_rate', default=20, missing='nothing')
+    # Maximum number of points per channel in traces emitted via sigDataChanged. Longer traces are
+    # decimated to min/max pairs. Set to 0 to always emit the full resolution trace.
+    _max_display_points = ConfigOption('max_display_points', default=4096, missing='nothing')
     _channel_buffer_size = ConfigOption(name='channel_buffer_size',
                                         default=1024**2,
                                         missing='info',
@@ -75,6 +90,12 @@ class TimeSeriesReaderLogic(LogicBase):
                                        default=1024**3,
                                        missing='info',
                                        constructor=lambda x: int(round(x)))
+    # Write recorded raw data continuously to binary .npy files instead of keeping it in memory.
+    # The recording size is then only limited by disk space and "max_raw_data_bytes" limits the
+    # memory used for data queued for writing.
+    _stream_recording = ConfigOption(name='stream_recording_to_disk',
+                                     default=False,
+                                     missing='nothing')
 
     # status vars
     _trace_window_size = StatusVar('trace_window_size', default=6)
@@ -106,6 +127,11 @@ class TimeSeriesReaderLogic(LogicBase):
         self._trace_times = None
         self._trace_data_averaged = None
         self.__moving_filter = None
+        self._last_display_update = 0
+        # min/max decimation of trace data for display
+        self._trace_pyramid = None
+        self._averaged_pyramid = None
+        self._display_range = None
 
         # for data recording
         self._recorded_raw_data = None
@@ -113,6 +139,9 @@ class TimeSeriesReaderLogic(LogicBase):
         self._recorded_sample_count = 0
         self._data_recording_active = False
         self._record_start_time = None
+        self._recorder = None
+        self._recorded_data_path = None
+        self._recorded_times_path = None
 
         # important to know for method of reading the buffer
         self._streamer_is_remote = False
@@ -190,19 +219,30 @@ class TimeSeriesReaderLogic(LogicBase):
         trace_dtype = np.float64 if is_integer_type(constraints.data_type) else constraints.data_type
 
         # processed data arrays
-        self._trace_data = np.zeros(
-            [window_size + self._moving_average_width // 2, channel_count],
+        self._trace_data = RingBuffer(size=window_size + self._moving_average_width // 2,
+                                      shape=(channel_count,),
+                                      dtype=trace_dtype)
+        self._trace_data_averaged = RingBuffer(
+            size=window_size - self._moving_average_width // 2,
+            shape=(averaged_channel_count,),
             dtype=trace_dtype
         )
-        self._trace_data_averaged = np.zeros(
-            [window_size - self._moving_average_width // 2, averaged_channel_count],
-            dtype=trace_dtype
-        )
-        self._trace_times = np.arange(window_size, dtype=np.float64)
+        trace_times = np.arange(window_size, dtype=np.float64)
         if constraints.sample_timing == SampleTiming.TIMESTAMP:
-            self._trace_times -= window_size
+            trace_times -= window_size
         if constraints.sample_timing != SampleTiming.RANDOM:
-            self._trace_times /= self.data_rate
+            trace_times /= self.data_rate
+        self._trace_times = RingBuffer(size=window_size, dtype=np.float64)
+        self._trace_times.append(trace_times)
+        min_buckets = max(1, self._max_display_points // 8)
+        self._trace_pyramid = MinMaxPyramid(size=len(self._trace_data),
+                                            shape=(channel_count,),
+                                            dtype=trace_dtype,
+                                            min_buckets=min_buckets)
+        self._averaged_pyramid = MinMaxPyramid(size=len(self._trace_data_averaged),
+                                               shape=(averaged_channel_count,),
+                                               dtype=trace_dtype,
+                                               min_buckets=min_buckets)
 
         # raw data buffers
         self._data_buffer = np.empty(channel_count * self._channel_buffer_size,
@@ -290,10 +330,11 @@ class TimeSeriesReaderLogic(LogicBase):
         """ Read-only property returning the x-axis of the data trace and a dictionary of the
         corresponding trace data arrays for each channel
         """
-        data_offset = self._trace_data.shape[0] - self._moving_average_width // 2
-        data = {ch: self._trace_data[:data_offset, i] for i, ch in
+        trace_data = self._trace_data.linearize()
+        data_offset = trace_data.shape[0] - self._moving_average_width // 2
+        data = {ch: trace_data[:data_offset, i] for i, ch in
                 enumerate(self.active_channel_names)}
-        return self._trace_times, data
+        return self._trace_times.linearize(), data
 
     @property
     def averaged_trace_data(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
@@ -302,9 +343,94 @@ class TimeSeriesReaderLogic(LogicBase):
         """
         if not self.averaged_channel_names or self.moving_average_width <= 1:
             return None, None
-        data = {ch: self._trace_data_averaged[:, i] for i, ch in
+        trace_data_averaged = self._trace_data_averaged.linearize()
+        data = {ch: trace_data_averaged[:, i] for i, ch in
                 enumerate(self.averaged_channel_names)}
-        return self._trace_times[-self._trace_data_averaged.shape[0]:], data
+        return self._trace_times.linearize()[-trace_data_averaged.shape[0]:], data
+
+    @property
+    def display_data(self) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray, Dict[str, np.ndarray]]:
+        """ Read-only property returning the trace data and averaged trace data (see "trace_data"
+        and "averaged_trace_data") within the current display range (see "set_display_range").
+        If there are more than "max_display_points" samples in this range, the traces are
+        decimated to interleaved minimum and maximum values of consecutive sample buckets.
+        """
+        if self._max_display_points <= 0:
+            return (*self.trace_data, *self.averaged_trace_data)
+        x, data = self._get_display_trace(self._trace_data,
+                                          self._trace_pyramid,
+                                          0,
+                                          self.active_channel_names)
+        if not self.averaged_channel_names or self.moving_average_width <= 1:
+            return x, data, None, None
+        x_averaged, data_averaged = self._get_display_trace(self._trace_data_averaged,
+                                                            self._averaged_pyramid,
+                                                            self._moving_average_width // 2,
+                                                            self.averaged_channel_names)
+        return x, data, x_averaged, data_averaged
+
+    def _get_display_trace(self,
+                           trace: RingBuffer,
+                           pyramid: MinMaxPyramid,
+                           time_offset: int,
+                           channels: Sequence[str]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """ Helper method to get the (decimated) trace within the display range.
+
+        @param RingBuffer trace: trace data ring buffer
+        @param MinMaxPyramid pyramid: decimation pyramid of the trace data
+        @param int time_offset: index of the trace time corresponding to the oldest trace sample
+        @param list channels: channel names of the trace data columns
+
+        @return (numpy.ndarray, dict): x-axis and dictionary of trace data arrays for each channel
+        """
+        times = self._trace_times
+        length = len(times) - time_offset
+        start, stop = 0, length
+        if self._display_range is not None:
+            # Trace times are sorted. Include one more sample on each side of the range.
+            linear_times = times.linearize()
+            start = np.searchsorted(linear_times, self._display_range[0], side='left') - 1
+            stop = np.searchsorted(linear_times, self._display_range[1], side='right') + 1
+            start = min(max(start - time_offset, 0), length)
+            stop = min(max(stop - time_offset, start), length)
+
+        if stop - start <= self._max_display_points or pyramid.number_of_levels == 0:
+            indices = np.arange(start, stop)
+            x = times.take(indices + time_offset)
+            y = trace.take(indices)
+        else:
+            # Pick the finest decimation level fitting into max_display_points
+            level = 1
+            while level < pyramid.number_of_levels and \
+                    2 * ((stop - start) // pyramid.bucket_size(level)) >= self._max_display_points:
+                level += 1
+            sample_offset = pyramid.count - len(trace)
+            bucket_starts, buckets = pyramid.get_buckets(level,
+                                                         start + sample_offset,
+                                                         stop + sample_offset)
+            bucket_starts -= sample_offset
+            # Append the most recent sample to end the trace with the exact current value
+            x = np.append(np.repeat(times.take(bucket_starts + time_offset), 2),
+                          times.take([stop - 1 + time_offset]))
+            y = np.concatenate((buckets.reshape((2 * buckets.shape[0], len(channels))),
+                                trace.take([stop - 1])))
+        return x, {ch: y[:, i] for i, ch in enumerate(channels)}
+
+    @QtCore.Slot(object)
+    def set_display_range(self, x_range: Optional[Tuple[float, float]] = None) -> None:
+        """ Set the x-axis range of the trace data emitted via sigDataChanged (see "display_data").
+        Since the number of displayed points is limited by "max_display_points", zooming into a
+        small region reveals the full resolution data.
+
+        @param tuple x_range: (min, max) values in units of the trace x-axis. None for full trace.
+        """
+        with self._threadlock:
+            if x_range is None:
+                self._display_range = None
+            else:
+                self._display_range = (float(min(x_range)), float(max(x_range)))
+            if self.module_state() != 'locked':
+                self.sigDataChanged.emit(*self.display_data)
 
     @property
     def trace_settings(self) -> Dict[str, Union[int, float]]:
@@ -398,7 +524,7 @@ class TimeSeriesReaderLogic(LogicBase):
             if restart:
                 self.start_reading()
             else:
-                self.sigDataChanged.emit(*self.trace_data, *self.averaged_trace_data)
+                self.sigDataChanged.emit(*self.display_data)
 
     @QtCore.Slot(list, list)
     def set_channel_settings(self, enabled: Sequence[str], averaged: Sequence[str]) -> None:
@@ -434,7 +560,7 @@ class TimeSeriesReaderLogic(LogicBase):
             if restart:
                 self.start_reading()
             else:
-                self.sigDataChanged.emit(*self.trace_data, *self.averaged_trace_data)
+                self.sigDataChanged.emit(*self.display_data)
 
     @QtCore.Slot()
     def start_reading(self) -> None:
@@ -479,6 +605,8 @@ class TimeSeriesReaderLogic(LogicBase):
     def _stop_cleanup(self) -> None:
         self.module_state.unlock()
         self._stop_recording()
+        # Show the frames withheld by the display rate limit
+        self.sigDataChanged.emit(*self.display_data)
 
     @QtCore.Slot()
     def _acquire_data_block(self) -> None:
@@ -522,8 +650,12 @@ class TimeSeriesReaderLogic(LogicBase):
                     if self._data_recording_active:
                         self._add_to_recording_array(data_view, times_view)
                     self.sigNewRawData.emit(data_view, times_view)
-                    # Emit update signal
-                    self.sigDataChanged.emit(*self.trace_data, *self.averaged_trace_data)
+                    # Emit update signal (limited to max_display_rate)
+                    now = time.perf_counter()
+                    if self._max_display_rate <= 0 or \
+                            (now - self._last_display_update) * self._max_display_rate >= 1:
+                        self._last_display_update = now
+                        self.sigDataChanged.emit(*self.display_data)
                 except Exception as e:
                     self.log.warning(f'Reading data from streamer went wrong: {e}')
                     self._stop_cleanup()
@@ -537,13 +669,8 @@ class TimeSeriesReaderLogic(LogicBase):
             )
             times_buffer = np.mean(times_buffer, axis=1)
 
-        # discard data outside time frame
-        times_buffer = times_buffer[-self._trace_times.size:]
-
-        # Roll data array to have a continuously running time trace
-        self._trace_times = np.roll(self._trace_times, -times_buffer.size)
-        # Insert new data
-        self._trace_times[-times_buffer.size:] = times_buffer
+        # Insert new data into ring buffer to have a continuously running time trace
+        self._trace_times.append(times_buffer)
 
     def _process_trace_data(self, data_buffer: np.ndarray) -> None:
         """ Processes raw data from the streaming device """
@@ -560,31 +687,34 @@ class TimeSeriesReaderLogic(LogicBase):
             data_view = np.mean(data_view, axis=1)
 
         # discard data outside time frame
-        data_view = data_view[-self._trace_data.shape[0]:, :]
+        data_view = data_view[-len(self._trace_data):, :]
         new_channel_samples = data_view.shape[0]
 
-        # Roll data array to have a continuously running time trace
-        self._trace_data = np.roll(self._trace_data, -new_channel_samples, axis=0)
-        # Insert new data
-        self._trace_data[-new_channel_samples:, :] = data_view
+        # Insert new data into ring buffer to have a continuously running time trace
+        self._trace_data.append(data_view)
+        self._trace_pyramid.append(data_view)
 
         # Calculate moving average by using numpy.convolve with a normalized uniform filter
         if self.moving_average_width > 1 and self.averaged_channel_names:
-            # Only convolve the new data and roll the previously calculated moving average
-            self._trace_data_averaged = np.roll(self._trace_data_averaged,
-                                                -new_channel_samples,
-                                                axis=0)
+            # Only convolve the new data and append it to the previously calculated moving average
             offset = new_channel_samples + len(self.__moving_filter) - 1
+            trace_tail = self._trace_data.tail(offset)
+            averaged = np.empty((trace_tail.shape[0] - len(self.__moving_filter) + 1,
+                                 len(self.averaged_channel_names)),
+                                dtype=self._trace_data_averaged.dtype)
             for i, ch in enumerate(self.averaged_channel_names):
                 data_index = self.active_channel_names.index(ch)
-                self._trace_data_averaged[-new_channel_samples:, i] = np.convolve(
-                    self._trace_data[-offset:, data_index],
-                    self.__moving_filter,
-                    mode='valid'
-                )
+                averaged[:, i] = np.convolve(trace_tail[:, data_index],
+                                             self.__moving_filter,
+                                             mode='valid')
+            self._trace_data_averaged.append(averaged)
+            self._averaged_pyramid.append(averaged)
 
     def _init_recording_arrays(self) -> None:
         constraints = self.streamer_constraints
+        if self._stream_recording:
+            self._init_stream_recorder()
+            return
         try:
             sample_bytes = np.finfo(constraints.data_type).bits // 8
         except ValueError:
@@ -608,6 +738,27 @@ class TimeSeriesReaderLogic(LogicBase):
                                            dtype=constraints.data_type)
         self._recorded_sample_count = 0
 
+    def _init_stream_recorder(self) -> None:
+        constraints = self.streamer_constraints
+        timestamp = dt.datetime.now()
+        file_path = os.path.join(self.module_default_data_dir,
+                                 get_timestamp_filename(timestamp=timestamp, nametag='data_trace'))
+        create_dir_for_file(file_path)
+        if constraints.sample_timing == SampleTiming.TIMESTAMP:
+            times_path = file_path + '_times.npy'
+        else:
+            times_path = None
+        self._recorder = StreamRecorder(data_path=file_path + '.npy',
+                                        channel_count=len(self.active_channel_names),
+                                        dtype=constraints.data_type,
+                                        times_path=times_path,
+                                        max_queue_bytes=self._max_raw_data_bytes)
+        self._recorded_data_path = self._recorder.data_path
+        self._recorded_times_path = self._recorder.times_path
+        self._recorded_raw_data = None
+        self._recorded_raw_times = None
+        self._recorded_sample_count = 0
+
     def _expand_recording_arrays(self) -> int:
         total_samples = self._recorded_raw_data.size
         channel_count = len(self.active_channel_names)
@@ -632,6 +783,12 @@ class TimeSeriesReaderLogic(LogicBase):
 
     def _add_to_recording_array(self, data, times=None) -> None:
         channel_count = len(self.active_channel_names)
+        if self._recorder is not None:
+            new_samples = data.size // channel_count
+            self._recorder.append(data[:new_samples * channel_count],
+                                  None if times is None else times[:new_samples])
+            self._recorded_sample_count += new_samples
+            return
         free_samples_per_channel = (self._recorded_raw_data.size // channel_count) - \
             self._recorded_sample_count
         new_samples = data.size // channel_count
@@ -695,8 +852,34 @@ class TimeSeriesReaderLogic(LogicBase):
             self._data_recording_active = False
             self.sigStatusChanged.emit(self.module_state() == 'locked', False)
 
+    def read_recorded_data(self,
+                           start: Optional[int] = None,
+                           stop: Optional[int] = None,
+                           step: Optional[int] = None
+                           ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """ Read a slice of samples of the last recording streamed to disk (ConfigOption
+        "stream_recording_to_disk") without loading the whole recording into memory.
+
+        @param int start: optional, index of the first sample
+        @param int stop: optional, index after the last sample
+        @param int step: optional, sample step
+
+        @return tuple: data array (samples, channels) and timestamps (None if not available)
+        """
+        if self._recorded_data_path is None:
+            raise RuntimeError('No raw data has been recorded to disk.')
+        data = StreamRecorder.read_samples(self._recorded_data_path, start, stop, step)
+        if self._recorded_times_path is None:
+            times = None
+        else:
+            times = StreamRecorder.read_samples(self._recorded_times_path, start, stop, step)
+        return data, times
+
     def _save_recorded_data(self, name_tag='', save_figure=True):
         """ Save the recorded counter trace data and writes it to a file """
+        if self._recorder is not None:
+            self._save_streamed_data(save_figure=save_figure)
+            return
         try:
             constraints = self.streamer_constraints
             metadata = {
@@ -734,11 +917,47 @@ class TimeSeriesReaderLogic(LogicBase):
             self.log.exception('Something went wrong while saving raw data:')
             raise
 
-    def _draw_raw_data_thumbnail(self, data: np.ndarray) -> plt.Figure:
+    def _save_streamed_data(self, save_figure=True):
+        """ Finalize the raw data files written during recording and save metadata alongside """
+        recorder = self._recorder
+        self._recorder = None
+        try:
+            recorder.close()
+        finally:
+            constraints = self.streamer_constraints
+            metadata = {
+                'Start recoding time': self._record_start_time.strftime('%d.%m.%Y, %H:%M:%S.%f'),
+                'Sample rate (Hz)'   : self.sampling_rate,
+                'Sample timing'      : constraints.sample_timing.name,
+                'Number of samples'  : recorder.sample_count
+            }
+            if recorder.times_path is not None:
+                metadata['Timestamps file'] = os.path.basename(recorder.times_path)
+            column_headers = [
+                f'{ch} ({constraints.channel_units[ch]})' for ch in self.active_channel_names
+            ]
+            storage = NpyDataStorage(root_dir=self.module_default_data_dir)
+            file_path = recorder.data_path.rsplit('.', 1)[0]
+            header = storage.create_header(self._record_start_time,
+                                           np.dtype(constraints.data_type),
+                                           metadata=metadata,
+                                           column_headers=column_headers)
+            with open(file_path + '_metadata.txt', 'w') as file:
+                file.write(header)
+        if save_figure and recorder.sample_count > 0:
+            # Plot a subset of samples to avoid loading the whole recording
+            step = max(1, recorder.sample_count // 10000)
+            data, times = self.read_recorded_data(step=step)
+            if times is not None:
+                data = np.column_stack([times, data])
+            fig = self._draw_raw_data_thumbnail(data, sample_step=step)
+            storage.save_thumbnail(mpl_figure=fig, file_path=file_path)
+
+    def _draw_raw_data_thumbnail(self, data: np.ndarray, sample_step: int = 1) -> plt.Figure:
         """ Draw figure to save with data file """
         constraints = self.streamer_constraints
         # Handle excessive data size for plotting. Artefacts may occur due to IIR decimation filter.
-        decimate_factor = 0
+        decimate_factor = 0 if sample_step == 1 else sample_step
         while data.shape[0] >= 20000:
             print(data.shape[0])
             decimate_factor += 2
@@ -788,9 +1007,10 @@ class TimeSeriesReaderLogic(LogicBase):
             ]
             nametag = f'trace_snapshot_{name_tag}' if name_tag else 'trace_snapshot'
 
-            data_offset = self._trace_data.shape[0] - self._moving_average_width // 2
-            data = self._trace_data[:data_offset, :]
-            x = self._trace_times
+            trace_data = self._trace_data.linearize()
+            data_offset = trace_data.shape[0] - self._moving_average_width // 2
+            data = trace_data[:data_offset, :]
+            x = self._trace_times.linearize()
             try:
                 fig = self._draw_trace_snapshot_thumbnail(x, data) if save_figure else None
             finally:
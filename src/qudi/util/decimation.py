@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains helpers to decimate long data traces for display purposes.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+from qudi.util.ring_buffer import RingBuffer
+
+
+class MinMaxPyramid:
+    """
+    Min/max decimation pyramid of the most recent <size> samples of a data stream.
+
+    Level k holds the minimum and maximum of consecutive buckets of factor**k samples (bucket
+    boundaries are multiples of factor**k counted from the first appended sample). The levels are
+    updated incrementally from the next finer level when new samples are appended, so the cost per
+    sample is constant. Levels holding less than <min_buckets> buckets are not created.
+    The pyramid is initialized as if <size> samples of <fill_value> had been appended.
+    """
+
+    def __init__(self, size, shape=(), dtype=np.float64, factor=4, min_buckets=256,
+                 fill_value=0):
+        """
+        @param int size: Number of most recent samples to cover
+        @param tuple shape: Shape of each sample, e.g. (channel_count,)
+        @param dtype: numpy data type of the samples
+        @param int factor: Number of buckets of level k-1 combined in a bucket of level k
+        @param int min_buckets: Minimum number of buckets of the coarsest level
+        @param fill_value: Initial value of all <size> samples
+        """
+        if factor < 2:
+            raise ValueError(f'Decimation factor must be >= 2 (received: {factor:d})')
+        self.size = int(size)
+        self.factor = int(factor)
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+        self._count = self.size
+        self._levels = list()
+        self._pending = list()
+        bucket_size = self.factor
+        while self.size // bucket_size >= max(1, min_buckets):
+            self._levels.append(RingBuffer(size=self.size // bucket_size,
+                                           shape=(2, *self._shape),
+                                           dtype=self._dtype,
+                                           fill_value=fill_value))
+            # entries of the next finer level not yet combined into a bucket
+            self._pending.append(np.full(((self.size * self.factor // bucket_size) % self.factor,
+                                          2,
+                                          *self._shape),
+                                         fill_value,
+                                         dtype=self._dtype))
+            bucket_size *= self.factor
+
+    @property
+    def count(self):
+        """ Total number of samples appended (including the <size> initial samples) """
+        return self._count
+
+    @property
+    def number_of_levels(self):
+        """ Number of decimation levels (excluding the raw data level 0) """
+        return len(self._levels)
+
+    def bucket_size(self, level):
+        return self.factor ** level
+
+    def append(self, data):
+        """ Add new samples to the pyramid.
+
+        @param numpy.ndarray data: New samples with shape (n, *shape)
+        """
+        if len(data) == 0:
+            return
+        self._count += len(data)
+        # min/max pairs of the next finer level (raw samples for level 1)
+        entries = np.stack((data, data), axis=1).astype(self._dtype, copy=False)
+        for level, pending in enumerate(self._pending):
+            if len(pending) > 0:
+                entries = np.concatenate((pending, entries))
+            complete = (len(entries) // self.factor) * self.factor
+            self._pending[level] = entries[complete:].copy()
+            if complete == 0:
+                break
+            grouped = entries[:complete].reshape(
+                (complete // self.factor, self.factor, 2, *self._shape)
+            )
+            entries = np.stack((grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)),
+                               axis=1)
+            self._levels[level].append(entries)
+
+    def get_buckets(self, level, start, stop):
+        """ Return the complete buckets of a level covering samples within [start, stop).
+
+        @param int level: Decimation level (>= 1)
+        @param int start: Absolute index of the first sample (counted from the oldest initial
+                          sample)
+        @param int stop: Absolute index after the last sample
+
+        @return (numpy.ndarray, numpy.ndarray): Absolute index of the first sample of each bucket
+                                                and the min/max array with shape (n, 2, *shape)
+        """
+        bucket_size = self.bucket_size(level)
+        ring = self._levels[level - 1]
+        # Absolute bucket indices available in the ring buffer
+        last_bucket = self._count // bucket_size
+        first_bucket = max(0, last_bucket - len(ring))
+        start_bucket = max(first_bucket, -(-start // bucket_size))
+        stop_bucket = min(last_bucket, stop // bucket_size)
+        if stop_bucket <= start_bucket:
+            return np.empty(0, dtype=np.int64), np.empty((0, 2, *self._shape), dtype=self._dtype)
+        buckets = ring.tail(last_bucket - start_bucket)[:stop_bucket - start_bucket]
+        return np.arange(start_bucket, stop_bucket, dtype=np.int64) * bucket_size, buckets
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a fixed size circular buffer for numpy arrays.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed size FIFO buffer holding the most recent <size> entries (rows) of a numpy array.
+
+    Appending new entries overwrites the oldest ones in place instead of shifting the whole array
+    (e.g. via numpy.roll). The chronologically ordered array is only assembled on demand by
+    calling "linearize" and cached until the next append.
+    """
+
+    def __init__(self, size, shape=(), dtype=np.float64, fill_value=0):
+        """
+        @param int size: Number of entries the buffer can hold
+        @param tuple shape: Shape of each entry, e.g. (channel_count,)
+        @param dtype: numpy data type of the buffer
+        @param fill_value: Initial value of all entries
+        """
+        size = int(size)
+        if size < 0:
+            raise ValueError(f'RingBuffer size must be >= 0 (received: {size:d})')
+        self._buffer = np.full((size, *shape), fill_value, dtype=dtype)
+        # Index of the oldest entry which is also the position of the next write
+        self._head = 0
+        self._linear = None
+
+    def __len__(self):
+        return self._buffer.shape[0]
+
+    @property
+    def shape(self):
+        return self._buffer.shape
+
+    @property
+    def dtype(self):
+        return self._buffer.dtype
+
+    def append(self, data):
+        """ Append new entries to the buffer overwriting the oldest entries.
+
+        @param numpy.ndarray data: Array of new entries with shape (n, *shape)
+        """
+        size = len(self)
+        count = len(data)
+        if count == 0 or size == 0:
+            return
+        self._linear = None
+        if count >= size:
+            self._buffer[:] = data[-size:]
+            self._head = 0
+            return
+        stop = self._head + count
+        if stop <= size:
+            self._buffer[self._head:stop] = data
+        else:
+            split = size - self._head
+            self._buffer[self._head:] = data[:split]
+            self._buffer[:stop - size] = data[split:]
+        self._head = stop % size
+
+    def tail(self, count):
+        """ Return the <count> most recent entries in chronological order. A view is returned if
+        the entries are contiguous in memory, a copy otherwise.
+
+        @param int count: Number of entries to return (<= len(self))
+
+        @return numpy.ndarray: The most recent entries
+        """
+        count = min(int(count), len(self))
+        if count <= 0:
+            return self._buffer[:0]
+        start = self._head - count
+        if start >= 0:
+            return self._buffer[start:self._head]
+        return np.concatenate((self._buffer[start:], self._buffer[:self._head]))
+
+    def take(self, indices):
+        """ Return a copy of the entries at the given chronological indices (0 being the oldest
+        entry).
+
+        @param numpy.ndarray indices: Integer array of chronological indices (0 <= index < len)
+
+        @return numpy.ndarray: The selected entries
+        """
+        if len(self) == 0:
+            return self._buffer[:0]
+        return self._buffer[(np.asarray(indices) + self._head) % len(self)]
+
+    def linearize(self):
+        """ Return a copy of all entries in chronological order (oldest first). The array is cached
+        until the buffer is modified, so repeated calls are cheap.
+
+        @return numpy.ndarray: All buffer entries with the oldest entry first
+        """
+        if self._linear is None:
+            if self._head == 0:
+                self._linear = self._buffer.copy()
+            else:
+                self._linear = np.concatenate((self._buffer[self._head:],
+                                               self._buffer[:self._head]))
+        return self._linear
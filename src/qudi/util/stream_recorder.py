@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains helpers to stream sample blocks into append-only binary .npy files.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import struct
+import threading
+import numpy as np
+from collections import deque
+
+
+class NpyStreamWriter:
+    """
+    Append-only writer for a .npy file with a growing first dimension.
+
+    The file header has a fixed size and is rewritten after each flush, so the file is a valid .npy
+    file containing all rows written so far at any time (e.g. for numpy.load with mmap_mode).
+    """
+    _header_size = 128
+
+    def __init__(self, file_path, dtype, row_shape=()):
+        """
+        @param str file_path: Path of the .npy file to create (overwritten if it exists)
+        @param dtype: numpy data type of the array
+        @param tuple row_shape: Shape of each row, e.g. (channel_count,)
+        """
+        self.file_path = file_path
+        self._dtype = np.dtype(dtype)
+        self._row_shape = tuple(row_shape)
+        self._rows = 0
+        self._file = open(file_path, 'wb')
+        try:
+            self._write_header()
+        except:
+            self._file.close()
+            raise
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def append(self, data):
+        """ Append rows to the file. The header is only updated upon the next flush.
+
+        @param numpy.ndarray data: Data with shape (n, *row_shape) or a flat array of n rows
+        """
+        data = np.ascontiguousarray(data, dtype=self._dtype).reshape((-1, *self._row_shape))
+        self._file.write(memoryview(data).cast('B'))
+        self._rows += data.shape[0]
+
+    def flush(self):
+        """ Update the header with the current number of rows and flush the file to disk. """
+        self._file.seek(0)
+        self._write_header()
+        self._file.seek(0, 2)
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            try:
+                self.flush()
+            finally:
+                self._file.close()
+
+    def _write_header(self):
+        header = {'descr': np.lib.format.dtype_to_descr(self._dtype),
+                  'fortran_order': False,
+                  'shape': (self._rows, *self._row_shape)}
+        preamble = np.lib.format.magic(1, 0)
+        header_length = self._header_size - len(preamble) - 2
+        header_str = repr(header).encode('latin1')
+        if len(header_str) >= header_length:
+            raise ValueError(f'npy header of "{self.file_path}" exceeds {self._header_size:d} bytes')
+        header_str = header_str.ljust(header_length - 1) + b'\n'
+        self._file.write(preamble + struct.pack('<H', header_length) + header_str)
+
+
+class StreamRecorder:
+    """
+    Records sample blocks of a data stream to disk in a background thread.
+
+    Data samples (one row of <channel_count> values per sample) and optional timestamps are
+    written to separate .npy files (see NpyStreamWriter). Blocks are copied upon "append" and queued
+    for the writer thread. The memory used by queued blocks is bounded by max_queue_bytes;
+    "append" blocks if the writer can not keep up.
+    Recorded files can be read back (also partially) with "read_samples".
+    """
+
+    def __init__(self, data_path, channel_count, dtype, times_path=None, max_queue_bytes=256 * 1024**2):
+        """
+        @param str data_path: File path of the .npy file for data samples
+        @param int channel_count: Number of values per sample
+        @param dtype: numpy data type of the data samples
+        @param str times_path: optional, file path of the .npy file for timestamps (float64)
+        @param int max_queue_bytes: Maximum size of blocks queued for writing
+        """
+        self._max_queue_bytes = int(max_queue_bytes)
+        self._channel_count = int(channel_count)
+        self._data_writer = NpyStreamWriter(data_path, dtype, (self._channel_count,))
+        try:
+            if times_path is None:
+                self._times_writer = None
+            else:
+                self._times_writer = NpyStreamWriter(times_path, np.float64)
+        except:
+            self._data_writer.close()
+            raise
+
+        self._queue = deque()
+        self._queued_bytes = 0
+        self._condition = threading.Condition()
+        self._stop_requested = False
+        self._error = None
+        self._sample_count = 0
+        self._thread = threading.Thread(target=self._write_loop,
+                                        name='StreamRecorder',
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def data_path(self):
+        return self._data_writer.file_path
+
+    @property
+    def times_path(self):
+        return None if self._times_writer is None else self._times_writer.file_path
+
+    @property
+    def sample_count(self):
+        """ Number of samples appended (written or queued for writing) """
+        return self._sample_count
+
+    def append(self, data, times=None):
+        """ Queue a block of samples for writing. Data is copied, so buffers can be reused
+        immediately.
+
+        @param numpy.ndarray data: Sample values, shape (n, channel_count) or flat interleaved
+        @param numpy.ndarray times: optional, timestamps of the n samples
+        """
+        data = np.array(data, copy=True)
+        if self._times_writer is None:
+            times = None
+        else:
+            times = np.array(times, dtype=np.float64, copy=True)
+        block_bytes = data.nbytes + (0 if times is None else times.nbytes)
+        with self._condition:
+            # Wait until the writer thread catches up (always accept if queue is empty)
+            while self._queue and self._error is None and \
+                    self._queued_bytes + block_bytes > self._max_queue_bytes:
+                self._condition.wait()
+            if self._error is not None:
+                raise RuntimeError('Writing recorded data to disk failed') from self._error
+            if self._stop_requested:
+                raise RuntimeError('StreamRecorder already closed')
+            self._queue.append((data, times))
+            self._queued_bytes += block_bytes
+            self._sample_count += data.size // self._channel_count
+            self._condition.notify_all()
+
+    def close(self):
+        """ Write all queued blocks, finalize the files and stop the writer thread. """
+        with self._condition:
+            self._stop_requested = True
+            self._condition.notify_all()
+        self._thread.join()
+        try:
+            self._data_writer.close()
+        finally:
+            if self._times_writer is not None:
+                self._times_writer.close()
+        if self._error is not None:
+            raise RuntimeError('Writing recorded data to disk failed') from self._error
+
+    def _write_loop(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._stop_requested:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                data, times = self._queue[0]
+            try:
+                self._data_writer.append(data)
+                self._data_writer.flush()
+                if self._times_writer is not None:
+                    self._times_writer.append(times)
+                    self._times_writer.flush()
+            except Exception as err:
+                with self._condition:
+                    self._error = err
+                    self._queue.clear()
+                    self._queued_bytes = 0
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._queue.popleft()
+                self._queued_bytes -= data.nbytes + (0 if times is None else times.nbytes)
+                self._condition.notify_all()
+
+    @staticmethod
+    def read_samples(file_path, start=None, stop=None, step=None):
+        """ Read a slice of samples from a recorded .npy file without loading the whole file.
+
+        @param str file_path: Path of the recorded .npy file
+        @param int start: optional, index of the first sample
+        @param int stop: optional, index after the last sample
+        @param int step: optional, sample step
+
+        @return numpy.ndarray: Copy of the requested samples
+        """
+        samples = np.load(file_path, mmap_mode='r', allow_pickle=False)
+        return np.array(samples[start:stop:step])
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the vectorized BasicPulseAnalyzer methods against the previous per-laser loop
+implementations. Checks that both yield identical results and prints the run times for 10 to
+100k laser pulses.
+
+Usage: python tests/benchmark_pulse_analysis.py [--bins 500] [--repeat 3]
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import logging
+import argparse
+import numpy as np
+
+from qudi.logic.pulsed.pulsed_analysis_methods.basic_analysis_methods import BasicPulseAnalyzer
+
+BIN_WIDTH = 1e-9
+LASER_NUMBERS = (10, 100, 1000, 10000, 100000)
+# analysis windows in s (signal_start, signal_end, norm_start, norm_end)
+WINDOWS = (0.0, 200e-9, 300e-9, 500e-9)
+
+
+class _DummyMeasurementLogic:
+    """ Minimal stand-in for PulsedMeasurementLogic providing what the analyzer needs """
+    fast_counter_settings = {'bin_width': BIN_WIDTH, 'is_gated': False}
+    measurement_settings = dict()
+    sampling_information = dict()
+    log = logging.getLogger(__name__)
+
+
+def _bins(*times):
+    return tuple(round(t / BIN_WIDTH) for t in times)
+
+
+def legacy_mean_norm(laser_data, signal_start, signal_end, norm_start, norm_end):
+    signal_start_bin, signal_end_bin, norm_start_bin, norm_end_bin = _bins(
+        signal_start, signal_end, norm_start, norm_end)
+    signal_data = np.empty(laser_data.shape[0], dtype=float)
+    error_data = np.empty(laser_data.shape[0], dtype=float)
+    for ii, laser_arr in enumerate(laser_data):
+        tmp_data = laser_arr[norm_start_bin:norm_end_bin]
+        reference_sum = np.sum(tmp_data)
+        reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        tmp_data = laser_arr[signal_start_bin:signal_end_bin]
+        signal_sum = np.sum(tmp_data)
+        signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        if reference_mean > 0 and signal_mean >= 0:
+            signal_data[ii] = signal_mean / reference_mean
+        else:
+            signal_data[ii] = 0.0
+        if reference_sum > 0 and signal_sum > 0:
+            error_data[ii] = signal_data[ii] * np.sqrt(1 / signal_sum + 1 / reference_sum)
+        else:
+            error_data[ii] = 0.0
+    return signal_data, error_data
+
+
+def legacy_sum(laser_data, signal_start, signal_end):
+    signal_start_bin, signal_end_bin = _bins(signal_start, signal_end)
+    signal_data = np.empty(laser_data.shape[0], dtype=float)
+    error_data = np.empty(laser_data.shape[0], dtype=float)
+    for ii, laser_arr in enumerate(laser_data):
+        signal = laser_arr[signal_start_bin:signal_end_bin].sum()
+        signal_error = np.sqrt(signal)
+        if signal < 0 or signal != signal:
+            signal_data[ii] = 0.0
+            error_data[ii] = 0.0
+        else:
+            signal_data[ii] = signal
+            error_data[ii] = signal_error
+    return signal_data, error_data
+
+
+def legacy_mean(laser_data, signal_start, signal_end):
+    signal_start_bin, signal_end_bin = _bins(signal_start, signal_end)
+    signal_data = np.empty(laser_data.shape[0], dtype=float)
+    error_data = np.empty(laser_data.shape[0], dtype=float)
+    for ii, laser_arr in enumerate(laser_data):
+        signal = laser_arr[signal_start_bin:signal_end_bin].mean()
+        signal_sum = laser_arr[signal_start_bin:signal_end_bin].sum()
+        signal_error = np.sqrt(signal_sum) / (signal_end_bin - signal_start_bin)
+        if signal < 0 or signal != signal:
+            signal_data[ii] = 0.0
+            error_data[ii] = 0.0
+        else:
+            signal_data[ii] = signal
+            error_data[ii] = signal_error
+    return signal_data, error_data
+
+
+def legacy_mean_reference(laser_data, signal_start, signal_end, norm_start, norm_end):
+    signal_start_bin, signal_end_bin, norm_start_bin, norm_end_bin = _bins(
+        signal_start, signal_end, norm_start, norm_end)
+    signal_data = np.empty(laser_data.shape[0], dtype=float)
+    error_data = np.empty(laser_data.shape[0], dtype=float)
+    for ii, laser_arr in enumerate(laser_data):
+        tmp_data = laser_arr[norm_start_bin:norm_end_bin]
+        reference_sum = np.sum(tmp_data)
+        reference_mean = (reference_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        tmp_data = laser_arr[signal_start_bin:signal_end_bin]
+        signal_sum = np.sum(tmp_data)
+        signal_mean = (signal_sum / len(tmp_data)) if len(tmp_data) != 0 else 0.0
+        signal_data[ii] = signal_mean - reference_mean
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error_data[ii] = signal_data[ii] * np.sqrt(1 / abs(signal_sum) + 1 / abs(reference_sum))
+    return signal_data, error_data
+
+
+def _time_call(func, repeat, *args):
+    """ Return the result and the best run time in s of <repeat> calls of func(*args) """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run_benchmark(bins_per_laser=500, repeat=3, laser_numbers=LASER_NUMBERS):
+    """ Compare the vectorized analysis methods with the per-laser loops for increasing numbers of
+    laser pulses. Raises AssertionError if the results are not identical.
+
+    @param int bins_per_laser: number of time bins of each laser pulse
+    @param int repeat: number of repetitions per timing (the fastest run is reported)
+    @param iterable laser_numbers: numbers of laser pulses to benchmark
+
+    @return dict: run times in s as {method name: [(number of lasers, old, new), ...]}
+    """
+    analyzer = BasicPulseAnalyzer(_DummyMeasurementLogic())
+    methods = {'analyse_mean_norm': (analyzer.analyse_mean_norm, legacy_mean_norm, WINDOWS),
+               'analyse_sum': (analyzer.analyse_sum, legacy_sum, WINDOWS[:2]),
+               'analyse_mean': (analyzer.analyse_mean, legacy_mean, WINDOWS[:2]),
+               'analyse_mean_reference': (analyzer.analyse_mean_reference,
+                                          legacy_mean_reference,
+                                          WINDOWS)}
+    rng = np.random.default_rng(42)
+    results = {name: list() for name in methods}
+    for number_of_lasers in laser_numbers:
+        laser_data = rng.poisson(5, (number_of_lasers, bins_per_laser)).astype('int64')
+        # include dark laser pulses to cover the divisions by zero
+        laser_data[::7] = 0
+        for name, (new_method, old_method, windows) in methods.items():
+            old_result, old_time = _time_call(old_method, repeat, laser_data, *windows)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                new_result, new_time = _time_call(new_method, repeat, laser_data, *windows)
+            for old_arr, new_arr in zip(old_result, new_result):
+                np.testing.assert_array_equal(new_arr, old_arr, err_msg=name)
+            results[name].append((number_of_lasers, old_time, new_time))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--bins', type=int, default=500, help='time bins per laser pulse')
+    parser.add_argument('--repeat', type=int, default=3, help='repetitions per timing')
+    args = parser.parse_args()
+
+    results = run_benchmark(bins_per_laser=args.bins, repeat=args.repeat)
+    print(f'{args.bins} bins per laser pulse, results identical. Run times (old -> new):')
+    for name, timings in results.items():
+        print(f'{name}:')
+        for number_of_lasers, old_time, new_time in timings:
+            print(f'  {number_of_lasers:>6d} lasers: {old_time * 1e3:9.2f} ms -> '
+                  f'{new_time * 1e3:8.2f} ms  (x{old_time / new_time:.1f})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the PicoQuant FIFO read pipeline with a fake device FIFO.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import time
+import random
+import threading
+import numpy as np
+
+from qudi.hardware.picoquant.fifo_pipeline import FifoReadPipeline
+
+
+class _FakeFifo:
+    """ Device FIFO handing out consecutively numbered records, so gaps are visible in the data """
+    def __init__(self, records_per_read, number_of_reads):
+        self.records_per_read = records_per_read
+        self.remaining_reads = number_of_reads
+        self.next_record = 0
+        self.finished = threading.Event()
+
+    def read_fifo(self, buffer):
+        if self.remaining_reads <= 0:
+            self.finished.set()
+            time.sleep(0.001)
+            return 0
+        self.remaining_reads -= 1
+        count = random.randint(1, self.records_per_read)
+        buffer[:count] = np.arange(self.next_record, self.next_record + count, dtype=np.uint32)
+        self.next_record += count
+        time.sleep(0.0002)
+        return count
+
+
+def _run_pipeline(fifo, process_delay, buffer_count=3):
+    processed = list()
+
+    def process_records(records, continuous):
+        processed.append((int(records[0]), int(records[-1]), continuous))
+        time.sleep(random.uniform(0, process_delay))
+
+    pipeline = FifoReadPipeline(read_fifo=fifo.read_fifo,
+                                process_records=process_records,
+                                buffer_size=fifo.records_per_read,
+                                buffer_count=buffer_count)
+    pipeline.start()
+    assert fifo.finished.wait(timeout=30)
+    pipeline.stop()
+    assert pipeline.error is None
+    return pipeline, processed
+
+
+def _check_continuity(processed):
+    """ Assert that continuous is False exactly for buffers following dropped records """
+    gaps = 0
+    expected_first = 0
+    for first, last, continuous in processed:
+        follows_gap = first != expected_first
+        gaps += follows_gap
+        assert continuous != follows_gap, f'buffer starting at record {first}'
+        expected_first = last + 1
+    return gaps
+
+
+def test_every_gap_is_reported():
+    random.seed(1234)
+    fifo = _FakeFifo(records_per_read=64, number_of_reads=2000)
+    pipeline, processed = _run_pipeline(fifo, process_delay=0.002)
+    gaps = _check_continuity(processed)
+    statistics = pipeline.statistics
+    # slow processing must have dropped buffers for this test to be meaningful
+    assert statistics['dropped_buffers'] > 0
+    assert gaps > 0
+    assert statistics['processed_buffers'] + statistics['dropped_buffers'] == \
+           statistics['read_buffers']
+
+
+def test_no_gaps_with_fast_processing():
+    random.seed(5678)
+    fifo = _FakeFifo(records_per_read=64, number_of_reads=500)
+    pipeline, processed = _run_pipeline(fifo, process_delay=0, buffer_count=8)
+    if pipeline.statistics['dropped_buffers'] == 0:
+        assert all(continuous for _, _, continuous in processed)
+    _check_continuity(processed)
+
+
+def test_restart_is_not_continuous():
+    fifo = _FakeFifo(records_per_read=16, number_of_reads=10)
+    processed = list()
+    pipeline = FifoReadPipeline(read_fifo=fifo.read_fifo,
+                                process_records=lambda rec, cont: processed.append(cont),
+                                buffer_size=16)
+    pipeline.start()
+    assert fifo.finished.wait(timeout=10)
+    pipeline.stop()
+    first_run = len(processed)
+    fifo.remaining_reads = 10
+    fifo.finished.clear()
+    pipeline.start()
+    assert fifo.finished.wait(timeout=10)
+    pipeline.stop()
+    assert processed[0] and all(processed[1:first_run])
+    assert not processed[first_run] and all(processed[first_run + 1:])
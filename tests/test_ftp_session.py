@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests of the FTP session pool against a local stand-in FTP server.
+
+Copyright (c) 2021, the qudi developers. See the AUTHORS.md file at the top-level directory of this
+distribution and on <https://github.com/Ulm-IQO/qudi-iqo-modules/>
+
+This file is part of qudi.
+
+Qudi is free software: you can redistribute it and/or modify it under the terms of
+the GNU Lesser General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version.
+
+Qudi is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU Lesser General Public License for more details.
+
+You should have received a copy of the GNU Lesser General Public License along with qudi.
+If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import io
+import os
+import time
+import ftplib
+import socket
+import threading
+import socketserver
+import pytest
+
+from qudi.hardware.awg.ftp_session import FtpSessionPool
+
+
+class _FtpHandler(socketserver.StreamRequestHandler):
+    """ Minimal FTP control connection handler (passive mode, binary transfers only) """
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.sessions.add(self.request)
+            server.max_sessions = max(server.max_sessions, len(server.sessions))
+        try:
+            self._serve()
+        except OSError:
+            pass
+        finally:
+            with server.lock:
+                server.sessions.discard(self.request)
+
+    def _reply(self, line):
+        self.wfile.write((line + '\r\n').encode())
+        self.wfile.flush()
+
+    def _accept_data(self, data_socket):
+        self._reply('150 Opening data connection')
+        connection, _ = data_socket.accept()
+        data_socket.close()
+        return connection
+
+    def _serve(self):
+        server = self.server
+        cwd = '/'
+        data_socket = None
+        self._reply('220 Stand-in FTP server ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, arg = line.decode().strip().partition(' ')
+            command = command.upper()
+            if command == 'USER':
+                self._reply('331 Password required')
+            elif command == 'PASS':
+                with server.lock:
+                    server.logins += 1
+                self._reply('230 Logged in')
+            elif command == 'CWD':
+                cwd = arg if arg.startswith('/') else cwd.rstrip('/') + '/' + arg
+                self._reply('250 Directory changed')
+            elif command == 'PWD':
+                self._reply(f'257 "{cwd}"')
+            elif command == 'MKD':
+                self._reply(f'257 "{arg}" created')
+            elif command in ('TYPE', 'NOOP'):
+                if command == 'NOOP':
+                    with server.lock:
+                        server.noops += 1
+                self._reply('200 OK')
+            elif command == 'QUIT':
+                self._reply('221 Goodbye')
+                return
+            elif command == 'PASV':
+                data_socket = socket.create_server(('127.0.0.1', 0))
+                port = data_socket.getsockname()[1]
+                self._reply(f'227 Entering Passive Mode (127,0,0,1,{port >> 8},{port & 255})')
+            elif command == 'LIST':
+                connection = self._accept_data(data_socket)
+                with server.lock:
+                    names = [name for (path, name) in server.files if path == cwd]
+                for name in names:
+                    connection.sendall(f'-rw-r--r-- 1 ftp ftp 0 Jan 01 00:00 {name}\r\n'.encode())
+                connection.close()
+                self._reply('226 Transfer complete')
+            elif command == 'STOR':
+                connection = self._accept_data(data_socket)
+                chunks = list()
+                while True:
+                    chunk = connection.recv(65536)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                connection.close()
+                time.sleep(server.store_delay)
+                with server.lock:
+                    server.files[(cwd, arg)] = b''.join(chunks)
+                self._reply('226 Transfer complete')
+            elif command == 'DELE':
+                with server.lock:
+                    found = server.files.pop((cwd, arg), None) is not None
+                self._reply('250 Deleted' if found else '550 File not found')
+            else:
+                self._reply('502 Command not implemented')
+
+
+class _StandInFtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _FtpHandler)
+        self.lock = threading.Lock()
+        self.files = dict()
+        self.sessions = set()
+        self.max_sessions = 0
+        self.logins = 0
+        self.noops = 0
+        self.store_delay = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def drop_connections(self):
+        """ Close all control connections like a server closing idle sessions """
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            try:
+                session.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        deadline = time.monotonic() + 5
+        while self.sessions and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+@pytest.fixture
+def ftp_server():
+    server = _StandInFtpServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def local_files(tmp_path):
+    paths = list()
+    for ii in range(10):
+        path = tmp_path / f'wave_{ii}.wfmx'
+        path.write_bytes(os.urandom(1000 + ii))
+        paths.append(str(path))
+    return paths
+
+
+def test_batch_upload_and_delete_in_one_session(ftp_server, local_files):
+    pool = FtpSessionPool('127.0.0.1', port=ftp_server.port, working_dir='waves',
+                          keepalive_interval=0)
+    try:
+        assert pool.upload_files(local_files) == [os.path.basename(p) for p in local_files]
+        for path in local_files:
+            with open(path, 'rb') as file:
+                assert ftp_server.files[('/waves', os.path.basename(path))] == file.read()
+        assert len(pool.list_directory()) == len(local_files)
+
+        deleted = pool.delete_files(['wave_0.wfmx', 'missing.wfmx', 'wave_1.wfmx'],
+                                    ignore_missing=True)
+        assert deleted == ['wave_0.wfmx', 'wave_1.wfmx']
+        with pytest.raises(ftplib.error_perm):
+            pool.delete_files(['missing.wfmx'])
+
+        pool.upload_stream('stream.bin', io.BytesIO(b'abc' * 1000))
+        assert ftp_server.files[('/waves', 'stream.bin')] == b'abc' * 1000
+        # All operations share a single login
+        assert ftp_server.logins == 1
+        assert pool.statistics['connects'] == 1
+    finally:
+        pool.close()
+    assert pool.statistics['open_connections'] == 0
+
+
+def test_parallel_upload(ftp_server, local_files):
+    ftp_server.store_delay = 0.05
+    pool = FtpSessionPool('127.0.0.1', port=ftp_server.port, working_dir='waves',
+                          max_connections=4, keepalive_interval=0)
+    try:
+        pool.upload_files(local_files, parallel=True)
+        assert all(('/waves', os.path.basename(p)) in ftp_server.files for p in local_files)
+        assert 1 < ftp_server.max_sessions <= 4
+        assert pool.statistics['open_connections'] <= 4
+    finally:
+        pool.close()
+
+
+def test_reconnect_after_dropped_connection(ftp_server, local_files):
+    pool = FtpSessionPool('127.0.0.1', port=ftp_server.port, working_dir='waves',
+                          keepalive_interval=0)
+    try:
+        pool.upload_files(local_files[:2])
+        ftp_server.drop_connections()
+        # The broken pooled connection is replaced and the operation repeated transparently
+        assert len(pool.list_directory()) == 2
+        ftp_server.drop_connections()
+        pool.upload_files(local_files[2:4])
+        ftp_server.drop_connections()
+        assert pool.delete_files(['wave_0.wfmx']) == ['wave_0.wfmx']
+        assert pool.statistics['reconnects'] == 3
+        assert ftp_server.logins == 4
+        assert sorted(name for _, name in ftp_server.files) == ['wave_1.wfmx', 'wave_2.wfmx',
+                                                                'wave_3.wfmx']
+    finally:
+        pool.close()
+
+
+def test_keepalive(ftp_server):
+    pool = FtpSessionPool('127.0.0.1', port=ftp_server.port, keepalive_interval=0.2)
+    try:
+        pool.list_directory()
+        time.sleep(0.7)
+        assert ftp_server.noops > 0
+        pool.list_directory()
+        assert pool.statistics['reconnects'] == 0
+        assert ftp_server.logins == 1
+    finally:
+        pool.close()
+
+
+def test_close_without_connection():
+    pool = FtpSessionPool('127.0.0.1', port=1, keepalive_interval=30)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.list_directory()